@@ -0,0 +1,196 @@
+"""
+Pérdida de precisión de la galería cuantizada (float16 / int8) frente a float32.
+
+Sobre un conjunto etiquetado (varias muestras por persona) se registra la
+primera muestra de cada persona y se consultan las demás; una parte de las
+personas no se registra y sirve de impostores. Para cada precisión se mide
+acierto top-1, aceptación correcta y falsa aceptación con el threshold de
+SFace, cuánto cambian los scores respecto a float32, memoria y velocidad.
+
+    python benchmarks/bench_cuantizacion.py --carpeta personas/        # una subcarpeta por persona
+    python benchmarks/bench_cuantizacion.py --db biopass.db             # encodings guardados, etiqueta = nombre
+    python benchmarks/bench_cuantizacion.py --sintetico 20000           # identidades sintéticas
+"""
+import sys
+import os
+import time
+import json
+import argparse
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import cv2
+import numpy as np
+from src.utils.galeria import GaleriaRostros
+from src.utils.indices import PRECISIONES
+
+
+def desde_carpeta(carpeta):
+    """Encodings SFace de carpeta/<persona>/<foto>. Retorna (etiquetas, encodings)."""
+    from src.utils.camera_utils import CameraUtils
+    CameraUtils.initialize_models()
+    etiquetas, encodings = [], []
+    for persona in sorted(os.listdir(carpeta)):
+        ruta_persona = os.path.join(carpeta, persona)
+        if not os.path.isdir(ruta_persona):
+            continue
+        for fichero in sorted(os.listdir(ruta_persona)):
+            imagen = cv2.imread(os.path.join(ruta_persona, fichero))
+            encoding = CameraUtils.encoding_desde_foto(imagen) if imagen is not None else None
+            if encoding is not None:
+                etiquetas.append(persona)
+                encodings.append(encoding)
+    return etiquetas, np.vstack(encodings) if encodings else np.empty((0, GaleriaRostros.DIM), np.float32)
+
+
+def desde_db(db_file):
+    """Encodings ya guardados en la BD (del modelo actual), etiqueta = nombre."""
+    from src.conexion_db import DBConnection
+    from src.usuario_dao import UsuarioDAO
+    from src.utils.camera_utils import CameraUtils
+    DBConnection.DB_FILE = db_file
+    usuarios = UsuarioDAO.obtener_encodings(CameraUtils.modelo_hash())
+    if not usuarios:
+        return [], np.empty((0, GaleriaRostros.DIM), np.float32)
+    return [u[1] for u in usuarios], np.vstack([CameraUtils.bytes_a_encoding(u[2]) for u in usuarios])
+
+
+def sintetico(n_identidades, muestras=3, ruido=0.9, dim=GaleriaRostros.DIM, semilla=0):
+    """
+    Cada identidad es una dirección aleatoria; sus muestras, esa dirección con ruido.
+    Solo sirve para comparar precisiones entre sí: la distribución de scores
+    no es la de SFace, así que el FAR absoluto no es representativo.
+    """
+    rng = np.random.default_rng(semilla)
+    identidades = GaleriaRostros.normalizar(rng.standard_normal((n_identidades, dim)), dim)
+    repetidas = np.repeat(identidades, muestras, axis=0)
+    encodings = repetidas + ruido * rng.standard_normal(repetidas.shape) / np.sqrt(dim)
+    etiquetas = [f"persona_{i}" for i in range(n_identidades) for _ in range(muestras)]
+    return etiquetas, encodings.astype(np.float32)
+
+
+def dividir(etiquetas, encodings, frac_impostores=0.2, semilla=0):
+    """
+    Registro = primera muestra de cada persona no impostora.
+    Consultas = resto de muestras (esperado: su nombre) + todas las de los
+    impostores (esperado: no aceptar a nadie, etiqueta None).
+    """
+    rng = np.random.default_rng(semilla)
+    personas = sorted(set(etiquetas))
+    impostores = set(rng.choice(personas, int(len(personas) * frac_impostores), replace=False)) if personas else set()
+    registro, nombres, consultas, esperados = [], [], [], []
+    vistos = set()
+    for etiqueta, encoding in zip(etiquetas, encodings):
+        if etiqueta in impostores:
+            consultas.append(encoding)
+            esperados.append(None)
+        elif etiqueta not in vistos:
+            vistos.add(etiqueta)
+            registro.append(encoding)
+            nombres.append(etiqueta)
+        else:
+            consultas.append(encoding)
+            esperados.append(etiqueta)
+    return np.array(registro), nombres, np.array(consultas), esperados
+
+
+def evaluar(galeria, consultas, esperados, threshold):
+    """Métricas de identificación sobre todas las consultas."""
+    t0 = time.perf_counter()
+    resultados = []
+    for inicio in range(0, len(consultas), 1024):
+        resultados.extend(galeria.buscar_lote(consultas[inicio:inicio + 1024], k=1))
+    segundos = time.perf_counter() - t0
+
+    scores = np.array([r[0][1] if r else 0.0 for r in resultados])
+    nombres = [r[0][0] if r else None for r in resultados]
+    genuinas = np.array([e is not None for e in esperados])
+    top1 = np.array([n == e for n, e in zip(nombres, esperados)])
+    aceptadas = scores >= threshold
+
+    # Latencia de un login (una consulta) sobre una muestra
+    latencias = []
+    for consulta in consultas[:200]:
+        t = time.perf_counter()
+        galeria.buscar_lote(consulta, k=1)
+        latencias.append((time.perf_counter() - t) * 1000)
+
+    return {
+        "top1": float(top1[genuinas].mean()) if genuinas.any() else 0.0,
+        "tar": float((top1 & aceptadas)[genuinas].mean()) if genuinas.any() else 0.0,
+        "far": float(aceptadas[~genuinas].mean()) if (~genuinas).any() else 0.0,
+        "qps_lote": len(consultas) / segundos,
+        "p50_ms": float(np.percentile(latencias, 50)),
+        "scores": scores,
+        "nombres": nombres,
+        "decisiones": aceptadas,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precisión y memoria de la galería float32 / float16 / int8")
+    fuente = parser.add_mutually_exclusive_group(required=True)
+    fuente.add_argument("--carpeta", help="Una subcarpeta de fotos por persona")
+    fuente.add_argument("--db", help="Fichero SQLite con encodings guardados")
+    fuente.add_argument("--sintetico", type=int, help="Nº de identidades sintéticas")
+    parser.add_argument("--impostores", type=float, default=0.2, help="Fracción de personas sin registrar")
+    parser.add_argument("--precision", nargs="+", default=list(PRECISIONES))
+    parser.add_argument("--threshold", type=float, default=GaleriaRostros.UMBRAL_COSENO)
+    parser.add_argument("--json", help="Guardar los resultados en este fichero")
+    args = parser.parse_args()
+
+    if args.carpeta:
+        etiquetas, encodings = desde_carpeta(args.carpeta)
+    elif args.db:
+        etiquetas, encodings = desde_db(args.db)
+    else:
+        etiquetas, encodings = sintetico(args.sintetico)
+    registro, nombres, consultas, esperados = dividir(etiquetas, encodings, args.impostores)
+    if len(registro) == 0 or len(consultas) == 0:
+        print("❌ Hacen falta varias muestras por persona.")
+        return
+    print(f"Registrados: {len(registro)}, consultas: {len(consultas)} "
+          f"({sum(e is None for e in esperados)} de impostores)")
+
+    referencia = None
+    resultados = []
+    print(f"\n{'precisión':<10}{'MB':>9}{'top-1':>8}{'TAR':>8}{'FAR':>8}{'Δscore máx':>12}"
+          f"{'Δscore medio':>14}{'cambios':>9}{'qps lote':>10}{'p50 ms':>8}")
+    for precision in args.precision:
+        galeria = GaleriaRostros.crear("plano", precision=precision)
+        galeria.agregar_lote(registro, nombres)
+        metricas = evaluar(galeria, consultas, esperados, args.threshold)
+        if referencia is None:
+            # La primera precisión de la lista (float32 por defecto) es la referencia
+            referencia = metricas
+        delta = np.abs(metricas["scores"] - referencia["scores"])
+        cambios = np.mean([(n != r) or (d != dr) for n, r, d, dr in zip(
+            metricas["nombres"], referencia["nombres"], metricas["decisiones"], referencia["decisiones"])])
+
+        resultado = {
+            "precision": precision,
+            "galeria_mb": galeria.nbytes / 2**20,
+            "top1": metricas["top1"],
+            "tar": metricas["tar"],
+            "far": metricas["far"],
+            "delta_score_max": float(delta.max()),
+            "delta_score_medio": float(delta.mean()),
+            "decisiones_cambiadas": float(cambios),
+            "qps_lote": metricas["qps_lote"],
+            "p50_ms": metricas["p50_ms"],
+        }
+        resultados.append(resultado)
+        print(f"{precision:<10}{resultado['galeria_mb']:>9.2f}{resultado['top1']:>8.4f}{resultado['tar']:>8.4f}"
+              f"{resultado['far']:>8.4f}{resultado['delta_score_max']:>12.5f}{resultado['delta_score_medio']:>14.6f}"
+              f"{resultado['decisiones_cambiadas']:>9.4f}{resultado['qps_lote']:>10.0f}{resultado['p50_ms']:>8.3f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2)
+        print(f"\nResultados guardados en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
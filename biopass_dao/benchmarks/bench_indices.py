@@ -0,0 +1,89 @@
+"""
+Benchmark de recall/latencia de los índices de la galería sobre embeddings sintéticos.
+
+Compara el índice aproximado (IVF) contra el exacto (plano):
+    python benchmarks/bench_indices.py --usuarios 100000 --consultas 500 --n-probe 4 8 16
+"""
+import sys
+import os
+import time
+import argparse
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import numpy as np
+from src.utils.galeria import GaleriaRostros
+from src.utils.indices import IndicePlano, IndiceIVF
+
+
+def generar_embeddings(n_usuarios, n_consultas, dim=128, ruido=0.6, semilla=0):
+    """
+    Galería sintética: cada identidad es una dirección aleatoria y su
+    embedding registrado y las consultas son esa dirección más ruido
+    (simula fotos distintas de la misma persona).
+    """
+    rng = np.random.default_rng(semilla)
+    identidades = GaleriaRostros.normalizar(rng.standard_normal((n_usuarios, dim)), dim)
+    galeria = GaleriaRostros.normalizar(identidades + ruido * rng.standard_normal((n_usuarios, dim)) / np.sqrt(dim), dim)
+    objetivo = rng.choice(n_usuarios, n_consultas, replace=False)
+    consultas = GaleriaRostros.normalizar(identidades[objetivo] + ruido * rng.standard_normal((n_consultas, dim)) / np.sqrt(dim), dim)
+    return galeria, consultas, objetivo
+
+
+def medir(indice, consultas, k):
+    """Busca consulta a consulta (como en un login). Retorna (posiciones, latencias_ms)."""
+    posiciones = []
+    latencias = []
+    for consulta in consultas:
+        t0 = time.perf_counter()
+        _, pos = indice.buscar(consulta[None, :], k)
+        latencias.append((time.perf_counter() - t0) * 1000)
+        posiciones.append(pos[0])
+    return posiciones, np.array(latencias)
+
+
+def acierto(posiciones, objetivo):
+    """Fracción de consultas cuyo top-1 es la identidad correcta."""
+    return float(np.mean([len(p) > 0 and p[0] == o for p, o in zip(posiciones, objetivo)]))
+
+
+def recall(exactos, aproximados, k):
+    aciertos = sum(len(set(e[:k]) & set(a[:k])) for e, a in zip(exactos, aproximados))
+    return aciertos / (k * len(exactos))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall/latencia del índice IVF frente al plano (exacto)")
+    parser.add_argument("--usuarios", type=int, default=100_000)
+    parser.add_argument("--consultas", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--n-listas", type=int, default=None, help="Por defecto sqrt(n)")
+    parser.add_argument("--n-probe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    print(f"Generando {args.usuarios} embeddings sintéticos...")
+    vectores, consultas, objetivo = generar_embeddings(args.usuarios, args.consultas)
+
+    plano = IndicePlano(capacidad=len(vectores))
+    plano.agregar(vectores)
+    exactos, lat_plano = medir(plano, consultas, args.k)
+    print(f"\n{'índice':<18}{'acierto':>10}{'recall@1':>10}{'recall@k':>10}{'p50 ms':>10}{'p95 ms':>10}{'qps':>10}")
+    print(f"{'plano (exacto)':<18}{acierto(exactos, objetivo):>10.3f}{1.0:>10.3f}{1.0:>10.3f}"
+          f"{np.percentile(lat_plano, 50):>10.3f}{np.percentile(lat_plano, 95):>10.3f}{1000 / lat_plano.mean():>10.0f}")
+
+    t0 = time.perf_counter()
+    ivf = IndiceIVF(capacidad=len(vectores), n_listas=args.n_listas, min_entrenamiento=len(vectores))
+    ivf.agregar(vectores)
+    print(f"  (IVF entrenado en {time.perf_counter() - t0:.1f}s con {len(ivf.centroides)} listas)")
+
+    for n_probe in args.n_probe:
+        ivf.n_probe = n_probe
+        aproximados, lat = medir(ivf, consultas, args.k)
+        print(f"{f'ivf n_probe={n_probe}':<18}{acierto(aproximados, objetivo):>10.3f}{recall(exactos, aproximados, 1):>10.3f}{recall(exactos, aproximados, args.k):>10.3f}"
+              f"{np.percentile(lat, 50):>10.3f}{np.percentile(lat, 95):>10.3f}{1000 / lat.mean():>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Benchmark offline del pipeline de reconocimiento (sin cámara).
+
+Reproduce un vídeo o una carpeta de imágenes por el mismo camino que la app
+(CameraUtils: detección -> alineado -> features -> match contra la galería)
+y mide la latencia de cada etapa, los frames/s y la memoria. La galería se
+rellena con embeddings sintéticos para probar distintos tamaños.
+
+    python benchmarks/bench_pipeline.py --video entrada.mp4 --galeria 1000 100000 --indice plano ivf
+    python benchmarks/bench_pipeline.py --imagenes fotos/ --detector-ancho 640 --hilos 1 4
+"""
+import sys
+import os
+import time
+import json
+import argparse
+import resource
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import cv2
+import numpy as np
+from src.utils.camera_utils import CameraUtils
+from src.utils.galeria import GaleriaRostros
+
+ETAPAS = ("deteccion", "alineado", "features", "match", "total")
+
+
+def cargar_frames(video=None, carpeta=None, max_frames=300):
+    """Carga los frames en memoria una vez para que todas las configuraciones vean la misma entrada."""
+    frames = []
+    if video:
+        cap = cv2.VideoCapture(video)
+        while len(frames) < max_frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+        cap.release()
+    else:
+        for fichero in sorted(os.listdir(carpeta)):
+            if len(frames) >= max_frames:
+                break
+            frame = cv2.imread(os.path.join(carpeta, fichero))
+            if frame is not None:
+                frames.append(frame)
+    return frames
+
+
+def galeria_sintetica(n, tipo, semilla=0, precision="float32"):
+    rng = np.random.default_rng(semilla)
+    galeria = GaleriaRostros.crear(tipo, precision=precision)
+    lote = 50_000
+    for inicio in range(0, n, lote):
+        fin = min(n, inicio + lote)
+        galeria.agregar_lote(rng.standard_normal((fin - inicio, GaleriaRostros.DIM)).astype(np.float32),
+                             [f"sintetico_{i}" for i in range(inicio, fin)], list(range(inicio, fin)))
+    return galeria
+
+
+def detectar(frame, ancho):
+    """Detección con la entrada reducida a `ancho` px (None = resolución original)."""
+    if not ancho or frame.shape[1] <= ancho:
+        return CameraUtils.detectar_rostros(frame)
+    escala = ancho / frame.shape[1]
+    pequeno = cv2.resize(frame, None, fx=escala, fy=escala, interpolation=cv2.INTER_AREA)
+    faces = CameraUtils.detectar_rostros(pequeno).copy()
+    faces[:, :14] /= escala
+    return faces
+
+
+def ejecutar(frames, galeria, detector_ancho):
+    """Pasa todos los frames por el pipeline. Retorna {etapa: latencias_ms} y el nº de rostros."""
+    tiempos = {etapa: [] for etapa in ETAPAS}
+    rostros = 0
+    for frame in frames:
+        t0 = time.perf_counter()
+        faces = detectar(frame, detector_ancho)
+        t1 = time.perf_counter()
+        alineados = CameraUtils.alinear_rostros(frame, faces) if len(faces) else []
+        t2 = time.perf_counter()
+        encodings = CameraUtils.extraer_features(alineados)
+        t3 = time.perf_counter()
+        if len(encodings):
+            galeria.buscar_lote(encodings, k=1)
+        t4 = time.perf_counter()
+
+        rostros += len(faces)
+        for etapa, ms in zip(ETAPAS, ((t1 - t0), (t2 - t1), (t3 - t2), (t4 - t3), (t4 - t0))):
+            tiempos[etapa].append(ms * 1000)
+    return tiempos, rostros
+
+
+def resumir(tiempos):
+    resumen = {}
+    for etapa, valores in tiempos.items():
+        valores = np.array(valores)
+        resumen[etapa] = {
+            "p50": float(np.percentile(valores, 50)),
+            "p95": float(np.percentile(valores, 95)),
+            "p99": float(np.percentile(valores, 99)),
+            "media": float(valores.mean()),
+        }
+    return resumen
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline detección -> alineado -> features -> match")
+    fuente = parser.add_mutually_exclusive_group(required=True)
+    fuente.add_argument("--video", help="Fichero de vídeo a reproducir")
+    fuente.add_argument("--imagenes", help="Carpeta de imágenes")
+    parser.add_argument("--max-frames", type=int, default=300)
+    parser.add_argument("--galeria", type=int, nargs="+", default=[1000, 10_000, 100_000], help="Tamaños de galería sintética")
+    parser.add_argument("--indice", nargs="+", default=["plano"], help="Backends de índice (plano, ivf)")
+    parser.add_argument("--precision", default="float32", help="Almacenamiento de la galería (float32, float16, int8)")
+    parser.add_argument("--detector-ancho", type=int, nargs="+", default=[0], help="Ancho de entrada de YuNet (0 = original)")
+    parser.add_argument("--hilos", type=int, nargs="+", default=[0], help="cv2.setNumThreads (0 = por defecto de OpenCV)")
+    parser.add_argument("--json", help="Guardar los resultados en este fichero")
+    args = parser.parse_args()
+
+    frames = cargar_frames(args.video, args.imagenes, args.max_frames)
+    if not frames:
+        print("❌ No se pudo leer ningún frame.")
+        return
+    print(f"Frames cargados: {len(frames)} ({frames[0].shape[1]}x{frames[0].shape[0]})")
+    CameraUtils.initialize_models()
+
+    resultados = []
+    for hilos in args.hilos:
+        if hilos:
+            cv2.setNumThreads(hilos)
+        for tipo in args.indice:
+            for n in args.galeria:
+                galeria = galeria_sintetica(n, tipo, precision=args.precision)
+                for ancho in args.detector_ancho:
+                    # Un frame de calentamiento para no medir la inicialización de OpenCV
+                    ejecutar(frames[:1], galeria, ancho)
+                    t0 = time.perf_counter()
+                    tiempos, rostros = ejecutar(frames, galeria, ancho)
+                    segundos = time.perf_counter() - t0
+
+                    resultado = {
+                        "hilos": hilos or cv2.getNumThreads(),
+                        "indice": tipo,
+                        "galeria": n,
+                        "detector_ancho": ancho or frames[0].shape[1],
+                        "frames": len(frames),
+                        "rostros": rostros,
+                        "fps": len(frames) / segundos,
+                        "precision": args.precision,
+                        "galeria_mb": galeria.nbytes / 2**20,
+                        # ru_maxrss está en KB en Linux
+                        "rss_max_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                        "etapas": resumir(tiempos),
+                    }
+                    resultados.append(resultado)
+
+                    print(f"\nhilos={resultado['hilos']} índice={tipo} galería={n} detector={resultado['detector_ancho']}px "
+                          f"-> {resultado['fps']:.1f} fps, {rostros} rostros, "
+                          f"galería {resultado['galeria_mb']:.1f} MB, RSS máx {resultado['rss_max_mb']:.0f} MB")
+                    print(f"   {'etapa':<10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+                    for etapa, valores in resultado["etapas"].items():
+                        print(f"   {etapa:<10}{valores['p50']:>10.2f}{valores['p95']:>10.2f}{valores['p99']:>10.2f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2)
+        print(f"\nResultados guardados en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark de estrés del pool de modelos (identificación concurrente).
+
+Lanza N hilos que llaman a CameraUtils.identificar_todos() a la vez, como
+harían varias cámaras o logins simultáneos, con distintos tamaños de pool.
+Con pool=1 todas las peticiones se serializan sobre la misma instancia; con
+más instancias el rendimiento debería escalar hasta el nº de núcleos.
+
+    python benchmarks/bench_pool.py --imagenes fotos/ --hilos 1 2 4 8 --pool 1 2 4 8
+    python benchmarks/bench_pool.py --sintetico --peticiones 400
+"""
+import sys
+import os
+import time
+import json
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import cv2
+import numpy as np
+from src.utils.camera_utils import CameraUtils
+from bench_pipeline import cargar_frames, galeria_sintetica
+
+
+def frames_sinteticos(n=32, ancho=1280, alto=720, semilla=0):
+    """Frames de ruido: sin rostros, pero con el mismo coste de detección que un frame real."""
+    rng = np.random.default_rng(semilla)
+    return [rng.integers(0, 256, (alto, ancho, 3), dtype=np.uint8) for _ in range(n)]
+
+
+def ejecutar(frames, galeria, hilos, peticiones):
+    """Reparte `peticiones` identificaciones entre `hilos`. Retorna (segundos, latencias_ms)."""
+    def _identificar(i):
+        t0 = time.perf_counter()
+        CameraUtils.identificar_todos(frames[i % len(frames)], galeria)
+        return (time.perf_counter() - t0) * 1000
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        latencias = list(pool.map(_identificar, range(peticiones)))
+    return time.perf_counter() - t0, np.array(latencias)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Estrés del pool YuNet/SFace con hilos concurrentes")
+    fuente = parser.add_mutually_exclusive_group(required=True)
+    fuente.add_argument("--video", help="Fichero de vídeo")
+    fuente.add_argument("--imagenes", help="Carpeta de imágenes")
+    fuente.add_argument("--sintetico", action="store_true", help="Frames de ruido 1280x720")
+    parser.add_argument("--max-frames", type=int, default=64)
+    parser.add_argument("--peticiones", type=int, default=200, help="Identificaciones por configuración")
+    parser.add_argument("--hilos", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--pool", type=int, nargs="+", default=[1, 2, 4, 8], help="Tamaños de pool")
+    parser.add_argument("--galeria", type=int, default=1000)
+    parser.add_argument("--cv-hilos", type=int, default=1, help="cv2.setNumThreads (1 = el paralelismo lo da el pool)")
+    parser.add_argument("--json", help="Guardar los resultados en este fichero")
+    args = parser.parse_args()
+
+    if args.sintetico:
+        frames = frames_sinteticos(args.max_frames)
+    else:
+        frames = cargar_frames(args.video, args.imagenes, args.max_frames)
+    if not frames:
+        print("❌ No se pudo leer ningún frame.")
+        return
+    print(f"Frames: {len(frames)} ({frames[0].shape[1]}x{frames[0].shape[0]}), núcleos: {os.cpu_count()}")
+
+    cv2.setNumThreads(args.cv_hilos)
+    galeria = galeria_sintetica(args.galeria, "plano")
+
+    resultados = []
+    print(f"\n{'pool':>5}{'hilos':>7}{'peticiones/s':>14}{'p50 ms':>10}{'p95 ms':>10}{'escala':>8}")
+    for tamano in args.pool:
+        CameraUtils.initialize_models(tamano)
+        # Crear todas las instancias antes de medir (la carga no es parte del rendimiento)
+        CameraUtils.pool.precargar(tamano)
+        base = None
+        for hilos in args.hilos:
+            ejecutar(frames, galeria, hilos, hilos)  # calentamiento
+            segundos, latencias = ejecutar(frames, galeria, hilos, args.peticiones)
+            rps = args.peticiones / segundos
+            base = base or rps
+            resultado = {
+                "pool": tamano,
+                "hilos": hilos,
+                "peticiones": args.peticiones,
+                "rps": rps,
+                "p50": float(np.percentile(latencias, 50)),
+                "p95": float(np.percentile(latencias, 95)),
+                "escala": rps / base,
+            }
+            resultados.append(resultado)
+            print(f"{tamano:>5}{hilos:>7}{rps:>14.1f}{resultado['p50']:>10.2f}{resultado['p95']:>10.2f}{resultado['escala']:>7.2f}x")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2)
+        print(f"\nResultados guardados en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
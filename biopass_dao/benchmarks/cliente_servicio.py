@@ -0,0 +1,110 @@
+"""
+Cliente de carga para src/servicio_reconocimiento.py.
+
+Lanza peticiones concurrentes (imágenes o features sintéticos) contra el
+servicio local y mide consultas/s, la latencia vista por el cliente y la
+que informa el servidor (cola + proceso) junto con el tamaño de lote.
+
+    python benchmarks/cliente_servicio.py --features --concurrencia 1 8 32 --peticiones 2000
+    python benchmarks/cliente_servicio.py --imagenes fotos/ --concurrencia 4 16
+"""
+import os
+import time
+import json
+import argparse
+import http.client
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import numpy as np
+
+DIM = 128
+
+
+def cargar_cuerpos(carpeta=None, n_features=1, semilla=0):
+    """Cuerpos de petición ya serializados: ficheros de imagen tal cual, o features float32."""
+    if carpeta:
+        cuerpos = []
+        for fichero in sorted(os.listdir(carpeta)):
+            if fichero.lower().endswith((".jpg", ".jpeg", ".png")):
+                with open(os.path.join(carpeta, fichero), "rb") as f:
+                    cuerpos.append(f.read())
+        return "/identificar", "image/jpeg", cuerpos
+    rng = np.random.default_rng(semilla)
+    cuerpos = [rng.standard_normal((n_features, DIM)).astype(np.float32).tobytes() for _ in range(256)]
+    return "/features", "application/octet-stream", cuerpos
+
+
+def ejecutar(url, ruta, tipo, cuerpos, concurrencia, peticiones):
+    """Reparte las peticiones entre `concurrencia` hilos, cada uno con su conexión keep-alive."""
+    destino = urlparse(url)
+    local = threading.local()
+
+    def _enviar(i):
+        conexion = getattr(local, "conexion", None)
+        if conexion is None:
+            conexion = local.conexion = http.client.HTTPConnection(destino.hostname, destino.port)
+        t0 = time.perf_counter()
+        conexion.request("POST", ruta, body=cuerpos[i % len(cuerpos)], headers={"Content-Type": tipo})
+        respuesta = json.loads(conexion.getresponse().read())
+        respuesta["cliente_ms"] = (time.perf_counter() - t0) * 1000
+        return respuesta
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+        respuestas = list(pool.map(_enviar, range(peticiones)))
+    return time.perf_counter() - t0, respuestas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de carga del servicio de reconocimiento")
+    parser.add_argument("--url", default="http://127.0.0.1:8765")
+    fuente = parser.add_mutually_exclusive_group(required=True)
+    fuente.add_argument("--imagenes", help="Carpeta de imágenes a enviar a /identificar")
+    fuente.add_argument("--features", action="store_true", help="Enviar features sintéticos a /features")
+    parser.add_argument("--rostros", type=int, default=1, help="Features por petición (con --features)")
+    parser.add_argument("--concurrencia", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--peticiones", type=int, default=1000)
+    parser.add_argument("--json", help="Guardar los resultados en este fichero")
+    args = parser.parse_args()
+
+    ruta, tipo, cuerpos = cargar_cuerpos(args.imagenes, args.rostros)
+    if not cuerpos:
+        print("❌ No hay nada que enviar.")
+        return
+
+    resultados = []
+    print(f"{'concurrencia':>12}{'qps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'cola p50':>10}{'lote medio':>12}")
+    for concurrencia in args.concurrencia:
+        ejecutar(args.url, ruta, tipo, cuerpos, concurrencia, concurrencia)  # calentamiento
+        segundos, respuestas = ejecutar(args.url, ruta, tipo, cuerpos, concurrencia, args.peticiones)
+        errores = sum(1 for r in respuestas if "error" in r)
+        validas = [r for r in respuestas if "error" not in r]
+        cliente = np.array([r["cliente_ms"] for r in validas])
+        cola = np.array([r["latencia_ms"]["cola"] for r in validas])
+        resultado = {
+            "concurrencia": concurrencia,
+            "peticiones": args.peticiones,
+            "errores": errores,
+            "qps": args.peticiones / segundos,
+            "p50": float(np.percentile(cliente, 50)),
+            "p95": float(np.percentile(cliente, 95)),
+            "p99": float(np.percentile(cliente, 99)),
+            "cola_p50": float(np.percentile(cola, 50)),
+            "lote_medio": float(np.mean([r["lote"] for r in validas])),
+        }
+        resultados.append(resultado)
+        print(f"{concurrencia:>12}{resultado['qps']:>10.1f}{resultado['p50']:>10.2f}{resultado['p95']:>10.2f}"
+              f"{resultado['p99']:>10.2f}{resultado['cola_p50']:>10.2f}{resultado['lote_medio']:>12.1f}")
+        if errores:
+            print(f"   ⚠️ {errores} peticiones con error")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2)
+        print(f"\nResultados guardados en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
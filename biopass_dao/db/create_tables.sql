@@ -3,5 +3,25 @@ CREATE TABLE usuarios (
     id SERIAL PRIMARY KEY,
     nombre VARCHAR(100) NOT NULL,
     foto_cara BYTEA NOT NULL, -- La foto recortada para entrenamiento
+    encoding BYTEA, -- Features SFace (128 float32)
+    modelo_hash VARCHAR(64), -- Version de los modelos que genero el encoding
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
+
+-- Registro de bajas: las instancias de BioPass lo consultan para quitar
+-- usuarios de su galería sin recargar la tabla completa
+CREATE TABLE usuarios_borrados (
+    seq SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    borrado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE FUNCTION registrar_baja_usuario() RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO usuarios_borrados (user_id) VALUES (OLD.id);
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER usuarios_baja AFTER DELETE ON usuarios
+    FOR EACH ROW EXECUTE FUNCTION registrar_baja_usuario();
@@ -0,0 +1,59 @@
+import threading
+from src.usuario_dao import UsuarioDAO
+from src.utils.camera_utils import CameraUtils
+
+
+class BackfillEncodings(threading.Thread):
+    """
+    Hilo en segundo plano que recalcula los encodings que faltan o que se
+    generaron con otra versión de los modelos (modelo_hash distinto).
+
+    Cada usuario recalculado se guarda en BD y se añade a la galería en
+    cuanto está listo, así la app arranca sin esperar a la inferencia DNN.
+    """
+
+    def __init__(self, galeria, modelo_hash=None, al_terminar=None):
+        super().__init__(daemon=True)
+        self.galeria = galeria
+        self.modelo_hash = modelo_hash or CameraUtils.modelo_hash()
+        self.al_terminar = al_terminar
+        self.procesados = 0
+        self.fallidos = []
+        self._detener = threading.Event()
+
+    def detener(self, timeout=None):
+        """Pide parar y, con timeout, espera a que termine el usuario en curso."""
+        self._detener.set()
+        if timeout is not None and self.is_alive():
+            self.join(timeout)
+
+    def run(self):
+        pendientes = UsuarioDAO.obtener_pendientes(self.modelo_hash)
+        if not pendientes:
+            return
+        print(f"Backfill: recalculando {len(pendientes)} encodings pendientes...")
+
+        for user_id, nombre, foto_bytes in pendientes:
+            if self._detener.is_set():
+                break
+
+            imagen = CameraUtils.bytes_a_imagen(foto_bytes)
+            encoding = CameraUtils.encoding_desde_foto(imagen) if imagen is not None else None
+            if encoding is None:
+                # Ya no se descarta en silencio: queda registrado para revisarlo
+                self.fallidos.append((user_id, nombre))
+                print(f"⚠️ Backfill: no se pudo obtener el rostro de '{nombre}' (id={user_id})")
+                continue
+
+            try:
+                UsuarioDAO.actualizar_encoding(user_id, CameraUtils.encoding_a_bytes(encoding), self.modelo_hash)
+            except RuntimeError as e:
+                # La BD se cerró mientras se calculaba este encoding
+                print(f"⚠️ Backfill interrumpido: {e}")
+                break
+            self.galeria.agregar(encoding, nombre, user_id)
+            self.procesados += 1
+
+        print(f"✅ Backfill terminado. Recalculados: {self.procesados} (Fallidos: {len(self.fallidos)})")
+        if self.al_terminar:
+            self.al_terminar(self)
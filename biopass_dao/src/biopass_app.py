@@ -13,8 +13,17 @@ import tkinter as tk
 from tkinter import messagebox
 import cv2
 from PIL import Image, ImageTk
+from src.config import Config
+from src.conexion_db import DBConnection
 from src.usuario_dao import UsuarioDAO
+from src.backfill_encodings import BackfillEncodings
+from src.carga_galeria import cargar_galeria
+from src.sincronizacion_galeria import SincronizadorGaleria
+from src.utils.buffer_frames import BufferFrames
 from src.utils.camera_utils import CameraUtils
+from src.utils.fuente_video import SondeoCamaras, FuenteArchivo, FuenteSintetica
+from src.utils.galeria import GaleriaRostros
+from src.utils.reconocimiento_vivo import ReconocimientoEnVivo
 
 # Configurar salida UTF-8 para Windows
 sys.stdout.reconfigure(encoding='utf-8')
@@ -27,19 +36,22 @@ class BioPassApp:
         self.root.geometry("800x700")
         self.root.resizable(False, False)
         
-        self.frame_actual = None
-        self.lock = threading.Lock()
+        # Frames publicados por el hilo de captura (preview 640x480 ya preparada)
+        self.frames = BufferFrames(640, 480)
+        self.seq_mostrado = 0
         self.running = True
         self.camara_iniciada = False
         
         self.photo = None  # Mantener referencia a la imagen
         
-        # Cache de rostros conocidos
-        self.known_face_encodings = []
-        self.known_face_names = []
+        # Cache de rostros conocidos (matriz de features normalizados)
+        self.galeria = GaleriaRostros.crear(Config.INDICE_TIPO, **Config.kwargs_indice())
+        self.ruta_indice = os.path.join(os.path.dirname(os.path.abspath(DBConnection.DB_FILE)), Config.INDICE_FILE)
+        self.backfill = None
+        self.sincronizador = None
         
         # Inicializar modelos DNN
-        CameraUtils.initialize_models()
+        CameraUtils.initialize_models(Config.POOL_MODELOS)
         
         # Cargar usuarios al iniciar
         try:
@@ -91,6 +103,15 @@ class BioPassApp:
         )
         btn_login.pack(side=tk.RIGHT, padx=15, expand=True)
         
+        # Modo en vivo (opcional): reconocimiento continuo en un hilo aparte
+        self.reconocimiento = None
+        self.modo_vivo = tk.BooleanVar(value=False)
+        tk.Checkbutton(
+            main_frame, text="Reconocimiento en vivo", variable=self.modo_vivo,
+            command=self.alternar_modo_vivo, bg="#2b2b2b", fg="white",
+            selectcolor="#2b2b2b", activebackground="#2b2b2b", font=("Arial", 11)
+        ).pack()
+        
         # Registrar evento de cierre de ventana
         self.root.protocol("WM_DELETE_WINDOW", self.cerrar_aplicacion)
         
@@ -102,142 +123,100 @@ class BioPassApp:
         self.actualizar_gui()
 
     def cargar_usuarios(self):
-        """Pre-carga los encodings de usuarios de la BD."""
+        """
+        Pre-carga los encodings de usuarios (índice guardado o una sola
+        consulta a la BD). Los usuarios sin encoding (o de otra versión del
+        modelo) se recalculan con BackfillEncodings. Después, las altas y
+        bajas hechas desde otros terminales se aplican con SincronizadorGaleria.
+        """
         print("Cargando usuarios existentes para caché...")
-        usuarios = UsuarioDAO.obtener_todos()
-        count = 0
-        errores = 0
-        
-        for user in usuarios:
-            user_id = user[0]
-            nombre = user[1]
-            foto_bytes = user[2]
-            
-            imagen = CameraUtils.bytes_a_imagen(foto_bytes)
-            if imagen is not None:
-                # Intentar detectar rostro en la imagen guardada para extraer features
-                face_data = CameraUtils.detectar_rostro(imagen)
-                if face_data is not None:
-                    encoding = CameraUtils.obtener_encoding(imagen, face_data)
-                    if encoding is not None:
-                        self.known_face_encodings.append(encoding)
-                        self.known_face_names.append(nombre)
-                        count += 1
-                else:
-                    # Si no detecta en el recorte, es problemático.
-                    errores += 1
-                    
-        print(f"✅ Se cargaron {count} usuarios. (Fallidos: {errores})")
+        # Antes de cargar: un cambio o una baja posterior a este punto nunca se pierde
+        ultimo_cambio = UsuarioDAO.ultimo_cambio()
+        ultima_baja = UsuarioDAO.ultima_baja()
+        self.galeria, modelo_hash = cargar_galeria(self.ruta_indice)
+        print(f"✅ Se cargaron {len(self.galeria)} usuarios (modelo {modelo_hash}).")
+
+        self.backfill = BackfillEncodings(self.galeria, modelo_hash)
+        self.backfill.start()
+        self.sincronizador = SincronizadorGaleria(self.galeria, modelo_hash, desde_cambio=ultimo_cambio,
+                                                  desde_baja=ultima_baja,
+                                                  intervalo=Config.SYNC_INTERVALO)
+        self.sincronizador.start()
+
+    def abrir_fuente(self):
+        """Fuente de video configurada: cámara (con sondeo rápido y caché), vídeo o sintética."""
+        if Config.VIDEO_FUENTE == "sintetica":
+            fuente = FuenteSintetica()
+        elif Config.VIDEO_FUENTE:
+            fuente = FuenteArchivo(Config.VIDEO_FUENTE)
+        else:
+            ruta_cache = os.path.join(os.path.dirname(os.path.abspath(DBConnection.DB_FILE)), Config.CAMARA_CACHE_FILE)
+            return SondeoCamaras(ruta_cache, cancelado=lambda: not self.running).buscar()
+
+        print(f"Usando fuente de video: {fuente.descripcion}")
+        return fuente if fuente.abrir() else None
 
     def video_loop(self):
         """Hilo dedicado a capturar frames de la cámara. Busca la mejor config."""
         print("Iniciando hilo de búsqueda de cámara...")
         
-        configs = [
-            (0, cv2.CAP_DSHOW, "Index 0 - DSHOW (Recomendado)"),
-            (0, cv2.CAP_MSMF, "Index 0 - MSMF"),
-            (0, cv2.CAP_ANY, "Index 0 - Automático"),
-            (1, cv2.CAP_DSHOW, "Index 1 - DSHOW"),
-            (1, cv2.CAP_ANY, "Index 1 - Automático"),
-        ]
+        fuente = self.abrir_fuente()
+        if fuente is None:
+            print("❌ No se encontró ninguna cámara funcional.")
+            if self.running:
+                self.root.after(0, lambda: self.texto_estado.config(text="❌ Error de Cámara\nNo detectada", fg="red"))
+            return
         
-        for idx, backend, nombre in configs:
-            if not self.running: break
-            
-            print(f"Probando configuración: {nombre}...")
-            try:
-                cap = cv2.VideoCapture(idx, backend)
-                
-                # Configurar resolución (COMENTADO: A veces fuerza pantalla negra en DSHOW)
-                # try:
-                #    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-                #    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-                # except:
-                #    pass
-                
-                if not cap.isOpened():
-                    print(f"❌ {nombre} no abrió.")
-                    cap.release()
-                    continue
-                
-                # Intentar "despertar" la cámara ajustando a HD (1280x720)
-                # Muchas cámaras modernas fallan en 640x480 por defecto con DSHOW
-                try:
-                    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-                    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
-                except:
-                    pass
-                    
-                # Intentar leer frames para estabilizar
-                print(f"   Leyendo frames de calentamiento para {nombre}...")
-                print(f"   Leyendo frames de calentamiento para {nombre}...")
-                frames_leidos = 0
-                for i in range(60):
-                    if not self.running: break
-                    ret, frame = cap.read()
-                    if ret and frame is not None:
-                        frames_leidos += 1
-                        # Debug cada 10 frames
-                        if i % 10 == 0:
-                            brillo = frame.mean()
-                            print(f"      Frame {i}: Brillo={brillo:.2f} (0=Negro, 255=Blanco)")
-                    time.sleep(0.05)
-                
-                # Si logramos leer frames, aceptamos la cámara (aunque se vea negra)
-                if frames_leidos > 0:
-                    print(f"✅ {nombre} ABIERTA CORRECTAMENTE. (Frames leídos: {frames_leidos})")
-                    self.camara_iniciada = True
-                    
-                    while self.running:
-                        ret, frame = cap.read()
-                        if ret and frame is not None:
-                            with self.lock:
-                                self.frame_actual = frame
-                        else:
-                            time.sleep(0.1)
-                    
-                    cap.release()
-                    return 
-                
-                else:
-                    print(f"⚠️ {nombre} dio video NEGRO o vacío.")
-                    cap.release()
-            
-            except Exception as e:
-                print(f"❌ Error probando {nombre}: {e}")
-                
-        print("❌ No se encontró ninguna cámara funcional.")
-        self.root.after(0, lambda: self.texto_estado.config(text="❌ Error de Cámara\nNo detectada", fg="red"))
+        self.camara_iniciada = True
+        while self.running:
+            ret, frame = fuente.leer()
+            if ret and frame is not None:
+                self.frames.publicar(frame)
+                reconocimiento = self.reconocimiento
+                if reconocimiento is not None:
+                    reconocimiento.enviar_frame(frame)
+            else:
+                time.sleep(0.1)
+        
+        fuente.liberar()
 
     def actualizar_gui(self):
         if self.camara_iniciada and self.texto_estado.winfo_viewable() and "Error" not in self.texto_estado.cget("text"):
              self.texto_estado.place_forget()
         
-        frame_copy = None
-        with self.lock:
-            if self.frame_actual is not None:
-                frame_copy = self.frame_actual.copy()
+        # Solo se redibuja si el hilo de captura publicó un frame nuevo
+        nuevo = self.frames.adquirir_preview(self.seq_mostrado)
         
-        if frame_copy is not None:
-            # Dibujar rectangulo si detecta rostro (opcional, para feedback visual)
-            # Solo para visualización en tiempo real puede ser costoso hacerlo en cada frame en python puro,
-            # pero intentaremos detectar cada 5 frames o si no es muy lento.
+        if nuevo is not None:
+            self.seq_mostrado, preview, escala = nuevo
             # Por rendimiento, NO detectamos en el loop de GUI. Solo mostramos video.
             
-            frame_rgb = cv2.cvtColor(frame_copy, cv2.COLOR_BGR2RGB)
-            imagen_pil = Image.fromarray(frame_rgb)
-            self.photo = ImageTk.PhotoImage(image=imagen_pil)
-            self.label_video.config(image=self.photo)
-            self.label_video.image = self.photo
+            reconocimiento = self.reconocimiento
+            if reconocimiento is not None:
+                # Solo se dibujan los resultados ya calculados: la GUI nunca espera a la detección.
+                # La preview es RGB y está reducida: colores en RGB y cajas escaladas.
+                for bbox, nombre, score in reconocimiento.obtener_overlays():
+                    x, y, w, h = (int(v * escala) for v in bbox)
+                    color = (0, 200, 0) if nombre not in ("Desconocido", "Sin usuarios", "...") else (255, 0, 0)
+                    cv2.rectangle(preview, (x, y), (x + w, y + h), color, 2)
+                    cv2.putText(preview, f"{nombre} {score:.2f}", (x, max(20, y - 8)),
+                                cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+            
+            imagen_pil = Image.fromarray(preview)
+            if self.photo is not None and (self.photo.width(), self.photo.height()) == imagen_pil.size:
+                # Reutilizar la imagen de Tk en vez de crear un PhotoImage nuevo por frame
+                self.photo.paste(imagen_pil)
+            else:
+                self.photo = ImageTk.PhotoImage(image=imagen_pil)
+                self.label_video.config(image=self.photo)
+                self.label_video.image = self.photo
         
         if self.running:
             self.root.after(30, self.actualizar_gui)
 
     def registrar_usuario(self):
-        frame_procesar = None
-        with self.lock:
-            if self.frame_actual is not None:
-                frame_procesar = self.frame_actual.copy()
+        # Los frames publicados no se modifican después: se usan sin copiar
+        frame_procesar = self.frames.frame_actual()
                 
         if frame_procesar is None:
             messagebox.showerror("Error", "La cámara no está lista o no disponible")
@@ -263,9 +242,11 @@ class BioPassApp:
                 cara_bytes = CameraUtils.convertir_a_bytes(cara_recortada)
                 
                 if cara_bytes:
-                    UsuarioDAO.registrar_usuario(nombre, cara_bytes)
-                    self.known_face_encodings.append(encoding)
-                    self.known_face_names.append(nombre)
+                    user_id = UsuarioDAO.registrar_usuario(
+                        nombre, cara_bytes,
+                        CameraUtils.encoding_a_bytes(encoding), CameraUtils.modelo_hash()
+                    )
+                    self.galeria.agregar(encoding, nombre, user_id)
                     
                     messagebox.showinfo("Éxito", f"✓ Usuario '{nombre}' registrado correctamente")
                     self.entry_nombre.delete(0, tk.END)
@@ -277,41 +258,60 @@ class BioPassApp:
             messagebox.showerror("Error", "No se detectó ningún rostro.\n\nAsegúrate de estar bien iluminado y frente a la cámara.")
 
     def login_usuario(self):
-        frame_procesar = None
-        with self.lock:
-            if self.frame_actual is not None:
-                frame_procesar = self.frame_actual.copy()
+        # Los frames publicados no se modifican después: se usan sin copiar
+        frame_procesar = self.frames.frame_actual()
 
         if frame_procesar is None:
             messagebox.showerror("Error", "La cámara no está lista o no disponible")
             return
         
-        if not self.known_face_encodings:
+        if len(self.galeria) == 0:
             messagebox.showwarning("Sin usuarios", "No hay usuarios registrados o cargados.")
             return
 
         print("Intentando login...")
         
-        face_data = CameraUtils.detectar_rostro(frame_procesar)
+        # Se identifica a todas las personas frente a la cámara en una sola pasada
+        resultados = CameraUtils.identificar_todos(frame_procesar, self.galeria)
         
-        if face_data is not None:
-            encoding_actual = CameraUtils.obtener_encoding(frame_procesar, face_data)
+        if resultados:
+            for bbox, nombre, score in resultados:
+                print(f"Rostro en {bbox}: {nombre} (score={score:.3f})")
             
-            if encoding_actual is not None:
-                nombre = CameraUtils.comparar_rostro_con_bd(self.known_face_encodings, self.known_face_names, encoding_actual)
-                
-                if nombre != "Desconocido":
-                    messagebox.showinfo("✓ Bienvenido", f"Acceso concedido:\n\n{nombre}")
-                else:
-                    messagebox.showerror("❌ Acceso Denegado", "Usuario no reconocido")
+            reconocidos = [nombre for _, nombre, _ in resultados if nombre != "Desconocido"]
+            if reconocidos:
+                messagebox.showinfo("✓ Bienvenido", "Acceso concedido:\n\n" + "\n".join(reconocidos))
             else:
-                 messagebox.showerror("Error", "No se pudo leer el rostro correctamente.")
+                messagebox.showerror("❌ Acceso Denegado", "Usuario no reconocido")
         else:
             messagebox.showerror("Error", "No se detectó ningún rostro.\n\nAsegúrate de estar frente a la cámara.")
     
+    def alternar_modo_vivo(self):
+        """Arranca o detiene el hilo de reconocimiento continuo."""
+        if self.modo_vivo.get():
+            if self.reconocimiento is None:
+                self.reconocimiento = ReconocimientoEnVivo(self.galeria)
+                self.reconocimiento.start()
+        elif self.reconocimiento is not None:
+            self.reconocimiento.detener()
+            self.reconocimiento = None
+
     def cerrar_aplicacion(self):
         print("Cerrando aplicación...")
         self.running = False
+        if self.reconocimiento is not None:
+            self.reconocimiento.detener()
+        if self.backfill is not None:
+            # Antes de cerrar la BD: un encoding escrito después se perdería
+            self.backfill.detener(timeout=5)
+        if self.sincronizador is not None:
+            self.sincronizador.detener()
+        try:
+            self.galeria.guardar(self.ruta_indice, CameraUtils.modelo_hash())
+        except Exception as e:
+            print(f"⚠️ No se pudo guardar el índice: {e}")
+        # Confirmar las escrituras pendientes (p.ej. encodings del backfill)
+        DBConnection.cerrar()
         self.root.after(500, self.root.destroy)
 
 
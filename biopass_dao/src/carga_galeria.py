@@ -0,0 +1,35 @@
+import numpy as np
+from src.config import Config
+from src.usuario_dao import UsuarioDAO
+from src.utils.camera_utils import CameraUtils
+from src.utils.galeria import GaleriaRostros
+
+
+def cargar_galeria(ruta_indice, modelo_hash=None):
+    """
+    Carga la galería de rostros para el modelo actual. Retorna (galeria, modelo_hash).
+
+    Si el índice guardado en `ruta_indice` está al día (mismo modelo, tipo,
+    cantidad e id máximo que la BD) se usa directamente (evita reentrenar un
+    índice IVF). Si no, se leen los encodings de la BD en una sola consulta.
+    Los usuarios sin encoding quedan para BackfillEncodings.
+    """
+    modelo_hash = modelo_hash or CameraUtils.modelo_hash()
+    total, max_id = UsuarioDAO.obtener_resumen(modelo_hash)
+
+    galeria, hash_guardado = GaleriaRostros.cargar(ruta_indice, **Config.kwargs_indice())
+    if (galeria is not None and hash_guardado == modelo_hash
+            and galeria.indice.tipo == Config.INDICE_TIPO
+            and len(galeria) == total
+            and galeria.max_id() == max_id):
+        print(f"Índice '{Config.INDICE_TIPO}' cargado desde {ruta_indice}")
+        return galeria, modelo_hash
+
+    galeria = GaleriaRostros.crear(Config.INDICE_TIPO, **Config.kwargs_indice())
+    usuarios = UsuarioDAO.obtener_encodings(modelo_hash)
+    if usuarios:
+        ids = [user[0] for user in usuarios]
+        nombres = [user[1] for user in usuarios]
+        encodings = np.vstack([CameraUtils.bytes_a_encoding(user[2]) for user in usuarios])
+        galeria.agregar_lote(encodings, nombres, ids)
+    return galeria, modelo_hash
@@ -1,20 +1,156 @@
 import sqlite3
 import os
+import queue
+import threading
+from concurrent.futures import Future
+
+
+class EscritorDB(threading.Thread):
+    """
+    Único hilo que escribe en SQLite.
+
+    Las escrituras llegan como funciones f(cursor) a una cola. El hilo junta
+    las que haya pendientes (hasta `max_lote`) y las ejecuta en una sola
+    transacción, cada una dentro de su SAVEPOINT: si una falla solo se
+    deshace esa, y el resto se confirma con un único COMMIT.
+    """
+
+    def __init__(self, db_file, max_lote=256):
+        super().__init__(daemon=True, name="EscritorDB")
+        self.db_file = db_file
+        self.max_lote = max_lote
+        self.cola = queue.Queue()
+
+    def run(self):
+        # isolation_level=None: las transacciones se controlan a mano (BEGIN/COMMIT)
+        conn = DBConnection.abrir(self.db_file, isolation_level=None)
+        while True:
+            tarea = self.cola.get()
+            if tarea is None:
+                break
+            lote = [tarea]
+            while len(lote) < self.max_lote:
+                try:
+                    tarea = self.cola.get_nowait()
+                except queue.Empty:
+                    break
+                if tarea is None:
+                    self.cola.put(None)  # procesar este lote y salir después
+                    break
+                lote.append(tarea)
+            self._ejecutar_lote(conn, lote)
+        conn.close()
+
+    @staticmethod
+    def _ejecutar_lote(conn, lote):
+        cursor = conn.cursor()
+        resultados = []
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            for funcion, futuro in lote:
+                cursor.execute("SAVEPOINT escritura")
+                try:
+                    resultados.append((futuro, funcion(cursor), None))
+                    cursor.execute("RELEASE escritura")
+                except Exception as e:
+                    cursor.execute("ROLLBACK TO escritura")
+                    cursor.execute("RELEASE escritura")
+                    resultados.append((futuro, None, e))
+            cursor.execute("COMMIT")
+        except Exception as e:
+            if conn.in_transaction:
+                conn.rollback()
+            for _, futuro in lote:
+                futuro.set_exception(e)
+            return
+
+        # Los futuros se resuelven después del COMMIT: quien espera ya puede leer el dato
+        for futuro, resultado, error in resultados:
+            if error is not None:
+                futuro.set_exception(error)
+            else:
+                futuro.set_result(resultado)
+
 
 class DBConnection:
-    _connection = None
+    """
+    Acceso a SQLite seguro entre hilos (GUI, video, backfill, servicios).
+
+    - Lecturas: cada hilo tiene su propia conexión (get_connection()).
+    - Escrituras: siempre por escribir(), que las manda al único EscritorDB.
+    - WAL: los lectores no bloquean al escritor ni al revés.
+    """
+
     DB_FILE = "biopass.db"
+    PRAGMAS = (
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",   # seguro con WAL y mucho más rápido que FULL
+        "PRAGMA busy_timeout=5000",
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA cache_size=-16000",    # ~16 MB
+        "PRAGMA foreign_keys=ON",
+    )
+
+    _local = threading.local()
+    _escritor = None
+    _lock = threading.Lock()
+    # Tras cerrar() no se aceptan escrituras: se perderían al salir
+    _cerrado = False
+
+    @classmethod
+    def abrir(cls, db_file, **kwargs):
+        """Abre una conexión nueva con los PRAGMAs de BioPass."""
+        try:
+            conn = sqlite3.connect(db_file, **kwargs)
+            for pragma in cls.PRAGMAS:
+                conn.execute(pragma)
+            return conn
+        except Exception as e:
+            print(f"Error de conexión SQLite: {e}")
+            raise e
 
     @classmethod
     def get_connection(cls):
-        if cls._connection is None:
-            try:
-                # Conectar a SQLite (crea el archivo si no existe)
-                cls._connection = sqlite3.connect(cls.DB_FILE, check_same_thread=False)
-                # check_same_thread=False para permitir acceso desde hilos (GUI + Video)
-                
-            except Exception as e:
-                print(f"Error de conexión SQLite: {e}")
-                raise e
-        
-        return cls._connection
+        """Conexión de lectura propia del hilo que llama."""
+        conn = getattr(cls._local, "conexion", None)
+        if conn is None or cls._local.db_file != cls.DB_FILE:
+            conn = cls.abrir(cls.DB_FILE)
+            cls._local.conexion = conn
+            cls._local.db_file = cls.DB_FILE
+        return conn
+
+    @classmethod
+    def _obtener_escritor(cls):
+        with cls._lock:
+            if cls._cerrado:
+                raise RuntimeError("DBConnection está cerrada: no se aceptan más escrituras")
+            if cls._escritor is None or not cls._escritor.is_alive() or cls._escritor.db_file != cls.DB_FILE:
+                if cls._escritor is not None and cls._escritor.is_alive():
+                    cls._escritor.cola.put(None)
+                cls._escritor = EscritorDB(cls.DB_FILE)
+                cls._escritor.start()
+            return cls._escritor
+
+    @classmethod
+    def escribir(cls, funcion, esperar=True):
+        """
+        Encola una escritura f(cursor) en el hilo escritor.
+        Con esperar=True bloquea hasta el COMMIT y retorna lo que devuelva f
+        (o lanza su excepción). Con esperar=False retorna el Future.
+        """
+        futuro = Future()
+        cls._obtener_escritor().cola.put((funcion, futuro))
+        return futuro.result() if esperar else futuro
+
+    @classmethod
+    def cerrar(cls):
+        """
+        Vacía la cola de escrituras y detiene el hilo escritor. Las escrituras
+        posteriores lanzan RuntimeError: detener antes los hilos que escriben.
+        """
+        with cls._lock:
+            cls._cerrado = True
+            if cls._escritor is not None and cls._escritor.is_alive():
+                cls._escritor.cola.put(None)
+                cls._escritor.join()
+            cls._escritor = None
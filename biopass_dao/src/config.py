@@ -10,3 +10,30 @@ class Config:
     DB_USER = os.getenv('DB_USER')
     DB_PASSWORD = os.getenv('DB_PASSWORD')
     DB_PORT = os.getenv('DB_PORT')
+
+    # Índice de la galería de rostros: "plano" (exacto) o "ivf" (aproximado, galerías muy grandes)
+    INDICE_TIPO = os.getenv('BIOPASS_INDICE', 'plano')
+    INDICE_N_PROBE = int(os.getenv('BIOPASS_N_PROBE', '16'))
+    # Almacenamiento de los features en memoria: "float32", "float16" o "int8" (menos memoria por terminal)
+    INDICE_PRECISION = os.getenv('BIOPASS_PRECISION', 'float32')
+    # Se guarda junto a biopass.db
+    INDICE_FILE = os.getenv('BIOPASS_INDICE_FILE', 'biopass_indice.npz')
+
+    # Fuente de video: vacío = cámara; "sintetica" o la ruta de un vídeo para probar sin cámara
+    VIDEO_FUENTE = os.getenv('BIOPASS_VIDEO', '')
+    # Última configuración de cámara que funcionó (se prueba primero al arrancar)
+    CAMARA_CACHE_FILE = os.getenv('BIOPASS_CAMARA_CACHE', 'biopass_camara.json')
+
+    # Instancias YuNet/SFace en paralelo (logins y cámaras concurrentes)
+    POOL_MODELOS = int(os.getenv('BIOPASS_POOL_MODELOS', str(min(4, os.cpu_count() or 1))))
+
+    # Cada cuántos segundos se aplican las altas/bajas hechas desde otros terminales
+    SYNC_INTERVALO = float(os.getenv('BIOPASS_SYNC_SEGUNDOS', '2'))
+
+    @classmethod
+    def kwargs_indice(cls):
+        """Parámetros extra del backend de índice configurado."""
+        kwargs = {"precision": cls.INDICE_PRECISION}
+        if cls.INDICE_TIPO == "ivf":
+            kwargs["n_probe"] = cls.INDICE_N_PROBE
+        return kwargs
@@ -0,0 +1,188 @@
+"""
+Enrolamiento masivo sin GUI.
+
+Procesa una carpeta de fotos (o un manifiesto CSV) con YuNet + SFace en un
+pool de procesos (una instancia de los modelos por worker) y guarda usuarios
+y encodings en SQLite con executemany, en transacciones de LOTE_BD filas.
+Una imagen que falla (incluso con una excepción en el worker) solo se anota
+en la lista de fallidas; no deshace el resto del enrolamiento.
+
+Uso:
+    python src/enrolamiento_masivo.py fotos/                 # nombre = subcarpeta o nombre del fichero
+    python src/enrolamiento_masivo.py --manifest alta.csv     # columnas: ruta,nombre
+    python src/enrolamiento_masivo.py fotos/ --workers 8 --errores fallidos.csv
+"""
+import sys
+import os
+import csv
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Añadir el directorio raíz del proyecto al path para permitir imports absolutos (src.xxx)
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import cv2
+from src.conexion_db import DBConnection
+from src.usuario_dao import UsuarioDAO
+from src.utils.camera_utils import CameraUtils
+
+# Configurar salida UTF-8 para Windows
+sys.stdout.reconfigure(encoding='utf-8')
+
+EXTENSIONES = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+# Filas por transacción: el escritor de la BD queda libre entre lotes para otras escrituras
+LOTE_BD = 500
+
+
+def listar_carpeta(carpeta):
+    """
+    (ruta, nombre) de cada imagen de la carpeta. Si la foto está en una
+    subcarpeta, el nombre es la subcarpeta; si no, el nombre del fichero.
+    """
+    for raiz, _, ficheros in os.walk(carpeta):
+        for fichero in sorted(ficheros):
+            base, ext = os.path.splitext(fichero)
+            if ext.lower() not in EXTENSIONES:
+                continue
+            ruta = os.path.join(raiz, fichero)
+            if os.path.abspath(raiz) == os.path.abspath(carpeta):
+                nombre = base.replace("_", " ")
+            else:
+                nombre = os.path.basename(raiz)
+            yield ruta, nombre
+
+
+def leer_manifiesto(ruta_csv):
+    """(ruta, nombre) de un CSV con cabecera ruta,nombre. Rutas relativas al CSV."""
+    base = os.path.dirname(os.path.abspath(ruta_csv))
+    with open(ruta_csv, newline="", encoding="utf-8") as f:
+        for fila in csv.DictReader(f):
+            yield os.path.join(base, fila["ruta"]), fila["nombre"].strip()
+
+
+def _inicializar_worker():
+    """Cada proceso del pool carga su propia instancia de YuNet/SFace."""
+    cv2.setNumThreads(1)  # el paralelismo ya lo da el pool de procesos
+    CameraUtils.initialize_models(tamano_pool=1)
+
+
+def procesar_imagen(tarea):
+    """
+    Se ejecuta en el worker. Retorna (ruta, nombre, cara_bytes, encoding_bytes, error).
+    Una excepción (p.ej. cv2.error en YuNet/SFace) se devuelve como error de esa imagen.
+    """
+    ruta, nombre = tarea
+    try:
+        return _procesar_imagen(ruta, nombre)
+    except Exception as e:
+        return ruta, nombre, None, None, f"{type(e).__name__}: {e}"
+
+
+def _procesar_imagen(ruta, nombre):
+    imagen = cv2.imread(ruta)
+    if imagen is None:
+        return ruta, nombre, None, None, "no se pudo leer la imagen"
+
+    face_data = CameraUtils.detectar_rostro(imagen)
+    if face_data is None:
+        return ruta, nombre, None, None, "no se detectó ningún rostro"
+
+    encoding = CameraUtils.obtener_encoding(imagen, face_data)
+    if encoding is None:
+        return ruta, nombre, None, None, "no se pudo extraer el encoding"
+
+    cara_bytes = CameraUtils.convertir_a_bytes(CameraUtils.recortar_rostro_visual(imagen, face_data))
+    if cara_bytes is None:
+        return ruta, nombre, None, None, "no se pudo codificar el recorte"
+
+    return ruta, nombre, cara_bytes, CameraUtils.encoding_a_bytes(encoding), None
+
+
+def enrolar(tareas, workers=None, chunksize=16, lote_bd=LOTE_BD):
+    """
+    Enrola todas las tareas (ruta, nombre). Retorna (insertados, fallidos, segundos)
+    con fallidos = [(ruta, nombre, error), ...].
+    """
+    modelo_hash = CameraUtils.modelo_hash()
+    fallidos = []
+    inicio = time.perf_counter()
+    procesadas = 0
+    insertados = 0
+    pendientes = []  # ((ruta, nombre), fila) aún sin insertar
+
+    def insertar():
+        nonlocal insertados
+        n = UsuarioDAO.registrar_lote([fila for _, fila in pendientes])
+        if n == len(pendientes):
+            insertados += n
+        else:
+            # La transacción del lote se deshizo: sus imágenes cuentan como fallidas
+            fallidos.extend((ruta, nombre, "error al guardar en la BD") for (ruta, nombre), _ in pendientes)
+        pendientes.clear()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_inicializar_worker) as pool:
+        try:
+            for ruta, nombre, cara_bytes, encoding_bytes, error in pool.map(procesar_imagen, tareas, chunksize=chunksize):
+                procesadas += 1
+                if error:
+                    fallidos.append((ruta, nombre, error))
+                else:
+                    pendientes.append(((ruta, nombre), (nombre, cara_bytes, encoding_bytes, modelo_hash)))
+                    if len(pendientes) >= lote_bd:
+                        insertar()
+                if procesadas % 500 == 0:
+                    transcurrido = time.perf_counter() - inicio
+                    print(f"   {procesadas} imágenes ({procesadas / transcurrido:.1f} img/s)...")
+        except BrokenProcessPool as e:
+            # Un worker murió (p.ej. falta de memoria): lo ya procesado se guarda, el resto falla
+            print(f"❌ El pool de procesos se rompió tras {procesadas} imágenes: {e}")
+            fallidos.extend((ruta, nombre, "pool de procesos roto") for ruta, nombre in tareas[procesadas:])
+    if pendientes:
+        insertar()
+
+    return insertados, fallidos, time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Enrolamiento masivo de usuarios en BioPass")
+    parser.add_argument("carpeta", nargs="?", help="Carpeta con fotos (una persona por fichero o por subcarpeta)")
+    parser.add_argument("--manifest", help="CSV con columnas ruta,nombre (alternativa a la carpeta)")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos del pool (por defecto, núcleos de la CPU)")
+    parser.add_argument("--db", default=DBConnection.DB_FILE, help="Fichero SQLite destino")
+    parser.add_argument("--errores", help="CSV donde volcar las imágenes fallidas")
+    args = parser.parse_args()
+
+    if not args.carpeta and not args.manifest:
+        parser.error("Indica una carpeta o --manifest")
+
+    DBConnection.DB_FILE = args.db
+    tareas = list(leer_manifiesto(args.manifest) if args.manifest else listar_carpeta(args.carpeta))
+    if not tareas:
+        print("No se encontraron imágenes.")
+        return
+
+    print(f"Enrolando {len(tareas)} imágenes con {args.workers or os.cpu_count()} workers...")
+    insertados, fallidos, segundos = enrolar(tareas, args.workers)
+    DBConnection.cerrar()
+
+    for ruta, nombre, error in fallidos:
+        print(f"❌ {ruta} ({nombre}): {error}")
+    if args.errores and fallidos:
+        with open(args.errores, "w", newline="", encoding="utf-8") as f:
+            escritor = csv.writer(f)
+            escritor.writerow(["ruta", "nombre", "error"])
+            escritor.writerows(fallidos)
+
+    if insertados == 0:
+        print(f"❌ No se enroló ningún usuario: las {len(fallidos)} imágenes fallaron (ver detalle arriba)")
+        return
+    print(f"✅ Insertados: {insertados}  Fallidos: {len(fallidos)}  "
+          f"Tiempo: {segundos:.1f}s  Throughput: {len(tareas) / segundos:.1f} img/s")
+
+
+if __name__ == "__main__":
+    main()
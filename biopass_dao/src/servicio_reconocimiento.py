@@ -0,0 +1,328 @@
+"""
+Servicio de reconocimiento por red.
+
+Una máquina potente mantiene la galería y los modelos; los terminales de
+puerta solo envían frames (JPEG/PNG) o features ya calculados por HTTP.
+Las peticiones concurrentes se agrupan en micro-lotes: un único forward de
+SFace para todos los rostros del lote y una única búsqueda en la galería.
+
+Uso:
+    python src/servicio_reconocimiento.py --port 8765 --max-lote 32 --espera-ms 5
+
+Endpoints:
+    POST /identificar   cuerpo: imagen JPEG/PNG      -> rostros con bbox, nombre y score
+    POST /features      cuerpo: float32 (n x 128) o JSON {"features": [[...], ...]}
+    GET  /estado        usuarios cargados, peticiones atendidas y tamaño medio de lote
+"""
+import sys
+import os
+import json
+import time
+import queue
+import argparse
+import threading
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Añadir el directorio raíz del proyecto al path para permitir imports absolutos (src.xxx)
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import cv2
+import numpy as np
+from src.config import Config
+from src.conexion_db import DBConnection
+from src.backfill_encodings import BackfillEncodings
+from src.carga_galeria import cargar_galeria
+from src.sincronizacion_galeria import SincronizadorGaleria
+from src.usuario_dao import UsuarioDAO
+from src.utils.camera_utils import CameraUtils
+from src.utils.galeria import GaleriaRostros
+
+
+class Peticion:
+    """Una imagen o un bloque de features pendiente de identificar."""
+
+    __slots__ = ("imagen", "features", "futuro", "t_llegada")
+
+    def __init__(self, imagen=None, features=None):
+        self.imagen = imagen
+        self.features = features
+        self.futuro = Future()
+        self.t_llegada = time.perf_counter()
+
+
+class LoteadorReconocimiento(threading.Thread):
+    """
+    Consume peticiones de una cola compartida y las procesa en micro-lotes.
+
+    Espera la primera petición y recoge las que lleguen en los siguientes
+    `espera_max` segundos (hasta `max_lote`). Se pueden lanzar varios
+    loteadores sobre la misma cola, uno por instancia del pool de modelos.
+    """
+
+    def __init__(self, cola, galeria, max_lote=32, espera_max=0.005, threshold=GaleriaRostros.UMBRAL_COSENO):
+        super().__init__(daemon=True)
+        self.cola = cola
+        self.galeria = galeria
+        self.max_lote = max_lote
+        self.espera_max = espera_max
+        self.threshold = threshold
+        self.lotes = 0
+        self.peticiones = 0
+
+    def _recoger_lote(self, primera):
+        lote = [primera]
+        limite = time.perf_counter() + self.espera_max
+        while len(lote) < self.max_lote:
+            restante = limite - time.perf_counter()
+            try:
+                peticion = self.cola.get(timeout=restante) if restante > 0 else self.cola.get_nowait()
+            except queue.Empty:
+                break
+            if peticion is None:
+                # Reponer la señal de parada para los demás loteadores
+                self.cola.put(None)
+                break
+            lote.append(peticion)
+        return lote
+
+    def _etiquetar(self, mejores):
+        if not mejores:
+            return "Sin usuarios", 0.0
+        nombre, score = mejores[0]
+        return (nombre if score >= self.threshold else "Desconocido"), float(score)
+
+    def _extraer_imagenes(self, peticiones):
+        """
+        Detecta y alinea los rostros de cada imagen y extrae los features de
+        todos en un solo forward de SFace. Si una imagen hace fallar a YuNet o
+        al alineado, solo falla su petición. Retorna ([(peticion, bboxes)], encodings).
+        """
+        validas, alineados = [], []
+        with CameraUtils.modelos() as modelos:
+            if modelos.recognizer is None:
+                raise RuntimeError("Recognizer SFace no disponible")
+            for peticion in peticiones:
+                try:
+                    faces = modelos.detectar(peticion.imagen)
+                    recortes = modelos.alinear(peticion.imagen, faces)
+                except Exception as e:
+                    peticion.futuro.set_exception(e)
+                    continue
+                validas.append((peticion, [tuple(int(v) for v in face[:4]) for face in faces]))
+                alineados.extend(recortes)
+            return validas, modelos.extraer_features(alineados)
+
+    def _procesar(self, lote):
+        t_inicio = time.perf_counter()
+        imagenes = [peticion for peticion in lote if peticion.imagen is not None]
+        con_features = [peticion for peticion in lote if peticion.imagen is None]
+
+        # Las peticiones de features no necesitan modelos: no se bloquean por un fallo de SFace
+        validas, encodings = [], np.empty((0, GaleriaRostros.DIM), dtype=np.float32)
+        if imagenes:
+            try:
+                validas, encodings = self._extraer_imagenes(imagenes)
+            except Exception as e:
+                print(f"❌ Error extrayendo rostros de {len(imagenes)} imágenes del lote: {e}")
+                for peticion in imagenes:
+                    if not peticion.futuro.done():
+                        peticion.futuro.set_exception(e)
+                validas, encodings = [], np.empty((0, GaleriaRostros.DIM), dtype=np.float32)
+
+        todos = np.vstack([encodings] + [peticion.features for peticion in con_features]).astype(np.float32, copy=False)
+        resultados = self.galeria.buscar_lote(todos, k=1) if len(todos) else []
+        t_fin = time.perf_counter()
+
+        # Reparto de resultados: primero los rostros de imágenes, luego los features en orden
+        posicion = 0
+        respuestas = []
+        for peticion, cajas in validas:
+            rostros = []
+            for bbox in cajas:
+                nombre, score = self._etiquetar(resultados[posicion])
+                rostros.append({"bbox": bbox, "nombre": nombre, "score": score})
+                posicion += 1
+            respuestas.append((peticion, rostros))
+        for peticion in con_features:
+            rostros = []
+            for _ in range(len(peticion.features)):
+                nombre, score = self._etiquetar(resultados[posicion])
+                rostros.append({"nombre": nombre, "score": score})
+                posicion += 1
+            respuestas.append((peticion, rostros))
+
+        for peticion, rostros in respuestas:
+            peticion.futuro.set_result({
+                "rostros": rostros,
+                "lote": len(lote),
+                "latencia_ms": {
+                    "cola": (t_inicio - peticion.t_llegada) * 1000,
+                    "proceso": (t_fin - t_inicio) * 1000,
+                },
+            })
+
+    def run(self):
+        while True:
+            primera = self.cola.get()
+            if primera is None:
+                self.cola.put(None)
+                break
+            lote = self._recoger_lote(primera)
+            try:
+                self._procesar(lote)
+            except Exception as e:
+                print(f"❌ Error procesando lote de {len(lote)}: {e}")
+                for peticion in lote:
+                    if not peticion.futuro.done():
+                        peticion.futuro.set_exception(e)
+            self.lotes += 1
+            self.peticiones += len(lote)
+
+
+class ServicioReconocimiento:
+    """Cola de peticiones + loteadores que la atienden."""
+
+    def __init__(self, galeria, loteadores=1, max_lote=32, espera_max=0.005):
+        self.galeria = galeria
+        self.cola = queue.Queue()
+        self.loteadores = [LoteadorReconocimiento(self.cola, galeria, max_lote, espera_max) for _ in range(loteadores)]
+        for loteador in self.loteadores:
+            loteador.start()
+
+    def identificar_imagen(self, imagen, timeout=10.0):
+        peticion = Peticion(imagen=imagen)
+        self.cola.put(peticion)
+        return peticion.futuro.result(timeout)
+
+    def identificar_features(self, features, timeout=10.0):
+        peticion = Peticion(features=features.reshape(-1, GaleriaRostros.DIM))
+        self.cola.put(peticion)
+        return peticion.futuro.result(timeout)
+
+    def estado(self):
+        lotes = sum(l.lotes for l in self.loteadores)
+        peticiones = sum(l.peticiones for l in self.loteadores)
+        return {
+            "usuarios": len(self.galeria),
+            "peticiones": peticiones,
+            "lotes": lotes,
+            "lote_medio": peticiones / lotes if lotes else 0.0,
+            "pendientes": self.cola.qsize(),
+        }
+
+    def detener(self):
+        self.cola.put(None)
+        for loteador in self.loteadores:
+            loteador.join()
+
+
+class ServidorHTTP(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # muchos terminales conectando a la vez
+
+
+class ManejadorHTTP(BaseHTTPRequestHandler):
+    servicio = None  # se asigna en main()
+    protocol_version = "HTTP/1.1"  # keep-alive: el cliente reutiliza la conexión
+    disable_nagle_algorithm = True  # sin esto, cabecera y cuerpo por separado esperan al ACK retardado (~40 ms)
+
+    def _responder(self, codigo, datos):
+        cuerpo = json.dumps(datos).encode("utf-8")
+        self.send_response(codigo)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def _leer_cuerpo(self):
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def do_GET(self):
+        if self.path == "/estado":
+            self._responder(200, self.servicio.estado())
+        else:
+            self._responder(404, {"error": "ruta desconocida"})
+
+    def do_POST(self):
+        t0 = time.perf_counter()
+        cuerpo = self._leer_cuerpo()
+        if self.path not in ("/identificar", "/features"):
+            self._responder(404, {"error": "ruta desconocida"})
+            return
+        # Errores al interpretar el cuerpo: culpa del cliente (400)
+        try:
+            if not cuerpo:
+                raise ValueError("cuerpo vacío")
+            if self.path == "/identificar":
+                imagen = cv2.imdecode(np.frombuffer(cuerpo, dtype=np.uint8), cv2.IMREAD_COLOR)
+                if imagen is None:
+                    raise ValueError("imagen no válida")
+            else:
+                if self.headers.get("Content-Type", "").startswith("application/json"):
+                    features = np.asarray(json.loads(cuerpo)["features"], dtype=np.float32)
+                else:
+                    features = np.frombuffer(cuerpo, dtype=np.float32)
+                if features.size == 0 or features.size % GaleriaRostros.DIM:
+                    raise ValueError(f"se esperan múltiplos de {GaleriaRostros.DIM} floats")
+        except (ValueError, TypeError, KeyError, cv2.error, json.JSONDecodeError) as e:
+            self._responder(400, {"error": f"petición no válida: {e}"})
+            return
+        # Errores del propio servicio (500)
+        try:
+            if self.path == "/identificar":
+                respuesta = self.servicio.identificar_imagen(imagen)
+            else:
+                respuesta = self.servicio.identificar_features(features)
+        except Exception as e:
+            self._responder(500, {"error": str(e)})
+            return
+        respuesta["latencia_ms"]["total"] = (time.perf_counter() - t0) * 1000
+        self._responder(200, respuesta)
+
+    def log_message(self, formato, *args):
+        pass  # sin una línea de log por petición
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servicio HTTP de reconocimiento facial con micro-lotes")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--db", default=DBConnection.DB_FILE, help="Fichero SQLite")
+    parser.add_argument("--max-lote", type=int, default=32, help="Peticiones máximas por lote")
+    parser.add_argument("--espera-ms", type=float, default=5.0, help="Tiempo máximo esperando a completar un lote")
+    parser.add_argument("--loteadores", type=int, default=Config.POOL_MODELOS, help="Lotes en paralelo (uno por instancia de modelos)")
+    args = parser.parse_args()
+
+    DBConnection.DB_FILE = args.db
+    CameraUtils.initialize_models(args.loteadores)
+    ruta_indice = os.path.join(os.path.dirname(os.path.abspath(args.db)), Config.INDICE_FILE)
+    ultimo_cambio = UsuarioDAO.ultimo_cambio()
+    ultima_baja = UsuarioDAO.ultima_baja()
+    galeria, modelo_hash = cargar_galeria(ruta_indice)
+    print(f"✅ Se cargaron {len(galeria)} usuarios (modelo {modelo_hash}).")
+    backfill = BackfillEncodings(galeria, modelo_hash)
+    backfill.start()
+    sincronizador = SincronizadorGaleria(galeria, modelo_hash, desde_cambio=ultimo_cambio, desde_baja=ultima_baja,
+                                         intervalo=Config.SYNC_INTERVALO)
+    sincronizador.start()
+
+    ManejadorHTTP.servicio = ServicioReconocimiento(galeria, args.loteadores, args.max_lote, args.espera_ms / 1000)
+    servidor = ServidorHTTP((args.host, args.port), ManejadorHTTP)
+    print(f"✅ Servicio escuchando en http://{args.host}:{args.port}")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print("Deteniendo servicio...")
+    finally:
+        servidor.server_close()
+        ManejadorHTTP.servicio.detener()
+        backfill.detener(timeout=5)
+        sincronizador.detener()
+        DBConnection.cerrar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import threading
+from src.usuario_dao import UsuarioDAO
+from src.utils.camera_utils import CameraUtils
+
+
+class SincronizadorGaleria(threading.Thread):
+    """
+    Mantiene la galería al día con los cambios hechos desde otros terminales
+    (u otros procesos, como el enrolamiento masivo) sin recargar la tabla.
+
+    Cada `intervalo` segundos mira PRAGMA data_version; solo si cambió
+    consulta las altas y modificaciones (registro usuarios_cambios) y las
+    bajas (registro usuarios_borrados), ambas por el seq de su registro
+    que mantienen los triggers. Así también llegan los encodings rellenados
+    después con un UPDATE (BackfillEncodings) o recalculados, que seguir el
+    id nunca vería. El coste es proporcional al cambio, no al tamaño de la
+    tabla, y un usuario nuevo se reconoce en todos los terminales en
+    ~`intervalo` segundos.
+
+    desde_cambio y desde_baja deben tomarse antes de cargar la galería
+    (UsuarioDAO.ultimo_cambio / ultima_baja): lo que cambie mientras carga
+    se vuelve a aplicar, pero no se pierde.
+    """
+
+    def __init__(self, galeria, modelo_hash=None, desde_cambio=None, desde_baja=0, intervalo=2.0):
+        super().__init__(daemon=True)
+        self.galeria = galeria
+        self.modelo_hash = modelo_hash or CameraUtils.modelo_hash()
+        self.ultimo_cambio = desde_cambio if desde_cambio is not None else UsuarioDAO.ultimo_cambio()
+        self.ultima_baja = desde_baja
+        self.intervalo = intervalo
+        self.altas = 0
+        self.bajas = 0
+        self._version = None
+        self._detener = threading.Event()
+
+    def detener(self):
+        self._detener.set()
+
+    def sincronizar(self):
+        """Aplica los cambios pendientes. Retorna (altas, bajas) aplicadas en esta pasada."""
+        version = UsuarioDAO.version_datos()
+        if version == self._version:
+            return 0, 0
+        self._version = version
+
+        # Hasta dónde se lee en esta pasada: lo que se confirme después queda para la siguiente
+        hasta = UsuarioDAO.ultimo_cambio()
+        altas = []
+        if hasta > self.ultimo_cambio:
+            altas = UsuarioDAO.obtener_cambios(self.modelo_hash, self.ultimo_cambio, hasta)
+            self.ultimo_cambio = hasta
+            # Los registrados en este mismo terminal ya están en la galería;
+            # una modificación sí reemplaza el encoding (agregar_lote sustituye el id)
+            altas = [user for user in altas if user[3] or not self.galeria.tiene_id(user[0])]
+        if altas:
+            ids = [user[0] for user in altas]
+            nombres = [user[1] for user in altas]
+            encodings = [CameraUtils.bytes_a_encoding(user[2]) for user in altas]
+            self.galeria.agregar_lote(encodings, nombres, ids)
+
+        bajas = UsuarioDAO.obtener_bajas(self.ultima_baja)
+        eliminados = 0
+        if bajas:
+            eliminados = self.galeria.eliminar_ids([baja[1] for baja in bajas])
+            self.ultima_baja = bajas[-1][0]
+
+        self.altas += len(altas)
+        self.bajas += eliminados
+        if altas or eliminados:
+            print(f"🔄 Galería sincronizada: +{len(altas)} / -{eliminados} usuarios ({len(self.galeria)} en total)")
+        return len(altas), eliminados
+
+    def run(self):
+        while not self._detener.wait(self.intervalo):
+            try:
+                self.sincronizar()
+            except Exception as e:
+                print(f"⚠️ Error sincronizando la galería: {e}")
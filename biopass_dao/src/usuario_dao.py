@@ -2,44 +2,161 @@ import sqlite3
 from src.conexion_db import DBConnection
 
 class UsuarioDAO:
-    
+
+    # BD para la que ya se creó/migró el esquema (el DDL se ejecuta una sola vez)
+    _esquema_listo = None
+
     @staticmethod
     def crear_tabla():
-        """Crea la tabla usuarios si no existe."""
-        conn = DBConnection.get_connection()
-        cursor = conn.cursor()
-        try:
+        """Crea la tabla usuarios si no existe (y migra columnas nuevas)."""
+        def _crear(cursor):
             sql = """
             CREATE TABLE IF NOT EXISTS usuarios (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 nombre TEXT NOT NULL,
-                foto_cara BLOB NOT NULL
+                foto_cara BLOB NOT NULL,
+                encoding BLOB,
+                modelo_hash TEXT
             );
             """
             cursor.execute(sql)
-            conn.commit()
+            UsuarioDAO._migrar_columnas(cursor)
+
+            # Registro de bajas para que las demás instancias las apliquen sin recargar todo
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS usuarios_borrados (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                borrado_en TEXT DEFAULT CURRENT_TIMESTAMP
+            );
+            """)
+            cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS usuarios_baja AFTER DELETE ON usuarios
+            BEGIN
+                INSERT INTO usuarios_borrados (user_id) VALUES (OLD.id);
+            END;
+            """)
+
+            # Registro de altas y modificaciones (p. ej. el encoding que rellena
+            # BackfillEncodings con un UPDATE): la sincronización sigue este seq, no el id
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS usuarios_cambios (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                modificado INTEGER NOT NULL DEFAULT 0
+            );
+            """)
+            cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS usuarios_alta AFTER INSERT ON usuarios
+            BEGIN
+                INSERT INTO usuarios_cambios (user_id) VALUES (NEW.id);
+            END;
+            """)
+            cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS usuarios_modificacion AFTER UPDATE OF nombre, encoding, modelo_hash ON usuarios
+            BEGIN
+                INSERT INTO usuarios_cambios (user_id, modificado) VALUES (NEW.id, 1);
+            END;
+            """)
+
+        try:
+            DBConnection.escribir(_crear)
+            UsuarioDAO._esquema_listo = DBConnection.DB_FILE
         except Exception as e:
             print(f"Error creando tabla: {e}")
-        # No cerramos cursor/conn aquí para mantener la conexión viva en SQLite
 
     @staticmethod
-    def registrar_usuario(nombre, cara_bytes):
-        UsuarioDAO.crear_tabla() # Asegurar tabla
-        conn = DBConnection.get_connection()
-        cursor = conn.cursor()
-        try:
-            sql = "INSERT INTO usuarios (nombre, foto_cara) VALUES (?, ?)"
+    def _asegurar_tabla():
+        """Ejecuta crear_tabla() solo la primera vez para cada fichero de BD."""
+        if UsuarioDAO._esquema_listo != DBConnection.DB_FILE:
+            UsuarioDAO.crear_tabla()
+
+    @staticmethod
+    def _migrar_columnas(cursor):
+        """Añade las columnas del encoding a BDs creadas con versiones anteriores."""
+        cursor.execute("PRAGMA table_info(usuarios)")
+        columnas = {fila[1] for fila in cursor.fetchall()}
+        if "encoding" not in columnas:
+            cursor.execute("ALTER TABLE usuarios ADD COLUMN encoding BLOB")
+        if "modelo_hash" not in columnas:
+            cursor.execute("ALTER TABLE usuarios ADD COLUMN modelo_hash TEXT")
+
+    @staticmethod
+    def registrar_usuario(nombre, cara_bytes, encoding_bytes=None, modelo_hash=None):
+        """Inserta un usuario (con su encoding si se conoce). Retorna el id o None."""
+        UsuarioDAO._asegurar_tabla()
+
+        def _insertar(cursor):
+            sql = "INSERT INTO usuarios (nombre, foto_cara, encoding, modelo_hash) VALUES (?, ?, ?, ?)"
             # SQLite maneja bytes directamente con ?
-            cursor.execute(sql, (nombre, cara_bytes))
-            conn.commit()
+            cursor.execute(sql, (nombre, cara_bytes, encoding_bytes, modelo_hash))
+            return cursor.lastrowid
+
+        try:
+            user_id = DBConnection.escribir(_insertar)
             print("Usuario registrado con éxito.")
+            return user_id
         except Exception as e:
-            conn.rollback()
             print(f"Error al registrar: {e}")
+            return None
+
+    @staticmethod
+    def registrar_lote(filas):
+        """
+        Inserta muchos usuarios (nombre, cara_bytes, encoding_bytes, modelo_hash)
+        con un único executemany dentro de una sola transacción. Pasar lotes
+        acotados (lista): mientras dura la transacción el escritor no atiende
+        otras escrituras. Retorna cuántos se insertaron (0 si se deshizo).
+        """
+        UsuarioDAO._asegurar_tabla()
+
+        def _insertar_lote(cursor):
+            sql = "INSERT INTO usuarios (nombre, foto_cara, encoding, modelo_hash) VALUES (?, ?, ?, ?)"
+            cursor.executemany(sql, filas)
+            return cursor.rowcount
+
+        try:
+            return DBConnection.escribir(_insertar_lote)
+        except Exception as e:
+            print(f"Error en el registro por lotes: {e}")
+            return 0
+
+    @staticmethod
+    def actualizar_encoding(user_id, encoding_bytes, modelo_hash):
+        """
+        Guarda el encoding recalculado de un usuario con el hash del modelo que lo generó.
+        No espera al COMMIT: el escritor agrupa varias actualizaciones en una transacción.
+        """
+        def _actualizar(cursor):
+            sql = "UPDATE usuarios SET encoding = ?, modelo_hash = ? WHERE id = ?"
+            cursor.execute(sql, (encoding_bytes, modelo_hash, user_id))
+
+        def _avisar_error(futuro):
+            if futuro.exception() is not None:
+                print(f"Error al actualizar encoding de {user_id}: {futuro.exception()}")
+
+        futuro = DBConnection.escribir(_actualizar, esperar=False)
+        futuro.add_done_callback(_avisar_error)
+        return futuro
+
+    @staticmethod
+    def eliminar_usuario(user_id):
+        """Borra un usuario. El trigger usuarios_baja deja constancia para la sincronización."""
+        UsuarioDAO._asegurar_tabla()
+
+        def _borrar(cursor):
+            cursor.execute("DELETE FROM usuarios WHERE id = ?", (user_id,))
+            return cursor.rowcount
+
+        try:
+            return DBConnection.escribir(_borrar) > 0
+        except Exception as e:
+            print(f"Error al eliminar usuario {user_id}: {e}")
+            return False
 
     @staticmethod
     def obtener_todos():
-        UsuarioDAO.crear_tabla() # Asegurar tabla
+        UsuarioDAO._asegurar_tabla()
         conn = DBConnection.get_connection()
         cursor = conn.cursor()
         usuarios = []
@@ -50,3 +167,126 @@ class UsuarioDAO:
         except Exception as e:
             print(f"Error al obtener usuarios: {e}")
         return usuarios
+
+    @staticmethod
+    def obtener_encodings(modelo_hash):
+        """
+        Carga en una sola consulta (id, nombre, encoding) de los usuarios cuyo
+        encoding fue calculado con el modelo actual. No lee las fotos.
+        """
+        UsuarioDAO._asegurar_tabla()
+        conn = DBConnection.get_connection()
+        cursor = conn.cursor()
+        usuarios = []
+        try:
+            sql = "SELECT id, nombre, encoding FROM usuarios WHERE encoding IS NOT NULL AND modelo_hash = ?"
+            cursor.execute(sql, (modelo_hash,))
+            usuarios = cursor.fetchall()
+        except Exception as e:
+            print(f"Error al obtener encodings: {e}")
+        return usuarios
+
+    @staticmethod
+    def obtener_resumen(modelo_hash):
+        """(cantidad, id máximo) de usuarios con encoding del modelo actual. Sirve para validar el índice guardado."""
+        UsuarioDAO._asegurar_tabla()
+        conn = DBConnection.get_connection()
+        cursor = conn.cursor()
+        try:
+            sql = "SELECT COUNT(*), MAX(id) FROM usuarios WHERE encoding IS NOT NULL AND modelo_hash = ?"
+            cursor.execute(sql, (modelo_hash,))
+            return cursor.fetchone()
+        except Exception as e:
+            print(f"Error al obtener resumen: {e}")
+            return 0, None
+
+    @staticmethod
+    def obtener_pendientes(modelo_hash):
+        """Usuarios sin encoding o con encoding de otro modelo: (id, nombre, foto_cara)."""
+        UsuarioDAO._asegurar_tabla()
+        conn = DBConnection.get_connection()
+        cursor = conn.cursor()
+        usuarios = []
+        try:
+            sql = """
+            SELECT id, nombre, foto_cara FROM usuarios
+            WHERE encoding IS NULL OR modelo_hash IS NULL OR modelo_hash != ?
+            """
+            cursor.execute(sql, (modelo_hash,))
+            usuarios = cursor.fetchall()
+        except Exception as e:
+            print(f"Error al obtener usuarios pendientes: {e}")
+        return usuarios
+
+    @staticmethod
+    def obtener_cambios(modelo_hash, desde_seq, hasta_seq):
+        """
+        Usuarios dados de alta o modificados con seq en (desde_seq, hasta_seq]
+        del registro usuarios_cambios y con encoding del modelo actual:
+        (id, nombre, encoding, modificado), uno por usuario aunque cambiara
+        varias veces. modificado es 1 si alguno de sus cambios fue un UPDATE.
+        Recorre solo el registro desde desde_seq y la PK de usuarios.
+        """
+        UsuarioDAO._asegurar_tabla()
+        conn = DBConnection.get_connection()
+        cursor = conn.cursor()
+        usuarios = []
+        try:
+            sql = """
+            SELECT u.id, u.nombre, u.encoding, c.modificado
+            FROM (SELECT user_id, MAX(seq) AS seq, MAX(modificado) AS modificado
+                  FROM usuarios_cambios WHERE seq > ? AND seq <= ? GROUP BY user_id) c
+            JOIN usuarios u ON u.id = c.user_id
+            WHERE u.encoding IS NOT NULL AND u.modelo_hash = ?
+            ORDER BY c.seq
+            """
+            cursor.execute(sql, (desde_seq or 0, hasta_seq, modelo_hash))
+            usuarios = cursor.fetchall()
+        except Exception as e:
+            print(f"Error al obtener cambios: {e}")
+        return usuarios
+
+    @staticmethod
+    def ultimo_cambio():
+        """Último seq del registro de altas y modificaciones (0 si no hay ninguno)."""
+        UsuarioDAO._asegurar_tabla()
+        conn = DBConnection.get_connection()
+        try:
+            return conn.execute("SELECT COALESCE(MAX(seq), 0) FROM usuarios_cambios").fetchone()[0]
+        except Exception as e:
+            print(f"Error al obtener el último cambio: {e}")
+            return 0
+
+    @staticmethod
+    def obtener_bajas(desde_seq):
+        """Bajas registradas después de desde_seq: (seq, user_id)."""
+        UsuarioDAO._asegurar_tabla()
+        conn = DBConnection.get_connection()
+        cursor = conn.cursor()
+        bajas = []
+        try:
+            cursor.execute("SELECT seq, user_id FROM usuarios_borrados WHERE seq > ? ORDER BY seq", (desde_seq or 0,))
+            bajas = cursor.fetchall()
+        except Exception as e:
+            print(f"Error al obtener bajas: {e}")
+        return bajas
+
+    @staticmethod
+    def ultima_baja():
+        """Último seq del registro de bajas (0 si no hay ninguna)."""
+        UsuarioDAO._asegurar_tabla()
+        conn = DBConnection.get_connection()
+        try:
+            return conn.execute("SELECT COALESCE(MAX(seq), 0) FROM usuarios_borrados").fetchone()[0]
+        except Exception as e:
+            print(f"Error al obtener la última baja: {e}")
+            return 0
+
+    @staticmethod
+    def version_datos():
+        """
+        PRAGMA data_version de la conexión del hilo: cambia cuando otra
+        conexión (de este u otro proceso) confirma cambios. Permite saber
+        sin consultar las tablas si hay algo nuevo.
+        """
+        return DBConnection.get_connection().execute("PRAGMA data_version").fetchone()[0]
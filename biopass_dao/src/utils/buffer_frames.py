@@ -0,0 +1,82 @@
+import threading
+import cv2
+import numpy as np
+
+
+class BufferFrames:
+    """
+    Intercambio de frames entre el hilo de captura y la GUI sin copias.
+
+    El hilo de captura llama a publicar(frame) una vez por frame nuevo:
+    ahí se genera (una sola vez) la vista previa RGB al tamaño del label,
+    escribiendo en buffers preasignados, y se incrementa el número de
+    secuencia. La GUI pide adquirir_preview(seq_visto) y solo recibe algo
+    si hay un frame más nuevo, así no redibuja si la cámara no ha avanzado.
+
+    Se usan tres buffers de preview: el que la GUI está leyendo, el último
+    publicado y el que se está escribiendo. El escritor nunca toca los dos
+    primeros, así que la GUI puede usar la vista sin copiarla.
+    """
+
+    def __init__(self, ancho_preview=640, alto_preview=480):
+        self.ancho_preview = ancho_preview
+        self.alto_preview = alto_preview
+        self._previews = [None, None, None]
+        self._publicado = None
+        self._leyendo = None
+        self._seq = 0
+        self._frame = None
+        self._reducido = None  # temporal BGR del escritor (solo lo usa el hilo de captura)
+        self._escala = 1.0
+        self._lock = threading.Lock()
+
+    @property
+    def seq(self):
+        return self._seq
+
+    def _tamano_preview(self, frame):
+        """Tamaño que cabe en el label manteniendo la relación de aspecto."""
+        h, w = frame.shape[:2]
+        escala = min(self.ancho_preview / w, self.alto_preview / h)
+        return max(1, int(w * escala)), max(1, int(h * escala)), escala
+
+    def publicar(self, frame):
+        """Llamado por el hilo de captura. El frame no debe modificarse después."""
+        ancho, alto, escala = self._tamano_preview(frame)
+
+        with self._lock:
+            ocupados = (self._publicado, self._leyendo)
+        destino = next(i for i in range(3) if i not in ocupados)
+
+        preview = self._previews[destino]
+        if preview is None or preview.shape[:2] != (alto, ancho):
+            preview = np.empty((alto, ancho, 3), dtype=np.uint8)
+            self._previews[destino] = preview
+        if self._reducido is None or self._reducido.shape != preview.shape:
+            self._reducido = np.empty_like(preview)
+        # Redimensionar primero y convertir después: cvtColor trabaja sobre 640 px, no sobre 1280
+        cv2.resize(frame, (ancho, alto), dst=self._reducido, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._reducido, cv2.COLOR_BGR2RGB, dst=preview)
+
+        with self._lock:
+            self._frame = frame
+            self._escala = escala
+            self._publicado = destino
+            self._seq += 1
+
+    def frame_actual(self):
+        """Último frame completo (BGR) publicado, sin copiar, o None."""
+        with self._lock:
+            return self._frame
+
+    def adquirir_preview(self, seq_visto):
+        """
+        Retorna (seq, preview_rgb, escala) si hay un frame más nuevo que
+        seq_visto, o None. El buffer queda reservado hasta la siguiente
+        llamada, así que puede dibujarse encima sin copiarlo.
+        """
+        with self._lock:
+            if self._publicado is None or self._seq == seq_visto:
+                return None
+            self._leyendo = self._publicado
+            return self._seq, self._previews[self._leyendo], self._escala
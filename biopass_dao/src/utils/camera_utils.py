@@ -1,6 +1,11 @@
 import cv2
 import numpy as np
 import os
+import hashlib
+import threading
+from contextlib import contextmanager
+from src.utils.galeria import GaleriaRostros
+from src.utils.pool_modelos import ModelosFaciales, PoolModelos
 
 class CameraUtils:
     
@@ -9,37 +14,49 @@ class CameraUtils:
     DETECTOR_PATH = os.path.join(BASE_DIR, "face_detection_yunet_2023mar.onnx")
     RECOGNIZER_PATH = os.path.join(BASE_DIR, "face_recognition_sface_2021dec.onnx")
     
-    detector = None
-    recognizer = None
+    SFACE_INPUT_SIZE = ModelosFaciales.SFACE_INPUT_SIZE
+    _modelo_hash = None
+    # Instancias YuNet/SFace: cada llamada toma una en exclusiva (ver PoolModelos)
+    pool = None
+    _lock_pool = threading.Lock()
 
     @classmethod
-    def initialize_models(cls):
-        """Inicializa los modelos DNN si no se han cargado."""
-        if cls.detector is None:
-            # YuNet Detector
-            # Input size se actualiza dinámicamente, pero iniciamos con uno default
-            try:
-                cls.detector = cv2.FaceDetectorYN.create(
-                    cls.DETECTOR_PATH,
-                    "",
-                    (320, 320),
-                    0.9, # Score threshold
-                    0.3, # NMS threshold
-                    5000 
-                )
-                print("✅ Detector YuNet cargado.")
-            except Exception as e:
-                print(f"❌ Error cargando Detector YuNet: {e}")
-
-        if cls.recognizer is None:
-            try:
-                cls.recognizer = cv2.FaceRecognizerSF.create(
-                   cls.RECOGNIZER_PATH,
-                   ""
-                )
-                print("✅ Recognizer SFace cargado.")
-            except Exception as e:
-                print(f"❌ Error cargando Recognizer SFace: {e}")
+    def initialize_models(cls, tamano_pool=None):
+        """
+        Crea el pool de modelos DNN si no existe y precarga una instancia.
+        tamano_pool: instancias máximas (por defecto, hasta 4 según los núcleos).
+        """
+        with cls._lock_pool:
+            if cls.pool is not None and (tamano_pool is None or tamano_pool == cls.pool.tamano):
+                return
+            tamano = tamano_pool or min(4, os.cpu_count() or 1)
+            cls.pool = PoolModelos(cls.DETECTOR_PATH, cls.RECOGNIZER_PATH, tamano)
+        try:
+            cls.pool.precargar(1)
+            print(f"✅ Modelos YuNet/SFace cargados (pool de hasta {tamano} instancias).")
+        except Exception as e:
+            print(f"❌ Error cargando Detector YuNet: {e}")
+
+    @classmethod
+    @contextmanager
+    def modelos(cls):
+        """Toma del pool un juego de modelos para uso exclusivo del hilo actual."""
+        if cls.pool is None: cls.initialize_models()
+        with cls.pool.usar() as modelos:
+            yield modelos
+
+    @classmethod
+    def detectar_rostros(cls, imagen):
+        """
+        Detecta TODOS los rostros usando YuNet.
+        Retorna un array (n, 15) (coords + landmarks + score), vacío si no hay rostros.
+        """
+        try:
+            with cls.modelos() as modelos:
+                return modelos.detectar(imagen)
+        except cv2.error as e:
+            print(f"❌ Error en la detección: {e}")
+            return np.empty((0, 15), dtype=np.float32)
 
     @classmethod
     def detectar_rostro(cls, imagen):
@@ -47,16 +64,8 @@ class CameraUtils:
         Detecta rostros usando YuNet.
         Retorna la data del PRIMER rostro encontrado (coords + landmarks) o None.
         """
-        if cls.detector is None: cls.initialize_models()
-        if cls.detector is None: return None
-
-        h, w, _ = imagen.shape
-        cls.detector.setInputSize((w, h))
-        
-        # faces[1] es la lista de rostros. faces[0] es el status.
-        _, faces = cls.detector.detect(imagen)
-        
-        if faces is not None and len(faces) > 0:
+        faces = cls.detectar_rostros(imagen)
+        if len(faces) > 0:
             # Retorna el primer rostro (array de 15 valores)
             return faces[0]
         return None
@@ -67,44 +76,130 @@ class CameraUtils:
         Obtiene el vector de características (encoding) del rostro (128D).
         Requiere la imagen y la data del rostro (detectado por YuNet).
         """
-        if cls.recognizer is None: cls.initialize_models()
-        if cls.recognizer is None: return None
-        
-        # Alinear y recortar usando los landmarks
-        aligned_face = cls.recognizer.alignCrop(imagen, face_data)
-        
-        # Extraer características
-        encoding = cls.recognizer.feature(aligned_face)
-        return encoding
+        with cls.modelos() as modelos:
+            if modelos.recognizer is None: return None
+            # Alinear y recortar usando los landmarks
+            aligned_face = modelos.recognizer.alignCrop(imagen, face_data)
+
+            # Extraer características
+            return modelos.recognizer.feature(aligned_face)
 
     @classmethod
-    def comparar_rostro_con_bd(cls, known_encodings, known_names, target_encoding, threshold=0.363):
+    def alinear_rostros(cls, imagen, faces):
+        """Recortes alineados (112x112) de cada rostro detectado, usando sus landmarks."""
+        with cls.modelos() as modelos:
+            return modelos.alinear(imagen, faces)
+
+    @classmethod
+    def extraer_features(cls, alineados):
+        """
+        Features SFace de varios recortes alineados en un único forward
+        (blob de n imágenes), forma (n, 128). Si la red por lotes no está
+        disponible, cae a recognizer.feature() rostro a rostro.
+        """
+        if len(alineados) == 0:
+            return np.empty((0, 128), dtype=np.float32)
+        with cls.modelos() as modelos:
+            return modelos.extraer_features(alineados)
+
+    @classmethod
+    def obtener_encodings_lote(cls, imagen, faces):
+        """Encodings de varios rostros de la misma imagen, forma (n, 128): alineado + features por lotes."""
+        if len(faces) == 0:
+            return np.empty((0, 128), dtype=np.float32)
+        with cls.modelos() as modelos:
+            return modelos.extraer_features(modelos.alinear(imagen, faces))
+
+    @classmethod
+    def identificar_todos(cls, frame, galeria, threshold=GaleriaRostros.UMBRAL_COSENO):
+        """
+        Identifica a todas las personas del frame en una pasada:
+        detección (todos los rostros) -> alineado -> features por lotes ->
+        un único producto matricial contra la galería.
+        Retorna una lista de (bbox, nombre, score) con bbox = (x, y, w, h).
+        """
+        # Una sola instancia del pool para toda la pasada
+        with cls.modelos() as modelos:
+            faces = modelos.detectar(frame)
+            if len(faces) == 0:
+                return []
+            encodings = modelos.extraer_features(modelos.alinear(frame, faces))
+
+        resultados = []
+        for face, mejores in zip(faces, galeria.buscar_lote(encodings, k=1)):
+            bbox = tuple(int(v) for v in face[:4])
+            if not mejores:
+                resultados.append((bbox, "Sin usuarios", 0.0))
+                continue
+            nombre, score = mejores[0]
+            resultados.append((bbox, nombre if score >= threshold else "Desconocido", score))
+        return resultados
+
+    @classmethod
+    def encoding_desde_foto(cls, imagen, margen=0.25):
+        """
+        Obtiene el encoding de una foto de rostro ya recortada (la guardada en BD).
+        YuNet falla a menudo si la cara ocupa todo el recorte, así que si no
+        detecta nada se reintenta con un borde alrededor. Retorna None si falla.
+        """
+        face_data = cls.detectar_rostro(imagen)
+        if face_data is None:
+            h, w, _ = imagen.shape
+            pad_y, pad_x = int(h * margen), int(w * margen)
+            imagen = cv2.copyMakeBorder(imagen, pad_y, pad_y, pad_x, pad_x, cv2.BORDER_CONSTANT, value=(0, 0, 0))
+            face_data = cls.detectar_rostro(imagen)
+            if face_data is None:
+                return None
+        return cls.obtener_encoding(imagen, face_data)
+
+    @classmethod
+    def modelo_hash(cls):
+        """
+        Hash (SHA-1 corto) de los ficheros ONNX de detector y recognizer.
+        Identifica con qué versión de modelos se calculó un encoding guardado.
+        """
+        if cls._modelo_hash is None:
+            sha = hashlib.sha1()
+            for ruta in (cls.DETECTOR_PATH, cls.RECOGNIZER_PATH):
+                try:
+                    with open(ruta, "rb") as f:
+                        for bloque in iter(lambda: f.read(1 << 20), b""):
+                            sha.update(bloque)
+                except OSError:
+                    sha.update(os.path.basename(ruta).encode())
+            cls._modelo_hash = sha.hexdigest()[:16]
+        return cls._modelo_hash
+
+    @staticmethod
+    def encoding_a_bytes(encoding):
+        """Serializa un encoding SFace (128 float32) para guardarlo en BD."""
+        return np.asarray(encoding, dtype=np.float32).reshape(-1).tobytes()
+
+    @staticmethod
+    def bytes_a_encoding(encoding_bytes):
+        """Inverso de encoding_a_bytes. Retorna un array (1, 128) float32."""
+        return np.frombuffer(encoding_bytes, dtype=np.float32).reshape(1, -1)
+
+    @classmethod
+    def comparar_rostro_con_bd(cls, known_encodings, known_names, target_encoding, threshold=GaleriaRostros.UMBRAL_COSENO):
         """
         Compara un encoding con una lista.
         Para Cosine Similarity (SFace), el threshold recomendado es ~0.363.
         Si score es MAYOR o IGUAL al threshold, es match positivo.
+
+        Se mantiene por compatibilidad: construye una GaleriaRostros temporal
+        y hace una única búsqueda vectorizada. Para consultas repetidas
+        conviene mantener la galería viva (ver BioPassApp.galeria).
         """
-        if cls.recognizer is None: cls.initialize_models()
-        if not known_encodings: return "Sin usuarios"
-        
-        mejor_score = 0.0
-        nombre_mejor = "Desconocido"
-
-        for i, known_enc in enumerate(known_encodings):
-            # match devuelve: 0 (mismo), 1 (diferente). 
-            # Pero podemos usar la distancia cosenoidal manual si queremos, 
-            # o usar recognizer.match(). SFace.match devuelve score de similitud (mayor es mejor) con FR_COSINE
-            
-            score = cls.recognizer.match(known_enc, target_encoding, cv2.FaceRecognizerSF_FR_COSINE)
-            
-            if score > mejor_score:
-                mejor_score = score
-                nombre_mejor = known_names[i]
-        
-        if mejor_score >= threshold:
-            return nombre_mejor
-            
-        return "Desconocido"
+        if isinstance(known_encodings, GaleriaRostros):
+            galeria = known_encodings
+        else:
+            if not known_encodings: return "Sin usuarios"
+            galeria = GaleriaRostros(capacidad=len(known_encodings))
+            galeria.agregar_lote(np.vstack(known_encodings), list(known_names))
+
+        nombre, _ = galeria.identificar(target_encoding, threshold)
+        return nombre
 
     @staticmethod
     def convertir_a_bytes(imagen_cv2):
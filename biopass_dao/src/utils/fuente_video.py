@@ -0,0 +1,246 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+
+
+class FuenteVideo:
+    """
+    Origen de frames para la app. Permite cambiar la cámara por un fichero
+    de vídeo o una fuente sintética (pruebas, benchmarks, máquinas sin cámara).
+    """
+
+    descripcion = "Fuente"
+
+    def abrir(self):
+        """Retorna True si la fuente quedó lista para leer."""
+        raise NotImplementedError
+
+    def leer(self):
+        """Retorna (ret, frame) como cv2.VideoCapture.read()."""
+        raise NotImplementedError
+
+    def liberar(self):
+        pass
+
+
+class FuenteCamara(FuenteVideo):
+    """Cámara física: (índice, backend de OpenCV)."""
+
+    def __init__(self, indice, backend, descripcion=None):
+        self.indice = indice
+        self.backend = backend
+        self.descripcion = descripcion or f"Index {indice} - backend {backend}"
+        self.cap = None
+
+    def abrir(self):
+        self.cap = cv2.VideoCapture(self.indice, self.backend)
+        if not self.cap.isOpened():
+            self.cap.release()
+            return False
+        # Intentar "despertar" la cámara ajustando a HD (1280x720)
+        # Muchas cámaras modernas fallan en 640x480 por defecto con DSHOW
+        try:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
+        except Exception:
+            pass
+        return True
+
+    def leer(self):
+        return self.cap.read()
+
+    def liberar(self):
+        if self.cap is not None:
+            self.cap.release()
+
+    def a_dict(self):
+        return {"indice": self.indice, "backend": self.backend, "descripcion": self.descripcion}
+
+
+class FuenteArchivo(FuenteVideo):
+    """Fichero de vídeo. Con tiempo_real=True se respeta su FPS y al terminar vuelve a empezar."""
+
+    def __init__(self, ruta, tiempo_real=True, en_bucle=True):
+        self.ruta = ruta
+        self.tiempo_real = tiempo_real
+        self.en_bucle = en_bucle
+        self.descripcion = f"Archivo {os.path.basename(ruta)}"
+        self.cap = None
+        self._periodo = 0.0
+        self._siguiente = 0.0
+
+    def abrir(self):
+        self.cap = cv2.VideoCapture(self.ruta)
+        if not self.cap.isOpened():
+            return False
+        fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self._periodo = 1.0 / fps if self.tiempo_real else 0.0
+        self._siguiente = time.perf_counter()
+        return True
+
+    def leer(self):
+        ret, frame = self.cap.read()
+        if not ret and self.en_bucle:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
+        if self._periodo:
+            self._siguiente += self._periodo
+            espera = self._siguiente - time.perf_counter()
+            if espera > 0:
+                time.sleep(espera)
+            else:
+                self._siguiente = time.perf_counter()
+        return ret, frame
+
+    def liberar(self):
+        if self.cap is not None:
+            self.cap.release()
+
+
+class FuenteSintetica(FuenteVideo):
+    """Frames generados (degradado que se desplaza) a un FPS fijo. No necesita hardware."""
+
+    def __init__(self, ancho=1280, alto=720, fps=30):
+        self.ancho = ancho
+        self.alto = alto
+        self.periodo = 1.0 / fps
+        self.descripcion = f"Sintética {ancho}x{alto}@{fps}"
+        self._n = 0
+        self._base = None
+
+    def abrir(self):
+        fila = np.linspace(0, 255, self.ancho, dtype=np.uint8)
+        self._base = np.dstack([np.tile(fila, (self.alto, 1))] * 3)
+        return True
+
+    def leer(self):
+        time.sleep(self.periodo)
+        self._n += 1
+        return True, np.roll(self._base, self._n * 4, axis=1)
+
+
+def calentar(fuente, max_frames=60, brillo_minimo=5.0, cancelado=lambda: False):
+    """
+    Lee frames de calentamiento hasta obtener uno que no sea negro.
+    Termina en cuanto aparece imagen (read() ya espera al sensor, no hace
+    falta dormir entre lecturas). Retorna "ok", "negro" (solo frames
+    oscuros) o "sin_frames".
+    """
+    leidos = 0
+    for _ in range(max_frames):
+        if cancelado():
+            break
+        ret, frame = fuente.leer()
+        if not ret or frame is None:
+            continue
+        leidos += 1
+        if frame.mean() > brillo_minimo:
+            return "ok"
+    return "negro" if leidos > 0 else "sin_frames"
+
+
+class SondeoCamaras:
+    """
+    Busca una cámara funcional lo más rápido posible:
+      1. Prueba primero la configuración que funcionó la última vez (caché en disco).
+      2. Si falla, sondea los candidatos en paralelo: un hilo por índice de
+         cámara, que prueba sus backends en orden (abrir el mismo dispositivo
+         con dos backends a la vez suele fallar).
+      3. Gana el primer candidato de la lista (por prioridad) que dé imagen.
+    """
+
+    CONFIGS = [
+        (0, cv2.CAP_DSHOW, "Index 0 - DSHOW (Recomendado)"),
+        (0, cv2.CAP_MSMF, "Index 0 - MSMF"),
+        (0, cv2.CAP_ANY, "Index 0 - Automático"),
+        (1, cv2.CAP_DSHOW, "Index 1 - DSHOW"),
+        (1, cv2.CAP_ANY, "Index 1 - Automático"),
+    ]
+
+    def __init__(self, ruta_cache, configs=None, cancelado=lambda: False):
+        self.ruta_cache = ruta_cache
+        self.configs = configs or self.CONFIGS
+        self.cancelado = cancelado
+
+    def _leer_cache(self):
+        try:
+            with open(self.ruta_cache, encoding="utf-8") as f:
+                datos = json.load(f)
+            return FuenteCamara(datos["indice"], datos["backend"], datos.get("descripcion"))
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _guardar_cache(self, fuente):
+        try:
+            with open(self.ruta_cache, "w", encoding="utf-8") as f:
+                json.dump(fuente.a_dict(), f)
+        except OSError as e:
+            print(f"⚠️ No se pudo guardar la caché de cámara: {e}")
+
+    def _probar(self, fuente):
+        """Abre y calienta una fuente. Retorna su estado de calentamiento o None si no abre."""
+        print(f"Probando configuración: {fuente.descripcion}...")
+        try:
+            if not fuente.abrir():
+                print(f"❌ {fuente.descripcion} no abrió.")
+                return None
+            estado = calentar(fuente, cancelado=self.cancelado)
+            if estado == "sin_frames":
+                print(f"⚠️ {fuente.descripcion} no entregó frames.")
+                fuente.liberar()
+                return None
+            return estado
+        except Exception as e:
+            print(f"❌ Error probando {fuente.descripcion}: {e}")
+            fuente.liberar()
+            return None
+
+    def _probar_indice(self, candidatos):
+        """Prueba en orden los backends de un mismo índice. Retorna (fuente, estado) o (None, None)."""
+        oscura = None
+        for fuente in candidatos:
+            if self.cancelado():
+                break
+            estado = self._probar(fuente)
+            if estado == "ok":
+                return fuente, estado
+            if estado == "negro":
+                # Se acepta como último recurso (como antes), pero antes se prueban los demás backends
+                fuente.liberar()
+                if oscura is None:
+                    oscura = fuente
+        if oscura is not None and not self.cancelado() and oscura.abrir():
+            return oscura, "negro"
+        return None, None
+
+    def buscar(self):
+        """Retorna una FuenteCamara abierta y caliente, o None si no hay ninguna."""
+        cacheada = self._leer_cache()
+        if cacheada is not None:
+            if self._probar(cacheada) == "ok":
+                print(f"✅ {cacheada.descripcion} (caché) ABIERTA CORRECTAMENTE.")
+                return cacheada
+            cacheada.liberar()
+
+        por_indice = {}
+        for indice, backend, descripcion in self.configs:
+            por_indice.setdefault(indice, []).append(FuenteCamara(indice, backend, descripcion))
+
+        with ThreadPoolExecutor(max_workers=len(por_indice)) as pool:
+            resultados = list(pool.map(self._probar_indice, por_indice.values()))
+
+        # Prioridad: primero una fuente con imagen real, en el orden de la lista
+        elegida = next((f for f, e in resultados if e == "ok"), None)
+        if elegida is None:
+            elegida = next((f for f, e in resultados if e == "negro"), None)
+        for fuente, _ in resultados:
+            if fuente is not None and fuente is not elegida:
+                fuente.liberar()
+
+        if elegida is not None:
+            print(f"✅ {elegida.descripcion} ABIERTA CORRECTAMENTE.")
+            self._guardar_cache(elegida)
+        return elegida
@@ -0,0 +1,192 @@
+import os
+import threading
+import numpy as np
+from src.utils.indices import IndicePlano, crear_indice, INDICES
+
+
+class GaleriaRostros:
+    """
+    Galería en memoria de los rostros conocidos.
+
+    Guarda todos los features SFace normalizados (L2) en un índice (por
+    defecto IndicePlano: una única matriz contigua de NumPy), así la
+    búsqueda contra toda la galería es un solo producto matriz-vector en
+    lugar de un recognizer.match() por usuario. Con vectores normalizados
+    el producto escalar es la similitud coseno, que es exactamente lo que
+    devuelve SFace con FR_COSINE.
+
+    Para galerías muy grandes se puede usar un índice aproximado
+    (ver src.utils.indices.IndiceIVF) y/o guardar los vectores cuantizados
+    en float16 o int8 (precision=...), que reduce la memoria a la mitad o
+    a un cuarto con una pérdida de precisión mínima en los scores.
+    """
+
+    DIM = 128
+    CAPACIDAD_INICIAL = 256
+    # Threshold recomendado para SFace con similitud coseno
+    UMBRAL_COSENO = 0.363
+    # Bajas acumuladas (fracción de la galería) a partir de las que se compacta el índice
+    FRACCION_COMPACTAR = 0.25
+
+    def __init__(self, dim=DIM, capacidad=CAPACIDAD_INICIAL, indice=None):
+        self.dim = dim
+        self.indice = indice if indice is not None else IndicePlano(dim, capacidad)
+        self.nombres = []
+        self.ids = []
+        self._posiciones = {}  # user_id -> posición en el índice
+        # RLock: la galería se consulta desde la GUI y desde otros hilos (backfill)
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.indice)
+
+    @property
+    def matriz(self):
+        """Features válidos en float32, forma (n, dim). Vista sin copia salvo en galerías cuantizadas."""
+        return self.indice.vectores
+
+    @property
+    def nbytes(self):
+        """Memoria real de los features guardados (según la precisión del índice)."""
+        return self.indice.nbytes
+
+    @classmethod
+    def normalizar(cls, encodings, dim=DIM):
+        """Convierte uno o varios encodings (1,128)/(128,)/(n,128) a float32 normalizado L2."""
+        vectores = np.asarray(encodings, dtype=np.float32).reshape(-1, dim)
+        normas = np.linalg.norm(vectores, axis=1, keepdims=True)
+        normas[normas == 0] = 1.0
+        return vectores / normas
+
+    def agregar(self, encoding, nombre, user_id=None):
+        """Añade un rostro a la galería (p.ej. tras registrar_usuario)."""
+        self.agregar_lote(encoding, [nombre], [user_id])
+
+    def agregar_lote(self, encodings, nombres, ids=None):
+        """Añade varios rostros de una vez (p.ej. al cargar usuarios)."""
+        vectores = self.normalizar(encodings, self.dim)
+        if len(vectores) != len(nombres):
+            raise ValueError("El número de encodings y de nombres no coincide")
+        if ids is None:
+            ids = [None] * len(nombres)
+
+        with self.lock:
+            # Un id que ya está en la galería se reemplaza (p.ej. encoding recalculado)
+            repetidos = [self._posiciones[i] for i in ids if i in self._posiciones]
+            if repetidos:
+                self.indice.eliminar(repetidos)
+            posiciones = self.indice.agregar(vectores)
+            self.nombres.extend(nombres)
+            self.ids.extend(ids)
+            for user_id, posicion in zip(ids, posiciones):
+                if user_id is not None:
+                    self._posiciones[user_id] = int(posicion)
+
+    def eliminar_ids(self, ids):
+        """Quita de la galería los usuarios dados de baja. Retorna cuántos estaban cargados."""
+        with self.lock:
+            posiciones = [self._posiciones.pop(i) for i in ids if i in self._posiciones]
+            if posiciones:
+                self.indice.eliminar(posiciones)
+                if self.indice.eliminadas > self.FRACCION_COMPACTAR * max(1, len(self.nombres)):
+                    self.compactar()
+            return len(posiciones)
+
+    def compactar(self):
+        """Libera del índice (y de nombres/ids) las posiciones dadas de baja."""
+        with self.lock:
+            conservadas = self.indice.compactar()
+            self.nombres = [self.nombres[p] for p in conservadas]
+            self.ids = [self.ids[p] for p in conservadas]
+            self._reindexar_ids()
+
+    def _reindexar_ids(self):
+        self._posiciones = {user_id: p for p, user_id in enumerate(self.ids) if user_id is not None}
+
+    def tiene_id(self, user_id):
+        with self.lock:
+            return user_id in self._posiciones
+
+    def max_id(self):
+        """Mayor id de usuario cargado (o None). Sirve para validar el índice guardado."""
+        with self.lock:
+            return max(self._posiciones, default=None)
+
+    def buscar_lote(self, encodings, k=1):
+        """
+        Top-k por similitud coseno para varios encodings a la vez.
+        Retorna una lista (una por consulta) de listas [(nombre, score), ...]
+        ordenadas de mayor a menor score.
+        """
+        consultas = self.normalizar(encodings, self.dim)
+        with self.lock:
+            scores, posiciones = self.indice.buscar(consultas, k)
+            resultados = []
+            for fila_scores, fila_pos in zip(scores, posiciones):
+                resultados.append([
+                    (self.nombres[p], float(s)) for s, p in zip(fila_scores, fila_pos) if p >= 0
+                ])
+        return resultados
+
+    def buscar(self, encoding, k=1):
+        """Top-k [(nombre, score), ...] para un único encoding."""
+        return self.buscar_lote(encoding, k)[0]
+
+    def identificar(self, encoding, threshold=UMBRAL_COSENO):
+        """
+        Retorna (nombre, score) del mejor match.
+        Si el score no alcanza el threshold el nombre es "Desconocido".
+        """
+        mejores = self.buscar(encoding, k=1)
+        if not mejores:
+            return "Sin usuarios", 0.0
+        nombre, score = mejores[0]
+        if score >= threshold:
+            return nombre, score
+        return "Desconocido", score
+
+    def guardar(self, ruta, modelo_hash=""):
+        """Persiste índice, nombres e ids en un .npz (junto a biopass.db)."""
+        with self.lock:
+            if self.indice.eliminadas:
+                self.compactar()
+            estado = self.indice.estado()
+            ids = np.array([-1 if i is None else i for i in self.ids], dtype=np.int64)
+            nombres = np.array(self.nombres, dtype=str)
+            temporal = ruta + ".tmp.npz"
+            np.savez(temporal, tipo=self.indice.tipo, modelo_hash=modelo_hash, ids=ids, nombres=nombres, **estado)
+        # Reemplazo atómico para no dejar un índice a medias si se cierra la app
+        os.replace(temporal, ruta)
+
+    @classmethod
+    def cargar(cls, ruta, **kwargs_indice):
+        """
+        Carga una galería guardada con guardar().
+        Retorna (galeria, modelo_hash) o (None, None) si no existe o está corrupta.
+        """
+        if not os.path.exists(ruta):
+            return None, None
+        try:
+            with np.load(ruta) as datos:
+                estado = {clave: datos[clave] for clave in datos.files}
+            clase = INDICES[str(estado.pop("tipo"))]
+            # El fichero puede ser de otro tipo que el configurado: solo los parámetros que acepta
+            kwargs_indice = {k: v for k, v in kwargs_indice.items() if k in clase.PARAMETROS}
+            indice = clase.desde_estado(estado, **kwargs_indice)
+        except Exception as e:
+            print(f"⚠️ No se pudo cargar el índice {ruta}: {e}")
+            return None, None
+
+        galeria = cls(dim=indice.dim, indice=indice)
+        galeria.nombres = [str(n) for n in estado["nombres"]]
+        galeria.ids = [None if i < 0 else int(i) for i in estado["ids"]]
+        galeria._reindexar_ids()
+        return galeria, str(estado["modelo_hash"])
+
+    @classmethod
+    def crear(cls, tipo="plano", **kwargs_indice):
+        """
+        Galería vacía con el backend de índice indicado ("plano" o "ivf").
+        kwargs_indice admite precision="float32" | "float16" | "int8".
+        """
+        return cls(indice=crear_indice(tipo, **kwargs_indice))
@@ -0,0 +1,363 @@
+import cv2
+import numpy as np
+
+# Formatos de almacenamiento de los vectores: float32 (exacto), float16 (mitad
+# de memoria) o int8 con una escala float32 por vector (un cuarto de memoria)
+PRECISIONES = {
+    "float32": np.float32,
+    "float16": np.float16,
+    "int8": np.int8,
+}
+_CERO = np.zeros(1)
+
+
+class IndicePlano:
+    """
+    Índice exacto: todos los vectores (normalizados L2) en una matriz contigua.
+    Una búsqueda es un producto matriz-vector contra toda la galería.
+
+    Con precision "float16" o "int8" la matriz se guarda cuantizada. Para
+    puntuar se convierte a float32 por bloques pequeños en un buffer que
+    cabe en caché (así se sigue usando BLAS sin materializar la galería
+    completa en float32); en int8 la escala de cada vector se aplica sobre
+    los scores, no sobre los vectores.
+    """
+
+    tipo = "plano"
+    # Parámetros de configuración que acepta el constructor (además de dim y capacidad)
+    PARAMETROS = ("precision",)
+    # Filas que se convierten a float32 de una vez al puntuar formatos cuantizados (~512 KB)
+    BLOQUE = 1024
+
+    def __init__(self, dim=128, capacidad=256, precision="float32"):
+        if precision not in PRECISIONES:
+            raise ValueError(f"Precisión desconocida: {precision} (opciones: {', '.join(PRECISIONES)})")
+        self.dim = dim
+        self.precision = precision
+        self._vectores = np.empty((max(1, capacidad), dim), dtype=PRECISIONES[precision])
+        self._escalas = np.empty(max(1, capacidad), dtype=np.float32) if precision == "int8" else None
+        self._n = 0
+        # Posiciones dadas de baja: se excluyen de las búsquedas hasta compactar()
+        self._eliminadas = np.empty(0, dtype=np.int64)
+
+    def __len__(self):
+        """Vectores activos (sin contar los eliminados pendientes de compactar)."""
+        return self._n - len(self._eliminadas)
+
+    @property
+    def eliminadas(self):
+        return len(self._eliminadas)
+
+    @property
+    def vectores(self):
+        """Vectores válidos en float32, forma (n, dim). Sin copia solo con precision float32."""
+        return self._decodificar(slice(0, self._n))
+
+    @property
+    def nbytes(self):
+        """Memoria ocupada por los vectores válidos (y sus escalas)."""
+        total = self._vectores[:self._n].nbytes
+        if self._escalas is not None:
+            total += self._escalas[:self._n].nbytes
+        return total
+
+    def _asegurar_capacidad(self, extra):
+        necesaria = self._n + extra
+        if necesaria <= self._vectores.shape[0]:
+            return
+        # Crecimiento geométrico: añadir es O(1) amortizado, sin reconstruir
+        capacidad = max(necesaria, self._vectores.shape[0] * 2)
+        nueva = np.empty((capacidad, self.dim), dtype=self._vectores.dtype)
+        nueva[:self._n] = self._vectores[:self._n]
+        self._vectores = nueva
+        if self._escalas is not None:
+            escalas = np.empty(capacidad, dtype=np.float32)
+            escalas[:self._n] = self._escalas[:self._n]
+            self._escalas = escalas
+
+    def _codificar(self, vectores):
+        """Vectores float32 -> (códigos en la precisión del índice, escalas o None)."""
+        if self.precision != "int8":
+            return vectores.astype(self._vectores.dtype, copy=False), None
+        maximos = np.abs(vectores).max(axis=1)
+        maximos[maximos == 0] = 1.0
+        escalas = (maximos / 127.0).astype(np.float32)
+        return np.rint(vectores / escalas[:, None]).astype(np.int8), escalas
+
+    def _decodificar(self, filas):
+        """Filas (slice o posiciones) del índice en float32."""
+        codigos = self._vectores[filas]
+        if self.precision == "float32":
+            return codigos
+        vectores = codigos.astype(np.float32)
+        if self._escalas is not None:
+            vectores *= self._escalas[filas][:, None]
+        return vectores
+
+    def _agregar_codificados(self, codigos, escalas=None):
+        self._asegurar_capacidad(len(codigos))
+        inicio = self._n
+        self._vectores[inicio:inicio + len(codigos)] = codigos
+        if self._escalas is not None:
+            self._escalas[inicio:inicio + len(codigos)] = escalas
+        self._n += len(codigos)
+        return np.arange(inicio, self._n)
+
+    def agregar(self, vectores):
+        """Añade vectores ya normalizados. Retorna sus posiciones en el índice."""
+        return self._agregar_codificados(*self._codificar(vectores))
+
+    def eliminar(self, posiciones):
+        """Da de baja posiciones. No mueve nada: las demás posiciones siguen siendo válidas."""
+        self._eliminadas = np.union1d(self._eliminadas, np.asarray(posiciones, dtype=np.int64))
+
+    def _activas(self):
+        if len(self._eliminadas) == 0:
+            return np.arange(self._n)
+        return np.setdiff1d(np.arange(self._n), self._eliminadas, assume_unique=True)
+
+    def compactar(self):
+        """
+        Elimina físicamente las posiciones dadas de baja.
+        Retorna las posiciones antiguas conservadas, en su nuevo orden (para remapear nombres/ids).
+        """
+        conservadas = self._activas()
+        m = len(conservadas)
+        self._vectores[:m] = self._vectores[conservadas]
+        if self._escalas is not None:
+            self._escalas[:m] = self._escalas[conservadas]
+        self._n = m
+        self._eliminadas = np.empty(0, dtype=np.int64)
+        return conservadas
+
+    def _puntuar(self, consultas):
+        """Producto escalar de las consultas contra toda la galería, forma (q, n)."""
+        if self.precision == "float32":
+            return consultas @ self.vectores.T
+        scores = np.empty((len(consultas), self._n), dtype=np.float32)
+        bloque = np.empty((min(self.BLOQUE, self._n), self.dim), dtype=np.float32)
+        for inicio in range(0, self._n, self.BLOQUE):
+            fin = min(self._n, inicio + self.BLOQUE)
+            destino = bloque[:fin - inicio]
+            if self.precision == "float16":
+                # OpenCV convierte float16 -> float32 con SIMD; numpy lo hace elemento a elemento (~3x más lento)
+                cv2.add(self._vectores[inicio:fin], _CERO, dst=destino, dtype=cv2.CV_32F)
+            else:
+                destino[...] = self._vectores[inicio:fin]
+            scores[:, inicio:fin] = consultas @ destino.T
+            if self._escalas is not None:
+                scores[:, inicio:fin] *= self._escalas[inicio:fin]
+        return scores
+
+    @staticmethod
+    def _top_k(scores, k):
+        """Top-k por filas. Retorna (scores, posiciones) ordenados de mayor a menor."""
+        k = min(k, scores.shape[1])
+        if k < scores.shape[1]:
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(scores.shape[1]), (scores.shape[0], k))
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        orden = np.argsort(-top_scores, axis=1)
+        return np.take_along_axis(top_scores, orden, axis=1), np.take_along_axis(top, orden, axis=1)
+
+    def buscar(self, consultas, k=1):
+        """
+        consultas: (q, dim) normalizadas.
+        Retorna (scores, posiciones), ambos de forma (q, min(k, n)).
+        """
+        if len(self) == 0:
+            return np.empty((len(consultas), 0), np.float32), np.empty((len(consultas), 0), np.int64)
+        scores = self._puntuar(consultas)
+        if len(self._eliminadas) == 0:
+            return self._top_k(scores, k)
+        scores[:, self._eliminadas] = -np.inf
+        return self._top_k(scores, min(k, len(self)))
+
+    def estado(self):
+        """Arrays necesarios para persistir el índice (ver GaleriaRostros.guardar)."""
+        estado = {"vectores": self._vectores[:self._n], "precision": self.precision}
+        if self._escalas is not None:
+            estado["escalas"] = self._escalas[:self._n]
+        return estado
+
+    def _cargar_vectores(self, estado):
+        """Restaura los vectores guardados; si se guardaron con otra precisión se recodifican."""
+        guardada = str(estado.get("precision", "float32"))
+        if guardada == self.precision:
+            IndicePlano._agregar_codificados(self, estado["vectores"], estado.get("escalas"))
+            return
+        vectores = estado["vectores"].astype(np.float32)
+        if "escalas" in estado:
+            vectores *= estado["escalas"][:, None]
+        IndicePlano.agregar(self, vectores)
+
+    @classmethod
+    def desde_estado(cls, estado, **kwargs):
+        vectores = estado["vectores"]
+        kwargs.setdefault("precision", str(estado.get("precision", "float32")))
+        indice = cls(dim=vectores.shape[1], capacidad=len(vectores), **kwargs)
+        indice._cargar_vectores(estado)
+        return indice
+
+
+class IndiceIVF(IndicePlano):
+    """
+    Índice aproximado IVF (inverted file) para galerías muy grandes.
+
+    Los vectores se reparten en listas según su centroide más cercano
+    (k-means esférico). Una búsqueda solo puntúa los vectores de las
+    n_probe listas más cercanas a la consulta, en lugar de toda la galería.
+
+    El índice se construye de forma incremental: mientras hay pocos vectores
+    se comporta como un índice plano y, al superar min_entrenamiento, entrena
+    los centroides una vez. A partir de ahí cada vector nuevo se asigna a su
+    lista sin reconstruir nada. reentrenar() vuelve a calcular los
+    centroides si la galería ha crecido mucho desde el entrenamiento.
+    """
+
+    tipo = "ivf"
+    PARAMETROS = IndicePlano.PARAMETROS + ("n_listas", "n_probe", "min_entrenamiento", "iteraciones")
+
+    def __init__(self, dim=128, capacidad=256, n_listas=None, n_probe=16, min_entrenamiento=4096, iteraciones=10,
+                 precision="float32"):
+        super().__init__(dim, capacidad, precision)
+        self.n_listas = n_listas
+        self.n_probe = n_probe
+        self.min_entrenamiento = min_entrenamiento
+        self.iteraciones = iteraciones
+        self.centroides = None
+        self._asignacion = np.empty(self._vectores.shape[0], dtype=np.int32)
+        self._listas = []
+
+    @property
+    def entrenado(self):
+        return self.centroides is not None
+
+    def _asegurar_capacidad(self, extra):
+        super()._asegurar_capacidad(extra)
+        if self._asignacion.shape[0] < self._vectores.shape[0]:
+            nueva = np.empty(self._vectores.shape[0], dtype=np.int32)
+            nueva[:self._n] = self._asignacion[:self._n]
+            self._asignacion = nueva
+
+    def agregar(self, vectores):
+        posiciones = super().agregar(vectores)
+        if self.entrenado:
+            self._asignar(posiciones)
+        elif self._n >= self.min_entrenamiento:
+            self.reentrenar()
+        return posiciones
+
+    def eliminar(self, posiciones):
+        super().eliminar(posiciones)
+        if self.entrenado:
+            # Sacarlas de sus listas: las búsquedas IVF ya no las puntúan
+            posiciones = np.asarray(posiciones, dtype=np.int64)
+            for lista in np.unique(self._asignacion[posiciones]):
+                self._listas[lista] = np.setdiff1d(self._listas[lista], posiciones, assume_unique=True)
+
+    def compactar(self):
+        conservadas = super().compactar()
+        if self.entrenado:
+            asignacion = self._asignacion[conservadas]
+            self._asignacion[:len(asignacion)] = asignacion
+            self._reconstruir_listas(asignacion)
+        return conservadas
+
+    def _reconstruir_listas(self, asignacion):
+        """Listas invertidas a partir de la lista asignada a cada posición."""
+        orden = np.argsort(asignacion, kind="stable")
+        cortes = np.searchsorted(asignacion[orden], np.arange(len(self.centroides) + 1))
+        self._listas = [orden[cortes[l]:cortes[l + 1]].astype(np.int64) for l in range(len(self.centroides))]
+
+    def _asignar(self, posiciones):
+        listas = np.argmax(self._decodificar(posiciones) @ self.centroides.T, axis=1).astype(np.int32)
+        self._asignacion[posiciones] = listas
+        for lista in np.unique(listas):
+            nuevas = posiciones[listas == lista]
+            self._listas[lista] = np.concatenate([self._listas[lista], nuevas])
+
+    def reentrenar(self, semilla=0):
+        """Entrena los centroides (k-means esférico) y reparte todos los vectores."""
+        n_listas = self.n_listas or max(1, int(np.sqrt(self._n)))
+        n_listas = min(n_listas, self._n)
+        rng = np.random.default_rng(semilla)
+
+        # Con ~256 vectores por centroide el k-means ya converge bien
+        if self._n > 256 * n_listas:
+            muestra = self._decodificar(rng.choice(self._n, 256 * n_listas, replace=False))
+        else:
+            muestra = self.vectores
+
+        centroides = muestra[rng.choice(len(muestra), n_listas, replace=False)].copy()
+        for _ in range(self.iteraciones):
+            asignacion = np.argmax(muestra @ centroides.T, axis=1)
+            sumas = np.zeros_like(centroides)
+            np.add.at(sumas, asignacion, muestra)
+            normas = np.linalg.norm(sumas, axis=1, keepdims=True)
+            vacios = normas[:, 0] == 0
+            # Un centroide sin vectores se re-siembra con un punto al azar
+            sumas[vacios] = muestra[rng.choice(len(muestra), int(vacios.sum()))]
+            normas[vacios] = 1.0
+            centroides = sumas / normas
+
+        self.centroides = centroides.astype(np.float32)
+        self._listas = [np.empty(0, dtype=np.int64) for _ in range(n_listas)]
+        self._asignar(self._activas())
+
+    def buscar(self, consultas, k=1):
+        if not self.entrenado:
+            return super().buscar(consultas, k)
+
+        n_probe = min(self.n_probe, len(self.centroides))
+        listas_q = self._top_k(consultas @ self.centroides.T, n_probe)[1]
+
+        k_max = min(k, self._n)
+        scores_out = np.full((len(consultas), k_max), -np.inf, dtype=np.float32)
+        pos_out = np.full((len(consultas), k_max), -1, dtype=np.int64)
+        for i, (consulta, listas) in enumerate(zip(consultas, listas_q)):
+            candidatos = np.concatenate([self._listas[l] for l in listas])
+            if len(candidatos) == 0:
+                continue
+            scores = (self._decodificar(candidatos) @ consulta)[None, :]
+            top_scores, top = self._top_k(scores, k_max)
+            scores_out[i, :top.shape[1]] = top_scores[0]
+            pos_out[i, :top.shape[1]] = candidatos[top[0]]
+        return scores_out, pos_out
+
+    def estado(self):
+        estado = super().estado()
+        if self.entrenado:
+            estado["centroides"] = self.centroides
+            estado["asignacion"] = self._asignacion[:self._n]
+        return estado
+
+    @classmethod
+    def desde_estado(cls, estado, **kwargs):
+        vectores = estado["vectores"]
+        kwargs.setdefault("precision", str(estado.get("precision", "float32")))
+        indice = cls(dim=vectores.shape[1], capacidad=len(vectores), **kwargs)
+        indice._cargar_vectores(estado)
+        if "centroides" in estado:
+            # Se restauran las listas guardadas: no hace falta reentrenar al arrancar
+            indice.centroides = estado["centroides"].astype(np.float32)
+            asignacion = estado["asignacion"].astype(np.int32)
+            indice._asignacion[:len(asignacion)] = asignacion
+            indice._reconstruir_listas(asignacion)
+        elif len(indice) >= indice.min_entrenamiento:
+            indice.reentrenar()
+        return indice
+
+
+INDICES = {
+    IndicePlano.tipo: IndicePlano,
+    IndiceIVF.tipo: IndiceIVF,
+}
+
+
+def crear_indice(tipo="plano", **kwargs):
+    """Crea un índice por nombre ("plano" exacto o "ivf" aproximado)."""
+    if tipo not in INDICES:
+        raise ValueError(f"Tipo de índice desconocido: {tipo} (opciones: {', '.join(INDICES)})")
+    return INDICES[tipo](**kwargs)
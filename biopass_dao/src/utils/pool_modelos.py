@@ -0,0 +1,169 @@
+import queue
+import threading
+from contextlib import contextmanager
+import cv2
+import numpy as np
+
+
+class ModelosFaciales:
+    """
+    Un juego independiente de modelos: YuNet + SFace (+ SFace por lotes).
+
+    YuNet necesita setInputSize() para cada resolución, lo que muta el
+    detector. Para no hacerlo en cada llamada se crea de antemano un
+    detector ya dimensionado por cada resolución habitual (cámaras). Las
+    demás (fotos de tamaño arbitrario del backfill o del enrolamiento
+    masivo) comparten un único detector auxiliar que se redimensiona con
+    setInputSize(): la instancia se usa en exclusiva, así que es seguro, y
+    la memoria no crece con cada tamaño distinto.
+    """
+
+    SFACE_INPUT_SIZE = (112, 112)
+    # Si el grafo SFace no acepta lotes se deja de intentar en todas las instancias
+    lotes_soportados = True
+
+    def __init__(self, detector_path, recognizer_path, tamanos_entrada=()):
+        self.detector_path = detector_path
+        self.recognizer_path = recognizer_path
+        self.detectores = {}
+        for ancho, alto in tamanos_entrada:
+            self.detectores[(ancho, alto)] = self._crear_detector(ancho, alto)
+        self.detector_auxiliar = None
+
+        self.recognizer = None
+        self.recognizer_net = None
+        try:
+            self.recognizer = cv2.FaceRecognizerSF.create(recognizer_path, "")
+        except cv2.error as e:
+            # Sin SFace se puede seguir detectando (p.ej. para la vista en vivo)
+            print(f"❌ Error cargando Recognizer SFace: {e}")
+            return
+
+        # Misma red SFace cargada con cv2.dnn para extraer features de varios rostros en un solo forward
+        if ModelosFaciales.lotes_soportados:
+            try:
+                self.recognizer_net = cv2.dnn.readNet(recognizer_path)
+            except cv2.error as e:
+                print(f"⚠️ SFace por lotes no disponible, se usará rostro a rostro: {e}")
+                ModelosFaciales.lotes_soportados = False
+
+    def _crear_detector(self, ancho, alto):
+        return cv2.FaceDetectorYN.create(
+            self.detector_path,
+            "",
+            (ancho, alto),
+            0.9, # Score threshold
+            0.3, # NMS threshold
+            5000
+        )
+
+    def detector_para(self, ancho, alto):
+        """Detector YuNet dimensionado para (ancho, alto)."""
+        detector = self.detectores.get((ancho, alto))
+        if detector is not None:
+            return detector
+        if self.detector_auxiliar is None:
+            self.detector_auxiliar = self._crear_detector(ancho, alto)
+        else:
+            self.detector_auxiliar.setInputSize((ancho, alto))
+        return self.detector_auxiliar
+
+    def detectar(self, imagen):
+        """Todos los rostros: array (n, 15) (coords + landmarks + score), vacío si no hay."""
+        h, w = imagen.shape[:2]
+        # faces[1] es la lista de rostros. faces[0] es el status.
+        _, faces = self.detector_para(w, h).detect(imagen)
+        if faces is None:
+            return np.empty((0, 15), dtype=np.float32)
+        return faces
+
+    def alinear(self, imagen, faces):
+        """Recortes alineados (112x112) de cada rostro, usando sus landmarks."""
+        if self.recognizer is None:
+            return []
+        return [self.recognizer.alignCrop(imagen, face) for face in faces]
+
+    def extraer_features(self, alineados):
+        """
+        Features SFace de varios recortes en un único forward (blob de n
+        imágenes), forma (n, 128). Sin red por lotes, rostro a rostro.
+        """
+        if len(alineados) == 0:
+            return np.empty((0, 128), dtype=np.float32)
+
+        if self.recognizer_net is not None and ModelosFaciales.lotes_soportados:
+            try:
+                # Mismo preprocesado que FaceRecognizerSF::feature (escala 1, 112x112, BGR->RGB)
+                blob = cv2.dnn.blobFromImages(alineados, 1.0, self.SFACE_INPUT_SIZE, (0, 0, 0), True, False)
+                self.recognizer_net.setInput(blob)
+                return self.recognizer_net.forward().reshape(len(alineados), -1).copy()
+            except cv2.error as e:
+                print(f"⚠️ Falló SFace por lotes, se usa rostro a rostro: {e}")
+                ModelosFaciales.lotes_soportados = False
+
+        return np.vstack([self.recognizer.feature(alineado) for alineado in alineados])
+
+
+class PoolModelos:
+    """
+    Pool acotado de instancias ModelosFaciales.
+
+    Cada petición (login, frame de una cámara, worker del servicio) toma una
+    instancia con usar(), trabaja con ella en exclusiva y la devuelve. Así
+    varias cámaras o logins se procesan en paralelo en una máquina multinúcleo
+    (OpenCV libera el GIL durante la inferencia) sin compartir estado mutable.
+    Las instancias se crean bajo demanda hasta `tamano`.
+    """
+
+    TAMANOS_ENTRADA = ((1280, 720), (640, 480), (640, 360))
+
+    def __init__(self, detector_path, recognizer_path, tamano=2, tamanos_entrada=TAMANOS_ENTRADA):
+        self.detector_path = detector_path
+        self.recognizer_path = recognizer_path
+        self.tamano = max(1, tamano)
+        self.tamanos_entrada = tamanos_entrada
+        self._libres = queue.LifoQueue()  # LIFO: se reutiliza la instancia con la caché más caliente
+        self._creadas = 0
+        self._lock = threading.Lock()
+
+    def _crear(self):
+        return ModelosFaciales(self.detector_path, self.recognizer_path, self.tamanos_entrada)
+
+    def precargar(self, n=1):
+        """Crea por adelantado hasta n instancias (la primera petición no paga la carga)."""
+        for _ in range(min(n, self.tamano)):
+            with self._lock:
+                if self._creadas >= self.tamano:
+                    return
+                self._creadas += 1
+            try:
+                self._libres.put(self._crear())
+            except Exception:
+                with self._lock:
+                    self._creadas -= 1
+                raise
+
+    @contextmanager
+    def usar(self, timeout=None):
+        """Toma una instancia en exclusiva; espera si todas están ocupadas."""
+        try:
+            modelos = self._libres.get_nowait()
+        except queue.Empty:
+            crear = False
+            with self._lock:
+                if self._creadas < self.tamano:
+                    self._creadas += 1
+                    crear = True
+            if crear:
+                try:
+                    modelos = self._crear()
+                except Exception:
+                    with self._lock:
+                        self._creadas -= 1
+                    raise
+            else:
+                modelos = self._libres.get(timeout=timeout)
+        try:
+            yield modelos
+        finally:
+            self._libres.put(modelos)
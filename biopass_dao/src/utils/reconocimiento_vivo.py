@@ -0,0 +1,177 @@
+import threading
+import time
+import cv2
+from src.utils.camera_utils import CameraUtils
+from src.utils.galeria import GaleriaRostros
+
+
+class Track:
+    """Un rostro seguido entre frames: caja (x, y, w, h), identidad y plantilla para el tracker."""
+
+    _siguiente_id = 0
+
+    def __init__(self, bbox, plantilla):
+        Track._siguiente_id += 1
+        self.id = Track._siguiente_id
+        self.bbox = bbox
+        self.plantilla = plantilla
+        self.nombre = "..."
+        self.score = 0.0
+        self.perdidos = 0
+
+
+class ReconocimientoEnVivo(threading.Thread):
+    """
+    Reconocimiento continuo fuera del hilo de Tk (productor/consumidor).
+
+    El hilo de captura entrega frames con enviar_frame() (solo se guarda el
+    último: si el consumidor va lento se descartan frames viejos). Este hilo:
+      - Cada `cada_n_frames` detecta con YuNet sobre el frame reducido a `escala`.
+      - Entre detecciones mueve las cajas con un tracker ligero
+        (matchTemplate en una ventana alrededor de la última posición).
+      - Solo calcula el encoding SFace cuando aparece un track nuevo.
+    La GUI lee el resultado con obtener_overlays() sin bloquearse.
+    """
+
+    def __init__(self, galeria, cada_n_frames=5, escala=0.5, iou_minimo=0.3, max_perdidos=2,
+                 threshold=GaleriaRostros.UMBRAL_COSENO):
+        super().__init__(daemon=True)
+        self.galeria = galeria
+        self.cada_n_frames = cada_n_frames
+        self.escala = escala
+        self.iou_minimo = iou_minimo
+        self.max_perdidos = max_perdidos
+        self.threshold = threshold
+
+        self.tracks = []
+        self._overlays = []
+        self._frame = None
+        self._frames_procesados = 0
+        self._condicion = threading.Condition()
+        self._detener = threading.Event()
+
+    def enviar_frame(self, frame):
+        """Llamado por el productor (hilo de captura). Sustituye el frame pendiente."""
+        with self._condicion:
+            self._frame = frame
+            self._condicion.notify()
+
+    def obtener_overlays(self):
+        """Lista de (bbox, nombre, score) en coordenadas del frame completo."""
+        with self._condicion:
+            return list(self._overlays)
+
+    def detener(self):
+        self._detener.set()
+        with self._condicion:
+            self._condicion.notify()
+
+    def run(self):
+        while not self._detener.is_set():
+            with self._condicion:
+                while self._frame is None and not self._detener.is_set():
+                    self._condicion.wait(0.5)
+                frame, self._frame = self._frame, None
+            if frame is None:
+                continue
+
+            try:
+                self._procesar(frame)
+            except Exception as e:
+                print(f"⚠️ Error en reconocimiento en vivo: {e}")
+                time.sleep(0.1)
+
+    def _procesar(self, frame):
+        pequeno = cv2.resize(frame, None, fx=self.escala, fy=self.escala, interpolation=cv2.INTER_AREA)
+        gris = cv2.cvtColor(pequeno, cv2.COLOR_BGR2GRAY)
+
+        if self._frames_procesados % self.cada_n_frames == 0:
+            self._detectar(frame, pequeno, gris)
+        else:
+            self._seguir(gris)
+        self._frames_procesados += 1
+
+        inversa = 1.0 / self.escala
+        overlays = [
+            (tuple(int(v * inversa) for v in track.bbox), track.nombre, track.score)
+            for track in self.tracks
+        ]
+        with self._condicion:
+            self._overlays = overlays
+
+    def _detectar(self, frame, pequeno, gris):
+        faces = CameraUtils.detectar_rostros(pequeno)
+        cajas = [tuple(float(v) for v in face[:4]) for face in faces]
+
+        # Asociación voraz detección <-> track por IoU
+        libres = set(range(len(cajas)))
+        for track in self.tracks:
+            mejor, mejor_iou = None, self.iou_minimo
+            for i in libres:
+                iou = self._iou(track.bbox, cajas[i])
+                if iou >= mejor_iou:
+                    mejor, mejor_iou = i, iou
+            if mejor is None:
+                track.perdidos += 1
+                continue
+            libres.discard(mejor)
+            track.bbox = cajas[mejor]
+            track.plantilla = self._recortar(gris, track.bbox)
+            track.perdidos = 0
+
+        self.tracks = [t for t in self.tracks if t.perdidos <= self.max_perdidos]
+
+        nuevas = sorted(libres)
+        if not nuevas:
+            return
+
+        # Solo los tracks nuevos pasan por SFace. Los landmarks se escalan al
+        # frame completo para que alignCrop trabaje con la máxima resolución.
+        faces_completas = faces[nuevas].copy()
+        faces_completas[:, :14] /= self.escala
+        encodings = CameraUtils.obtener_encodings_lote(frame, faces_completas)
+        resultados = self.galeria.buscar_lote(encodings, k=1) if len(encodings) else []
+
+        for i, mejores in zip(nuevas, resultados):
+            track = Track(cajas[i], self._recortar(gris, cajas[i]))
+            if mejores:
+                nombre, score = mejores[0]
+                track.nombre = nombre if score >= self.threshold else "Desconocido"
+                track.score = score
+            else:
+                track.nombre = "Sin usuarios"
+            self.tracks.append(track)
+
+    def _seguir(self, gris):
+        """Tracker ligero: busca la plantilla del rostro en una ventana 2x alrededor de la caja."""
+        alto, ancho = gris.shape
+        for track in self.tracks:
+            x, y, w, h = track.bbox
+            plantilla = track.plantilla
+            if plantilla is None or plantilla.size == 0:
+                continue
+            x0, y0 = max(0, int(x - w / 2)), max(0, int(y - h / 2))
+            x1, y1 = min(ancho, int(x + 1.5 * w)), min(alto, int(y + 1.5 * h))
+            ventana = gris[y0:y1, x0:x1]
+            if ventana.shape[0] < plantilla.shape[0] or ventana.shape[1] < plantilla.shape[1]:
+                continue
+            res = cv2.matchTemplate(ventana, plantilla, cv2.TM_CCOEFF_NORMED)
+            _, max_val, _, max_loc = cv2.minMaxLoc(res)
+            if max_val >= 0.5:
+                track.bbox = (x0 + max_loc[0], y0 + max_loc[1], w, h)
+
+    @staticmethod
+    def _recortar(gris, bbox):
+        x, y, w, h = (int(v) for v in bbox)
+        x, y = max(0, x), max(0, y)
+        return gris[y:y + max(1, h), x:x + max(1, w)].copy()
+
+    @staticmethod
+    def _iou(a, b):
+        ax, ay, aw, ah = a
+        bx, by, bw, bh = b
+        ix = max(0.0, min(ax + aw, bx + bw) - max(ax, bx))
+        iy = max(0.0, min(ay + ah, by + bh) - max(ay, by))
+        interseccion = ix * iy
+        union = aw * ah + bw * bh - interseccion
+        return interseccion / union if union > 0 else 0.0
@@ -0,0 +1,25 @@
+import os
+import sys
+
+import pytest
+
+# Añadir el directorio raíz del proyecto al path para permitir imports absolutos (src.xxx)
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.conexion_db import DBConnection
+from src.usuario_dao import UsuarioDAO
+
+
+@pytest.fixture
+def bd(tmp_path):
+    """BD SQLite temporal; el escritor se cierra (COMMIT de todo) al terminar el test."""
+    anterior = DBConnection.DB_FILE
+    DBConnection.DB_FILE = str(tmp_path / "biopass_test.db")
+    DBConnection._cerrado = False
+    UsuarioDAO._esquema_listo = None
+    yield DBConnection.DB_FILE
+    DBConnection.cerrar()
+    DBConnection._cerrado = False
+    DBConnection.DB_FILE = anterior
@@ -0,0 +1,29 @@
+import cv2
+import numpy as np
+
+import src.enrolamiento_masivo as enrolamiento
+from src.conexion_db import DBConnection
+from src.utils.camera_utils import CameraUtils
+
+
+def _procesar_falso(ruta, nombre):
+    """Sustituye a YuNet/SFace: las rutas "mal*" fallan con una excepción de OpenCV."""
+    if ruta.startswith("mal"):
+        raise cv2.error("detect falló")
+    return ruta, nombre, b"cara", np.ones(128, np.float32).tobytes(), None
+
+
+def test_un_fallo_no_deshace_el_lote(bd, monkeypatch):
+    # Los workers se crean con fork y heredan los sustitutos
+    monkeypatch.setattr(enrolamiento, "_procesar_imagen", _procesar_falso)
+    monkeypatch.setattr(enrolamiento, "_inicializar_worker", lambda: None)
+    monkeypatch.setattr(CameraUtils, "modelo_hash", staticmethod(lambda: "h"))
+    tareas = [(f"ok{i}.jpg", f"persona {i}") for i in range(5)] + [("mal.jpg", "rota")] + [("ok5.jpg", "persona 5")]
+
+    insertados, fallidos, _ = enrolamiento.enrolar(tareas, workers=2, chunksize=1, lote_bd=2)
+
+    assert insertados == 6
+    assert len(fallidos) == 1
+    assert fallidos[0][:2] == ("mal.jpg", "rota") and "error" in fallidos[0][2]
+    conn = DBConnection.get_connection()
+    assert conn.execute("SELECT COUNT(*) FROM usuarios").fetchone()[0] == 6
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from src.utils.galeria import GaleriaRostros
+
+
+def _encodings(n, semilla=0, dim=GaleriaRostros.DIM):
+    return np.random.default_rng(semilla).standard_normal((n, dim)).astype(np.float32)
+
+
+def _fuerza_bruta(galeria, consultas, k):
+    """Top-k de referencia: coseno de cada consulta contra cada rostro, ordenado con argsort."""
+    g = GaleriaRostros.normalizar(galeria)
+    q = GaleriaRostros.normalizar(consultas)
+    scores = q @ g.T
+    orden = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+    return orden, np.take_along_axis(scores, orden, axis=1)
+
+
+@pytest.mark.parametrize("k", [1, 5, 50])
+def test_top_k_coincide_con_fuerza_bruta(k):
+    encodings = _encodings(1000)
+    consultas = _encodings(20, semilla=1)
+    galeria = GaleriaRostros()
+    galeria.agregar_lote(encodings, [f"u{i}" for i in range(1000)], list(range(1000)))
+
+    esperado, scores = _fuerza_bruta(encodings, consultas, k)
+    for resultado, fila, fila_scores in zip(galeria.buscar_lote(consultas, k), esperado, scores):
+        assert [nombre for nombre, _ in resultado] == [f"u{i}" for i in fila]
+        assert [score for _, score in resultado] == pytest.approx(fila_scores, abs=1e-5)
+
+
+def test_k_mayor_que_la_galeria():
+    galeria = GaleriaRostros()
+    galeria.agregar_lote(_encodings(3), ["a", "b", "c"])
+    assert len(galeria.buscar(_encodings(1, semilla=1), k=10)) == 3
+
+
+def test_bajas_y_compactar_coinciden_con_fuerza_bruta():
+    encodings = _encodings(300)
+    consultas = _encodings(10, semilla=1)
+    galeria = GaleriaRostros()
+    galeria.agregar_lote(encodings, [f"u{i}" for i in range(300)], list(range(300)))
+    bajas = list(range(0, 300, 3))
+    assert galeria.eliminar_ids(bajas) == len(bajas)
+    assert len(galeria) == 200
+
+    conservados = [i for i in range(300) if i not in set(bajas)]
+    esperado, _ = _fuerza_bruta(encodings[conservados], consultas, 5)
+    nombres = [[f"u{conservados[i]}" for i in fila] for fila in esperado]
+    assert [[n for n, _ in r] for r in galeria.buscar_lote(consultas, 5)] == nombres
+    # Tras compactar (físicamente) los resultados no cambian
+    galeria.compactar()
+    assert galeria.indice.eliminadas == 0
+    assert [[n for n, _ in r] for r in galeria.buscar_lote(consultas, 5)] == nombres
+
+
+def test_agregar_un_id_existente_lo_reemplaza():
+    encodings = _encodings(2)
+    galeria = GaleriaRostros()
+    galeria.agregar_lote(encodings[:1], ["Ana"], [7])
+    galeria.agregar(encodings[1], "Ana", 7)
+    assert len(galeria) == 1
+    assert galeria.identificar(encodings[1]) == ("Ana", pytest.approx(1.0))
+
+
+def test_identificar_umbral():
+    galeria = GaleriaRostros()
+    assert galeria.identificar(_encodings(1)) == ("Sin usuarios", 0.0)
+    galeria.agregar(np.eye(1, GaleriaRostros.DIM, 0), "Ana", 1)
+    # Coseno 0: por debajo del umbral
+    assert galeria.identificar(np.eye(1, GaleriaRostros.DIM, 1))[0] == "Desconocido"
+    assert galeria.identificar(np.eye(1, GaleriaRostros.DIM, 0))[0] == "Ana"
@@ -0,0 +1,125 @@
+import numpy as np
+import pytest
+
+from src.utils.galeria import GaleriaRostros
+from src.utils.indices import IndiceIVF, IndicePlano, crear_indice
+
+
+def _agrupados(n, grupos=256, ruido=1.5, semilla=0, dim=128):
+    """Vectores normalizados alrededor de `grupos` centros solapados (como rostros de muchas personas)."""
+    rng = np.random.default_rng(semilla)
+    centros = rng.standard_normal((grupos, dim))
+    vectores = centros[rng.integers(0, grupos, n)] + ruido * rng.standard_normal((n, dim))
+    return GaleriaRostros.normalizar(vectores)
+
+
+def _consultas(vectores, n, semilla=1):
+    """Variaciones de rostros de la galería (otra foto de la misma persona)."""
+    rng = np.random.default_rng(semilla)
+    elegidos = rng.choice(len(vectores), n, replace=False)
+    return GaleriaRostros.normalizar(vectores[elegidos] + 0.05 * rng.standard_normal((n, vectores.shape[1])))
+
+
+def _recall(aproximado, exacto):
+    return np.mean([len(set(a) & set(e)) / len(e) for a, e in zip(aproximado, exacto)])
+
+
+def test_ivf_recall():
+    vectores = _agrupados(20000)
+    consultas = _consultas(vectores, 200)
+    plano = IndicePlano(capacidad=len(vectores))
+    plano.agregar(vectores)
+    ivf = IndiceIVF(n_listas=128, n_probe=16, min_entrenamiento=4096)
+    ivf.agregar(vectores)
+    assert ivf.entrenado
+
+    _, exacto = plano.buscar(consultas, 10)
+    scores, aproximado = ivf.buscar(consultas, 10)
+    # Puntuando 16 de 128 listas (~1/8 de la galería)
+    assert _recall(aproximado, exacto) >= 0.9
+    # El mejor match (la misma persona) se encuentra casi siempre
+    assert np.mean(aproximado[:, 0] == exacto[:, 0]) >= 0.98
+    # Los scores que devuelve son los exactos de esos vectores
+    assert scores == pytest.approx(np.einsum("qd,qkd->qk", consultas, vectores[aproximado]), abs=1e-5)
+
+    # Con n_probe = n_listas se puntúa toda la galería: resultado exacto
+    ivf.n_probe = 128
+    assert _recall(ivf.buscar(consultas, 10)[1], exacto) == 1.0
+
+
+def test_ivf_sin_entrenar_es_exacto():
+    vectores = _agrupados(500)
+    consultas = _consultas(vectores, 20)
+    plano, ivf = IndicePlano(), IndiceIVF(min_entrenamiento=4096)
+    plano.agregar(vectores)
+    ivf.agregar(vectores)
+    assert not ivf.entrenado
+    assert (ivf.buscar(consultas, 5)[1] == plano.buscar(consultas, 5)[1]).all()
+
+
+def test_ivf_bajas_y_altas_tras_entrenar():
+    vectores = _agrupados(3000)
+    ivf = IndiceIVF(n_listas=32, n_probe=32, min_entrenamiento=2000)
+    ivf.agregar(vectores[:2500])
+    assert ivf.entrenado
+    # Las nuevas se asignan a su lista sin reentrenar
+    posiciones = ivf.agregar(vectores[2500:])
+    assert ivf.buscar(vectores[2500:2510], 1)[1][:, 0].tolist() == posiciones[:10].tolist()
+    ivf.eliminar(posiciones[:10])
+    assert not set(ivf.buscar(vectores[2500:2510], 5)[1].ravel()) & set(posiciones[:10].tolist())
+    # Con n_probe = n_listas el IVF puntúa todo: mismo resultado que tras compactar
+    antes = ivf.buscar(vectores[:50], 3)[0]
+    ivf.compactar()
+    assert ivf.buscar(vectores[:50], 3)[0] == pytest.approx(antes)
+
+
+@pytest.mark.parametrize("tipo", ["plano", "ivf"])
+def test_guardar_y_cargar(tmp_path, tipo):
+    ruta = str(tmp_path / "indice.npz")
+    vectores = _agrupados(5000)
+    galeria = GaleriaRostros.crear(tipo, min_entrenamiento=1000) if tipo == "ivf" else GaleriaRostros.crear(tipo)
+    galeria.agregar_lote(vectores, [f"u{i}" for i in range(5000)], list(range(1, 5001)))
+    galeria.eliminar_ids([1, 2, 3])
+    galeria.guardar(ruta, "hash")
+
+    cargada, modelo_hash = GaleriaRostros.cargar(ruta)
+    assert modelo_hash == "hash"
+    assert cargada.indice.tipo == tipo and len(cargada) == 4997 and cargada.max_id() == 5000
+    assert not cargada.tiene_id(1) and cargada.tiene_id(4)
+    consultas = _consultas(vectores, 20)
+    assert cargada.buscar_lote(consultas, 5) == galeria.buscar_lote(consultas, 5)
+    if tipo == "ivf":
+        # Las listas se restauran del fichero, sin reentrenar
+        assert (cargada.indice.centroides == galeria.indice.centroides).all()
+
+
+def test_cargar_filtra_parametros_de_otro_tipo(tmp_path):
+    # Configurado como IVF pero el fichero guardado es plano (o al revés): no debe fallar
+    ruta = str(tmp_path / "indice.npz")
+    galeria = GaleriaRostros.crear("plano")
+    galeria.agregar_lote(_agrupados(10), [str(i) for i in range(10)], list(range(10)))
+    galeria.guardar(ruta)
+    cargada, _ = GaleriaRostros.cargar(ruta, n_listas=64, n_probe=4, precision="float32")
+    assert cargada is not None and cargada.indice.tipo == "plano" and len(cargada) == 10
+
+    galeria = GaleriaRostros.crear("ivf", min_entrenamiento=5)
+    galeria.agregar_lote(_agrupados(10), [str(i) for i in range(10)], list(range(10)))
+    galeria.guardar(ruta)
+    cargada, _ = GaleriaRostros.cargar(ruta, n_probe=2)
+    assert cargada.indice.tipo == "ivf" and cargada.indice.n_probe == 2
+
+
+def test_cargar_fichero_invalido(tmp_path):
+    assert GaleriaRostros.cargar(str(tmp_path / "no_existe.npz")) == (None, None)
+    corrupto = tmp_path / "corrupto.npz"
+    corrupto.write_bytes(b"esto no es un npz")
+    assert GaleriaRostros.cargar(str(corrupto)) == (None, None)
+    desconocido = str(tmp_path / "desconocido.npz")
+    np.savez(desconocido, tipo="hnsw", modelo_hash="", ids=np.zeros(0, np.int64), nombres=np.zeros(0, str),
+             vectores=np.zeros((0, 128), np.float32))
+    assert GaleriaRostros.cargar(desconocido) == (None, None)
+
+
+def test_tipo_desconocido():
+    with pytest.raises(ValueError):
+        crear_indice("hnsw")
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from src.utils.galeria import GaleriaRostros
+from src.utils.indices import IndiceIVF, IndicePlano
+
+# Error máximo de score (coseno) admitido frente a float32
+ERROR_MAXIMO = {"float16": 5e-4, "int8": 1e-2}
+
+
+def _vectores(n, semilla=0):
+    return GaleriaRostros.normalizar(np.random.default_rng(semilla).standard_normal((n, 128)))
+
+
+@pytest.mark.parametrize("precision", ["float16", "int8"])
+@pytest.mark.parametrize("n", [100, 5000])  # menos de un BLOQUE y varios bloques con resto
+def test_error_de_score(precision, n):
+    vectores, consultas = _vectores(n), _vectores(30, semilla=1)
+    indice = IndicePlano(precision=precision)
+    indice.agregar(vectores)
+    referencia = consultas @ vectores.T
+    assert np.abs(indice._puntuar(consultas) - referencia).max() < ERROR_MAXIMO[precision]
+
+    scores, posiciones = indice.buscar(consultas, 5)
+    assert np.abs(scores - np.take_along_axis(referencia, posiciones, axis=1)).max() < ERROR_MAXIMO[precision]
+    # Cada consulta que es un rostro de la galería se encuentra a sí misma
+    assert (indice.buscar(vectores[:50], 1)[1][:, 0] == np.arange(50)).all()
+
+
+def test_memoria():
+    vectores = _vectores(1000)
+    nbytes = {}
+    for precision in ("float32", "float16", "int8"):
+        indice = IndicePlano(precision=precision)
+        indice.agregar(vectores)
+        nbytes[precision] = indice.nbytes
+    assert nbytes["float32"] == 1000 * 128 * 4
+    assert nbytes["float16"] == nbytes["float32"] // 2
+    # int8: un byte por componente más una escala float32 por vector
+    assert nbytes["int8"] == 1000 * (128 + 4)
+
+
+def test_vector_nulo_en_int8():
+    indice = IndicePlano(precision="int8")
+    indice.agregar(np.zeros((1, 128), np.float32))
+    assert np.isfinite(indice.vectores).all() and not indice.vectores.any()
+
+
+def test_ivf_cuantizado():
+    vectores, consultas = _vectores(3000), _vectores(20, semilla=1)
+    plano = IndicePlano()
+    plano.agregar(vectores)
+    ivf = IndiceIVF(n_listas=16, n_probe=16, min_entrenamiento=1000, precision="int8")
+    ivf.agregar(vectores)
+    assert ivf.entrenado
+    # Con n_probe = n_listas solo difiere por la cuantización
+    scores, posiciones = ivf.buscar(consultas, 3)
+    referencia = np.take_along_axis(consultas @ vectores.T, posiciones, axis=1)
+    assert np.abs(scores - referencia).max() < ERROR_MAXIMO["int8"]
+    assert (posiciones[:, 0] == plano.buscar(consultas, 1)[1][:, 0]).all()
+
+
+@pytest.mark.parametrize("guardada,configurada", [("float32", "int8"), ("int8", "float16"), ("float16", "float32")])
+def test_cargar_con_otra_precision(tmp_path, guardada, configurada):
+    ruta = str(tmp_path / "indice.npz")
+    vectores = _vectores(200)
+    galeria = GaleriaRostros.crear(precision=guardada)
+    galeria.agregar_lote(vectores, [str(i) for i in range(200)], list(range(200)))
+    galeria.guardar(ruta)
+
+    cargada, _ = GaleriaRostros.cargar(ruta, precision=configurada)
+    assert cargada.indice.precision == configurada
+    assert cargada.matriz.dtype == np.float32
+    error = ERROR_MAXIMO.get(guardada, 0) + ERROR_MAXIMO.get(configurada, 0)
+    assert np.abs(cargada.matriz - vectores).max() < max(error, 1e-7)
+    # Sin precisión configurada se mantiene la del fichero
+    assert GaleriaRostros.cargar(ruta)[0].indice.precision == guardada
+
+
+def test_precision_desconocida():
+    with pytest.raises(ValueError):
+        IndicePlano(precision="int4")
@@ -0,0 +1,73 @@
+from contextlib import contextmanager
+
+import cv2
+import numpy as np
+import pytest
+
+from src.servicio_reconocimiento import LoteadorReconocimiento, Peticion
+from src.utils.camera_utils import CameraUtils
+from src.utils.galeria import GaleriaRostros
+
+
+def _vector(semilla):
+    v = np.random.default_rng(semilla).standard_normal(GaleriaRostros.DIM).astype(np.float32)
+    return v / np.linalg.norm(v)
+
+
+class ModelosFalsos:
+    """Un rostro por imagen; las imágenes con el píxel (0, 0) a 255 hacen fallar a YuNet."""
+
+    def __init__(self, recognizer=True):
+        self.recognizer = object() if recognizer else None
+
+    def detectar(self, imagen):
+        if imagen[0, 0, 0] == 255:
+            raise cv2.error("detect falló")
+        return np.array([[1, 2, 3, 4] + [0] * 11], dtype=np.float32)
+
+    def alinear(self, imagen, faces):
+        return [imagen] * len(faces)
+
+    def extraer_features(self, alineados):
+        return np.vstack([_vector(0)] * len(alineados)) if alineados else np.empty((0, GaleriaRostros.DIM), np.float32)
+
+
+@pytest.fixture
+def loteador():
+    galeria = GaleriaRostros.crear("plano")
+    galeria.agregar_lote(np.vstack([_vector(0), _vector(1)]), ["ana", "luis"], [1, 2])
+    return LoteadorReconocimiento(None, galeria)
+
+
+def _usar_modelos(monkeypatch, modelos):
+    @contextmanager
+    def usar():
+        yield modelos
+    monkeypatch.setattr(CameraUtils, "modelos", staticmethod(usar))
+
+
+def test_una_imagen_rota_no_falla_el_lote(loteador, monkeypatch):
+    _usar_modelos(monkeypatch, ModelosFalsos())
+    buena = Peticion(imagen=np.zeros((8, 8, 3), np.uint8))
+    rota = Peticion(imagen=np.full((8, 8, 3), 255, np.uint8))
+    features = Peticion(features=_vector(1)[None])
+
+    loteador._procesar([buena, rota, features])
+
+    assert buena.futuro.result()["rostros"][0]["nombre"] == "ana"
+    assert buena.futuro.result()["rostros"][0]["bbox"] == (1, 2, 3, 4)
+    with pytest.raises(cv2.error):
+        rota.futuro.result()
+    assert features.futuro.result()["rostros"][0]["nombre"] == "luis"
+
+
+def test_features_sin_recognizer(loteador, monkeypatch):
+    _usar_modelos(monkeypatch, ModelosFalsos(recognizer=False))
+    imagen = Peticion(imagen=np.zeros((8, 8, 3), np.uint8))
+    features = Peticion(features=np.vstack([_vector(1), _vector(0)]))
+
+    loteador._procesar([imagen, features])
+
+    with pytest.raises(RuntimeError):
+        imagen.futuro.result()
+    assert [r["nombre"] for r in features.futuro.result()["rostros"]] == ["luis", "ana"]
@@ -0,0 +1,64 @@
+import numpy as np
+
+from src.sincronizacion_galeria import SincronizadorGaleria
+from src.usuario_dao import UsuarioDAO
+from src.utils.camera_utils import CameraUtils
+from src.utils.galeria import GaleriaRostros
+
+HASH = "modelo-test"
+
+
+def _encoding(i):
+    """Encoding de prueba: un eje distinto para cada i, así cada uno solo se parece a sí mismo."""
+    encoding = np.zeros(128, np.float32)
+    encoding[i] = 1.0
+    return CameraUtils.encoding_a_bytes(encoding)
+
+
+def _identificar(galeria, i):
+    return galeria.identificar(CameraUtils.bytes_a_encoding(_encoding(i)))[0]
+
+
+def test_alta_backfill_modificacion_y_baja(bd):
+    # Otro terminal (u otro proceso) escribe en la BD; esta galería solo se entera por el sincronizador
+    galeria = GaleriaRostros.crear("plano")
+    sincronizador = SincronizadorGaleria(galeria, HASH, desde_cambio=UsuarioDAO.ultimo_cambio(),
+                                         desde_baja=UsuarioDAO.ultima_baja())
+
+    ana = UsuarioDAO.registrar_usuario("Ana", b"cara", _encoding(0), HASH)
+    # Sin encoding todavía (como lo deja enrolar sin rostro o una BD antigua)
+    luis = UsuarioDAO.registrar_usuario("Luis", b"cara")
+    assert sincronizador.sincronizar() == (1, 0)
+    assert len(galeria) == 1 and _identificar(galeria, 0) == "Ana"
+
+    # Un id menor que el último visto que recibe su encoding con un UPDATE (BackfillEncodings)
+    otro = UsuarioDAO.registrar_usuario("Eva", b"cara", _encoding(2), HASH)
+    UsuarioDAO.actualizar_encoding(luis, _encoding(1), HASH).result()
+    assert luis < otro
+    assert sincronizador.sincronizar() == (2, 0)
+    assert len(galeria) == 3 and _identificar(galeria, 1) == "Luis"
+
+    # Encoding recalculado de un usuario ya cargado: se reemplaza, no se duplica
+    UsuarioDAO.actualizar_encoding(ana, _encoding(3), HASH).result()
+    assert sincronizador.sincronizar() == (1, 0)
+    assert len(galeria) == 3
+    assert _identificar(galeria, 3) == "Ana" and _identificar(galeria, 0) == "Desconocido"
+
+    # Un encoding de otro modelo no entra
+    UsuarioDAO.actualizar_encoding(otro, _encoding(4), "otro-modelo").result()
+    assert sincronizador.sincronizar() == (0, 0)
+
+    assert UsuarioDAO.eliminar_usuario(luis)
+    assert sincronizador.sincronizar() == (0, 1)
+    assert not galeria.tiene_id(luis) and _identificar(galeria, 1) == "Desconocido"
+    # Sin cambios nuevos no hay nada que aplicar
+    assert sincronizador.sincronizar() == (0, 0)
+
+
+def test_no_duplica_lo_registrado_en_este_terminal(bd):
+    galeria = GaleriaRostros.crear("plano")
+    sincronizador = SincronizadorGaleria(galeria, HASH)
+    user_id = UsuarioDAO.registrar_usuario("Ana", b"cara", _encoding(0), HASH)
+    galeria.agregar(CameraUtils.bytes_a_encoding(_encoding(0)), "Ana", user_id)
+    assert sincronizador.sincronizar() == (0, 0)
+    assert len(galeria) == 1
@@ -1,21 +1,75 @@
 import cv2
 import time
 import threading
+import numpy as np
+from multiprocessing import shared_memory
 
 class CameraCapture:
     """
     Clase que encapsula la cámara usando hilos, locks, fallbacks 
     y frame-warmup para un rendimiento fluido.
+
+    Los frames se leen directamente en un buffer circular preasignado
+    (cap.read(image=slot)), sin copias. Cada frame lleva un número de
+    secuencia y su instante de captura. read_latest(after_seq) espera a que
+    haya un frame más nuevo y devuelve una vista de solo lectura: el hilo de
+    captura nunca escribe en el slot entregado ni en el último publicado,
+    así que la vista es válida hasta la siguiente llamada a read_latest().
+
+    Con source=<ruta de vídeo> reproduce el fichero en vez de abrir la cámara
+    (benchmarks sin cámara). realtime=True respeta los FPS del vídeo y, como
+    una cámara, descarta frames si el consumidor va lento; realtime=False
+    espera a que se consuma cada frame (no se pierde ninguno). Al terminar
+    el vídeo finished pasa a True y read_latest() retorna None.
+
+    Con shared=True los slots viven en un bloque de multiprocessing.shared_memory
+    (se crea con el primer frame) para que otro proceso lea los frames sin
+    copiarlos ni serializarlos (ver InferenceProcess). Un slot fijado con pin()
+    no se sobrescribe hasta unpin().
     """
-    def __init__(self):
+    def __init__(self, buffer_size=3, source=None, realtime=True, shared=False):
         self.cap = None
-        self.frame = None
+        self.shared = shared
+        self.shm = None
+        self.pinned = set()
+        self.source = source
+        self.realtime = realtime
+        self.finished = False
+        self.fps = None
+        self.frames_read = 0
+        self.consumed_seq = 0
+        # Buffer circular: con 3 slots siempre hay uno libre para escribir
+        # (4 en modo compartido: el otro proceso tiene fijado uno más)
+        self.buffer_size = max(4 if shared else 3, buffer_size)
+        self.slots = [None] * self.buffer_size
+        self.slot_seq = [0] * self.buffer_size
+        # Instante de captura (ms, reloj monotónico) de cada slot, para MediaPipe VIDEO/LIVE_STREAM
+        self.slot_ts = [None] * self.buffer_size
+        self.seq = 0
+        self.latest = None  # slot del último frame publicado
+        self.leased = None  # slot entregado por read_latest() (no se sobrescribe)
         # 5. Actualización segura sin colisiones (Locks)
         self.lock = threading.Lock()
+        # Despierta a read_latest() en cuanto se publica un frame (sin sondeo)
+        self.new_frame = threading.Condition(self.lock)
         self.running = False
         self.thread = None
 
+    @property
+    def frame(self):
+        """Último frame publicado (sin copia) o None."""
+        with self.lock:
+            return self.slots[self.latest] if self.latest is not None else None
+
+    @property
+    def timestamp_ms(self):
+        with self.lock:
+            return self.slot_ts[self.latest] if self.latest is not None else None
+
     def start(self):
+        if self.source is not None:
+            return self._start_file()
+
         # 2. Búsqueda intensiva de la cámara (Fallbacks)
         configs = [
             (0, cv2.CAP_DSHOW),
@@ -42,13 +96,10 @@ class CameraCapture:
         self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
         
         # 4. Frames de "Calentamiento"
+        # read() ya espera al siguiente frame del sensor: no hace falta dormir entre lecturas
         print("Calentando la cámara (descartando frames oscuros iniciales)...")
         for i in range(60):
-            ret, tmp_frame = self.cap.read()
-            if ret:
-                with self.lock:
-                    self.frame = tmp_frame.copy()
-            time.sleep(0.01)
+            self._grab()
             
         print("Calentamiento terminado.")
         
@@ -58,28 +109,152 @@ class CameraCapture:
         self.thread.start()
         return True
 
+    def _start_file(self):
+        self.cap = cv2.VideoCapture(self.source)
+        if not self.cap.isOpened():
+            print(f"ERROR: No se pudo abrir el vídeo {self.source}.")
+            return False
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        print(f"Reproduciendo {self.source} ({self.fps:.0f} fps, {'tiempo real' if self.realtime else 'sin pausa'})")
+        # Instantes de captura sintéticos: frame n a n/fps del inicio (deterministas y crecientes)
+        self.start_ms = int(time.monotonic() * 1000)
+        self.running = True
+        self.thread = threading.Thread(target=self._update_file, daemon=True)
+        self.thread.start()
+        return True
+
+    def _free_slot(self):
+        with self.lock:
+            busy = {self.latest, self.leased} | self.pinned
+        return next(i for i in range(self.buffer_size) if i not in busy)
+
+    def _allocate_shared(self, shape, dtype):
+        """Crea el bloque compartido (buffer_size frames contiguos) y apunta los slots a él."""
+        nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        self.shm = shared_memory.SharedMemory(create=True, size=nbytes * self.buffer_size)
+        frames = np.ndarray((self.buffer_size,) + tuple(shape), dtype, buffer=self.shm.buf)
+        self.slots = [frames[i] for i in range(self.buffer_size)]
+
+    def shared_info(self):
+        """(nombre, shape, dtype, buffer_size) del bloque compartido, o None si aún no hay frames."""
+        if self.shm is None:
+            return None
+        return self.shm.name, self.slots[0].shape, self.slots[0].dtype.str, self.buffer_size
+
+    def pin(self, slot):
+        with self.lock:
+            self.pinned.add(slot)
+
+    def unpin(self, slot):
+        with self.lock:
+            self.pinned.discard(slot)
+
+    def _grab(self):
+        """Lee el siguiente frame directamente en un slot libre y lo publica."""
+        slot = self._free_slot()
+        # Con image= OpenCV decodifica sobre el array existente (solo reserva memoria
+        # en el primer frame o si cambia la resolución)
+        ret, frame = self.cap.read(image=self.slots[slot])
+        if not ret:
+            return False
+        if self.shared:
+            if self.shm is None:
+                self._allocate_shared(frame.shape, frame.dtype)
+            if frame is not self.slots[slot]:
+                # Primer frame (o cambio de buffer de OpenCV): se copia al slot compartido
+                np.copyto(self.slots[slot], frame)
+                frame = self.slots[slot]
+        if self.source is not None:
+            timestamp_ms = self.start_ms + int(self.frames_read * 1000 / self.fps)
+        else:
+            timestamp_ms = int(time.monotonic() * 1000)
+        self.frames_read += 1
+        with self.new_frame:
+            self.slots[slot] = frame
+            self.seq += 1
+            self.slot_seq[slot] = self.seq
+            self.slot_ts[slot] = timestamp_ms
+            self.latest = slot
+            self.new_frame.notify_all()
+        return True
+
     def _update(self):
         """Bucle que corre en un hilo separado para capturar imágenes continuamente."""
         while self.running:
             if self.cap is not None and self.cap.isOpened():
-                ret, frame = self.cap.read()
-                if ret:
-                    with self.lock:
-                        self.frame = frame.copy()
-            # Un pequeño sleep ayuda a que el hilo no consuma 100% de CPU innecesariamente
-            time.sleep(0.01)
+                if not self._grab():
+                    # Solo se espera si la cámara falla, para no girar en vacío
+                    time.sleep(0.01)
+
+    def _update_file(self):
+        """Como _update, para un fichero de vídeo: marca el ritmo y detecta el final."""
+        start = time.monotonic()
+        while self.running:
+            if not self.realtime:
+                # Sin pausa: no leer el siguiente hasta que se haya consumido el último
+                with self.new_frame:
+                    self.new_frame.wait_for(lambda: self.consumed_seq >= self.seq or not self.running)
+                if not self.running:
+                    break
+            if not self._grab():
+                break
+            if self.realtime:
+                wait = start + self.frames_read / self.fps - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+        with self.new_frame:
+            self.finished = True
+            self.running = False
+            self.new_frame.notify_all()
+
+    def read_latest(self, after_seq=0, timeout=None):
+        """
+        Espera a que haya un frame con secuencia mayor que after_seq.
+        Retorna (seq, frame, timestamp_ms); frame es una vista de solo lectura
+        válida hasta la siguiente llamada. Si vence el timeout o la cámara se
+        detiene retorna (after_seq, None, None).
+        """
+        with self.new_frame:
+            self.new_frame.wait_for(lambda: self.seq > after_seq or not self.running, timeout)
+            if self.seq <= after_seq or self.latest is None:
+                return after_seq, None, None
+            self.leased = self.latest
+            self.consumed_seq = self.slot_seq[self.leased]
+            # Despierta al lector del vídeo en modo sin pausa
+            self.new_frame.notify_all()
+            view = self.slots[self.leased].view()
+            view.flags.writeable = False
+            return self.slot_seq[self.leased], view, self.slot_ts[self.leased]
             
     def read(self):
         """Lee el último frame capturado de forma segura."""
         with self.lock:
-            if self.frame is not None:
-                return True, self.frame.copy() # Devolvemos una copia por seguridad
+            if self.latest is not None:
+                return True, self.slots[self.latest].copy() # Devolvemos una copia por seguridad
             return False, None
+
+    def read_stamped(self):
+        """Como read(), pero también devuelve el instante de captura del frame (ms)."""
+        with self.lock:
+            if self.latest is not None:
+                return True, self.slots[self.latest].copy(), self.slot_ts[self.latest]
+            return False, None, None
             
     def release(self):
         """Detiene el hilo y libera el recurso de la cámara."""
-        self.running = False
+        with self.new_frame:
+            self.running = False
+            self.new_frame.notify_all()
         if self.thread is not None:
             self.thread.join()
         if self.cap is not None:
             self.cap.release()
+        if self.shm is not None:
+            # Los procesos que lo tengan abierto conservan su mapeo hasta cerrarlo
+            self.slots = [None] * self.buffer_size
+            try:
+                self.shm.close()
+            except BufferError:
+                pass  # aún hay vistas vivas (el último frame entregado); se libera con ellas
+            self.shm.unlink()
+            self.shm = None
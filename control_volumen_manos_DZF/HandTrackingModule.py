@@ -3,16 +3,57 @@ import mediapipe as mp
 from mediapipe.tasks import python
 from mediapipe.tasks.python import vision
 import math
+import numpy as np
 import os
+import threading
+import time
+
+RUNNING_MODES = {
+    "image": vision.RunningMode.IMAGE,              # palm detection from scratch on every frame
+    "video": vision.RunningMode.VIDEO,              # synchronous, tracks landmarks between frames
+    "live_stream": vision.RunningMode.LIVE_STREAM,  # asynchronous, results arrive via callback
+}
 
 class HandDetector:
-    def __init__(self, mode=False, maxHands=2, detectionCon=0.5, trackCon=0.5):
+    tipIds = [4, 8, 12, 16, 20] # Thumb, Index, Middle, Ring, Pinky
+    HAND_CONNECTIONS = [
+        (0, 1), (1, 2), (2, 3), (3, 4),       # thumb
+        (0, 5), (5, 6), (6, 7), (7, 8),       # index
+        (0, 9), (9, 10), (10, 11), (11, 12),  # middle
+        (0, 13), (13, 14), (14, 15), (15, 16),# ring
+        (0, 17), (17, 18), (18, 19), (19, 20),# pinky
+        (5, 9), (9, 13), (13, 17), (5, 17)    # palm
+    ]
+    # The same connections as open polylines, so a hand is drawn in a single cv2 call
+    HAND_CHAINS = [
+        [0, 1, 2, 3, 4], [0, 5, 6, 7, 8], [0, 9, 10, 11, 12],
+        [0, 13, 14, 15, 16], [0, 17, 18, 19, 20], [5, 9, 13, 17, 5]
+    ]
+
+    def __init__(self, mode=False, maxHands=2, detectionCon=0.5, trackCon=0.5, runningMode="image",
+                 roi=False, roiScale=2.0, roiMinSize=160, fullSearchEvery=30):
         self.mode = mode
         self.maxHands = maxHands
         self.detectionCon = detectionCon
         self.trackCon = trackCon
+        if runningMode not in RUNNING_MODES:
+            raise ValueError(f"Unknown running mode: {runningMode} (options: {', '.join(RUNNING_MODES)})")
+        self.runningMode = runningMode
+        # Region of interest (IMAGE mode): infer on a square crop roiScale times the last hand's
+        # bounding box (at least roiMinSize px) and search the full frame every fullSearchEvery
+        # frames or as soon as the crop loses the hand. VIDEO/LIVE_STREAM already crop around
+        # the tracked hand inside MediaPipe, and moving the crop would break their tracking.
+        if roi and runningMode != "image":
+            print(f"Warning: roi=True only applies to the \"image\" running mode, ignored in \"{runningMode}\"")
+        self.roi = roi and runningMode == "image"
+        self.roiScale = roiScale
+        self.roiMinSize = roiMinSize
+        self.fullSearchEvery = fullSearchEvery
+        self._initState()
         
         # Initialize MediaPipe Tasks HandLandmarker
+        # In VIDEO/LIVE_STREAM modes palm detection only runs when tracking is lost;
+        # otherwise landmarks are tracked from the previous frame (min_tracking_confidence applies)
         base_options = python.BaseOptions(model_asset_path=os.path.join(os.path.dirname(__file__), 'hand_landmarker.task'))
         options = vision.HandLandmarkerOptions(
             base_options=base_options,
@@ -20,98 +61,258 @@ class HandDetector:
             min_hand_detection_confidence=self.detectionCon,
             min_hand_presence_confidence=self.trackCon,
             min_tracking_confidence=self.trackCon,
-            running_mode=vision.RunningMode.IMAGE) # IMAGE mode is easier as it requires no timestamps
+            running_mode=RUNNING_MODES[runningMode],
+            result_callback=self._onResult if runningMode == "live_stream" else None)
             
         self.detector = vision.HandLandmarker.create_from_options(options)
+
+    def _initState(self):
+        """Per-frame state (shared with detectors that get their landmarks elsewhere)."""
+        self.results = None
+        self.lmList = []
+        # Landmarks of every detected hand in pixels, computed once per frame by findHands()
+        self.landmarks = np.empty((0, 21, 3), np.float32)   # (hands, 21, 3): x, y, z (z scaled like x)
+        self.landmarksPx = np.empty((0, 21, 2), np.int32)   # (hands, 21, 2): integer x, y for drawing
+        self.lmArray = np.empty((0, 2), np.int32)           # (21, 2) of the hand picked by findPosition()
+        self.handNo = 0
+        # Duration (ms) of each stage of the last findHands() call, for profiling
+        self.stageTimes = {}
+        self.lastTimestamp = -1
+        # LIVE_STREAM results are written by MediaPipe's callback thread
+        self.resultLock = threading.Lock()
+        self.latestResult = None
+        self.resultTimestamp = -1
+        self.roiBox = None        # (x0, y0, x1, y1) crop for the next frame, None = full frame
+        self.roiFrames = 0        # consecutive frames inferred on a crop
+        self.resultBox = None     # crop the current results are relative to
+        self.resultShape = None
+        self.convertMs = 0.0
+
+    def _onResult(self, result, output_image, timestamp_ms):
+        """LIVE_STREAM callback: keep only the newest result."""
+        with self.resultLock:
+            if timestamp_ms >= self.resultTimestamp:
+                self.latestResult = result
+                self.resultTimestamp = timestamp_ms
+
+    def _nextTimestamp(self, timestamp_ms):
+        """
+        VIDEO/LIVE_STREAM need strictly increasing timestamps. Uses the capture
+        timestamp if given (e.g. from CameraCapture), otherwise a monotonic clock.
+        Returns None if this frame was already processed.
+        """
+        if timestamp_ms is None:
+            timestamp_ms = max(int(time.monotonic() * 1000), self.lastTimestamp + 1)
+        timestamp_ms = int(timestamp_ms)
+        if timestamp_ms <= self.lastTimestamp:
+            return None
+        self.lastTimestamp = timestamp_ms
+        return timestamp_ms
+
+    def findHands(self, img, draw=True, timestamp_ms=None):
+        """
+        Runs the landmarker on a BGR frame and optionally draws the hands.
+        timestamp_ms: capture time of the frame (VIDEO/LIVE_STREAM modes).
+        In LIVE_STREAM mode the frame is submitted asynchronously and the most
+        recent available result (usually the previous frame's) is used.
+        """
+        if self.runningMode != "image":
+            timestamp_ms = self._nextTimestamp(timestamp_ms)
+
+        t0 = time.perf_counter()
+        self.convertMs = 0.0
+        if self.runningMode == "image":
+            self.results, self.resultBox = self._detectImage(img)
+        elif timestamp_ms is not None:
+            mp_image = self._mpImage(img)
+            if self.runningMode == "video":
+                self.results = self.detector.detect_for_video(mp_image, timestamp_ms)
+            else:
+                self.detector.detect_async(mp_image, timestamp_ms)
+        # Same frame as the last call (timestamp not newer): reuse the previous results
+
+        if self.runningMode == "live_stream":
+            # Snapshot so findPosition/fingersUp see the same result as the drawing below
+            with self.resultLock:
+                self.results = self.latestResult
+        t2 = time.perf_counter()
         
-        self.tipIds = [4, 8, 12, 16, 20] # Thumb, Index, Middle, Ring, Pinky
-        self.HAND_CONNECTIONS = [
-            (0, 1), (1, 2), (2, 3), (3, 4),       # thumb
-            (0, 5), (5, 6), (6, 7), (7, 8),       # index
-            (0, 9), (9, 10), (10, 11), (11, 12),  # middle
-            (0, 13), (13, 14), (14, 15), (15, 16),# ring
-            (0, 17), (17, 18), (18, 19), (19, 20),# pinky
-            (5, 9), (9, 13), (13, 17), (5, 17)    # palm
-        ]
-
-    def findHands(self, img, draw=True):
+        self.resultShape = img.shape
+        self._updateLandmarks(img.shape)
+        if self.roi:
+            self.roiBox = self._roiAround(img.shape) if len(self.landmarksPx) else None
+        t3 = time.perf_counter()
+
+        if draw:
+            self.drawHands(img)
+        t4 = time.perf_counter()
+        # In LIVE_STREAM "inference" is only the submission (the model runs on MediaPipe's thread)
+        self.stageTimes = {"convert": self.convertMs, "inference": (t2 - t0) * 1000 - self.convertMs,
+                           "landmarks": (t3 - t2) * 1000, "draw": (t4 - t3) * 1000}
+        return img
+
+    def _mpImage(self, img):
+        """BGR (possibly a crop view) to a MediaPipe RGB image; the time goes to the convert stage."""
+        t0 = time.perf_counter()
         imgRGB = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
         mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=imgRGB)
-        
-        self.results = self.detector.detect(mp_image)
-        
-        if self.results and self.results.hand_landmarks:
-            for hand_landmarks in self.results.hand_landmarks:
-                if draw:
-                    h, w, c = img.shape
-                    # Draw connections
-                    for connection in self.HAND_CONNECTIONS:
-                        p1 = hand_landmarks[connection[0]]
-                        p2 = hand_landmarks[connection[1]]
-                        x1, y1 = int(p1.x * w), int(p1.y * h)
-                        x2, y2 = int(p2.x * w), int(p2.y * h)
-                        cv2.line(img, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                    # Draw landmarks
-                    for lm in hand_landmarks:
-                        cx, cy = int(lm.x * w), int(lm.y * h)
-                        cv2.circle(img, (cx, cy), 4, (0, 0, 255), cv2.FILLED)
+        self.convertMs += (time.perf_counter() - t0) * 1000
+        return mp_image
+
+    def _detectImage(self, img):
+        """IMAGE mode: crop around the last hand if possible, full frame otherwise. Returns (results, box)."""
+        if self.roi and self.roiBox is not None and self.roiFrames < self.fullSearchEvery:
+            x0, y0, x1, y1 = self.roiBox
+            results = self.detector.detect(self._mpImage(img[y0:y1, x0:x1]))
+            if results.hand_landmarks:
+                self.roiFrames += 1
+                return results, self.roiBox
+            # The hand left the crop: look for it in the whole frame right away
+        self.roiFrames = 0
+        return self.detector.detect(self._mpImage(img)), None
+
+    def _roiAround(self, shape):
+        """Square crop centered on the detected hands' bounding box, clipped to the frame."""
+        h, w = shape[:2]
+        pts = self.landmarksPx.reshape(-1, 2)
+        (xmin, ymin), (xmax, ymax) = pts.min(axis=0), pts.max(axis=0)
+        side = max(xmax - xmin, ymax - ymin) * self.roiScale
+        side = int(min(max(side, self.roiMinSize), w, h))
+        x0 = int(min(max((xmin + xmax - side) / 2, 0), w - side))
+        y0 = int(min(max((ymin + ymax - side) / 2, 0), h - side))
+        return x0, y0, x0 + side, y0 + side
+
+    def drawHands(self, img):
+        # Two cv2 calls per hand: all connections, then all landmarks
+        for hand in self.landmarksPx:
+            cv2.polylines(img, [hand[chain] for chain in self.HAND_CHAINS], False, (0, 255, 0), 2)
+            self._drawDots(img, hand, 4, (0, 0, 255))
         return img
 
+    def normalizedLandmarks(self):
+        """Current results as a (hands, 21, 3) float64 array in MediaPipe's normalized coordinates."""
+        hands = self.results.hand_landmarks if self.results else None
+        if not hands:
+            return np.empty((0, 21, 3))
+        normalized = np.array([[(lm.x, lm.y, lm.z) for lm in hand] for hand in hands])
+        if self.resultBox is not None:
+            # Results of a crop: back to full-frame coordinates (z is scaled like x)
+            x0, y0, x1, y1 = self.resultBox
+            h, w = self.resultShape[:2]
+            normalized *= ((x1 - x0) / w, (y1 - y0) / h, (x1 - x0) / w)
+            normalized += (x0 / w, y0 / h, 0.0)
+        return normalized
+
+    def _updateLandmarks(self, shape):
+        """Converts the current results to pixel arrays (one pass per frame)."""
+        self.setLandmarks(self.normalizedLandmarks(), shape)
+
+    def setLandmarks(self, normalized, shape):
+        """Sets the landmarks from a (hands, 21, 3) normalized array (e.g. computed in another process)."""
+        if not len(normalized):
+            self.landmarks = np.empty((0, 21, 3), np.float32)
+            self.landmarksPx = np.empty((0, 21, 2), np.int32)
+            return
+        h, w = shape[:2]
+        lms = normalized * (w, h, w)
+        self.landmarks = lms.astype(np.float32)
+        # Scaled in float64 and truncated, exactly like the int(lm.x * w) used before
+        self.landmarksPx = lms[..., :2].astype(np.int32)
+
+    @staticmethod
+    def _drawDots(img, pts, radius, color):
+        """
+        Filled circles at every point in one call: a zero-length polyline
+        segment drawn with thickness 2*radius is a filled disc of that radius.
+        """
+        pts = np.asarray(pts, np.int32).reshape(-1, 1, 2)
+        cv2.polylines(img, np.concatenate((pts, pts), axis=1), False, color, 2 * radius)
+
     def findPosition(self, img, handNo=0, draw=True):
-        xList = []
-        yList = []
         bbox = []
         self.lmList = []
-        if self.results and self.results.hand_landmarks and len(self.results.hand_landmarks) > handNo:
-            myHand = self.results.hand_landmarks[handNo]
-            for id, lm in enumerate(myHand):
-                h, w, c = img.shape
-                cx, cy = int(lm.x * w), int(lm.y * h)
-                xList.append(cx)
-                yList.append(cy)
-                self.lmList.append([id, cx, cy])
-                if draw:
-                    cv2.circle(img, (cx, cy), 5, (255, 0, 255), cv2.FILLED)
-            
-            xmin, xmax = min(xList), max(xList)
-            ymin, ymax = min(yList), max(yList)
+        self.lmArray = np.empty((0, 2), np.int32)
+        if len(self.landmarksPx) > handNo:
+            self.handNo = handNo
+            self.lmArray = self.landmarksPx[handNo]
+            # List-based view kept for existing callers: [[id, x, y], ...]
+            self.lmList = np.column_stack((np.arange(len(self.lmArray)), self.lmArray)).tolist()
+
+            xmin, ymin = self.lmArray.min(axis=0).tolist()
+            xmax, ymax = self.lmArray.max(axis=0).tolist()
             bbox = xmin, ymin, xmax, ymax
             
             if draw:
+                self._drawDots(img, self.lmArray, 5, (255, 0, 255))
                 cv2.rectangle(img, (xmin - 20, ymin - 20), (xmax + 20, ymax + 20), (0, 255, 0), 2)
                 
         return self.lmList, bbox
 
-    def fingersUp(self):
-        fingers = []
-        if not self.lmList:
-            return fingers
-            
+    def fingersUpAll(self):
+        """(hands, 5) array of 0/1: which fingers are up on every detected hand."""
+        px = self.landmarksPx
+        tips = np.array(self.tipIds)
+        fingers = np.empty((len(px), 5), np.int32)
         # Thumb: compare x coordinates
-        if self.lmList[self.tipIds[0]][1] > self.lmList[self.tipIds[0] - 1][1]:
-            fingers.append(1)
-        else:
-            fingers.append(0)
-
+        fingers[:, 0] = px[:, tips[0], 0] > px[:, tips[0] - 1, 0]
         # 4 Fingers: compare y coordinates
-        for id in range(1, 5):
-            if self.lmList[self.tipIds[id]][2] < self.lmList[self.tipIds[id] - 2][2]:
-                fingers.append(1)
-            else:
-                fingers.append(0)
-
+        fingers[:, 1:] = px[:, tips[1:], 1] < px[:, tips[1:] - 2, 1]
         return fingers
 
+    def fingersUp(self):
+        """Fingers up on the hand picked by the last findPosition() call."""
+        if not self.lmList:
+            return []
+        return self.fingersUpAll()[self.handNo].tolist()
+
+    def distances(self, p1, p2):
+        """Pixel distance between landmarks p1 and p2 on every detected hand, shape (hands,)."""
+        px = self.landmarksPx
+        return np.hypot(*(px[:, p2] - px[:, p1]).T.astype(np.float32))
+
     def findDistance(self, p1, p2, img, draw=True, r=15, t=3):
-        x1, y1 = self.lmList[p1][1], self.lmList[p1][2]
-        x2, y2 = self.lmList[p2][1], self.lmList[p2][2]
+        x1, y1 = self.lmArray[p1].tolist()
+        x2, y2 = self.lmArray[p2].tolist()
         cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
 
         if draw:
             cv2.line(img, (x1, y1), (x2, y2), (255, 0, 255), t)
-            cv2.circle(img, (x1, y1), r, (255, 0, 255), cv2.FILLED)
-            cv2.circle(img, (x2, y2), r, (255, 0, 255), cv2.FILLED)
-            cv2.circle(img, (cx, cy), r, (0, 0, 255), cv2.FILLED)
+            self._drawDots(img, [(x1, y1), (x2, y2)], r, (255, 0, 255))
+            self._drawDots(img, [(cx, cy)], r, (0, 0, 255))
 
         length = math.hypot(x2 - x1, y2 - y1)
         return length, img, [x1, y1, x2, y2, cx, cy]
+
+    def close(self):
+        """Releases the landmarker (and its LIVE_STREAM worker thread)."""
+        self.detector.close()
+
+
+class IdleRate:
+    """
+    Adaptive inference rate: every frame while a hand is (or was recently)
+    visible; once no hand has been seen for idleAfter seconds, only idleHz
+    inferences per second. The first inference that finds a hand brings
+    the full rate back. idleHz <= 0 disables it (always infer).
+    """
+
+    def __init__(self, idleHz=2.0, idleAfter=2.0):
+        self.idleHz = idleHz
+        self.idleAfter = idleAfter
+        self.lastSeen = time.monotonic()
+        self.lastInference = 0.0
+
+    def idle(self, now=None):
+        now = time.monotonic() if now is None else now
+        return self.idleHz > 0 and now - self.lastSeen > self.idleAfter
+
+    def due(self, now=None):
+        """True if this frame should run inference."""
+        now = time.monotonic() if now is None else now
+        return not self.idle(now) or now - self.lastInference >= 1.0 / self.idleHz
+
+    def update(self, handFound, now=None):
+        now = time.monotonic() if now is None else now
+        self.lastInference = now
+        if handFound:
+            self.lastSeen = now
@@ -0,0 +1,166 @@
+import queue
+import time
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+from HandTrackingModule import HandDetector
+
+
+def _inference_worker(shm_info, detector_kwargs, requests, results):
+    """
+    Inference process: attaches the capture ring buffer (shared memory) and
+    runs HandDetector on the slot named in each request. Only small tuples go
+    through the queues: (slot, seq, timestamp_ms) in, normalized landmarks
+    (hands, 21, 3) and stage times out. Frames are never pickled.
+    """
+    name, shape, dtype, buffer_size = shm_info
+    shm = shared_memory.SharedMemory(name=name)
+    frames = np.ndarray((buffer_size,) + tuple(shape), np.dtype(dtype), buffer=shm.buf)
+    try:
+        detector = HandDetector(**detector_kwargs)
+    except Exception as e:
+        results.put(("error", str(e)))
+        return
+    results.put(("ready", None))
+    try:
+        while True:
+            request = requests.get()
+            if request is None:
+                break
+            slot, seq, timestamp_ms = request
+            try:
+                detector.findHands(frames[slot], draw=False, timestamp_ms=timestamp_ms)
+                results.put((seq, detector.normalizedLandmarks(), detector.stageTimes, time.process_time()))
+            except Exception as e:
+                # Reported to the UI (which raises it) instead of dying silently
+                results.put(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        detector.close()
+        del frames
+        shm.close()
+
+
+class RemoteHandDetector(HandDetector):
+    """
+    HandDetector whose landmarker runs in another process, fed through
+    CameraCapture's shared-memory slots (CameraCapture(shared=True)).
+
+    findHands() pins the slot of the frame just returned by read_latest(),
+    sends its index to the worker and draws the result. With pipelined=True
+    it waits for the previous frame's landmarks instead of the current one,
+    so UI rendering overlaps with inference (one frame of landmark lag, like
+    LIVE_STREAM); with pipelined=False it waits for the current frame.
+    findPosition/fingersUp/findDistance work as in HandDetector.
+    """
+
+    def __init__(self, cap, pipelined=True, timeout=10.0, **detector_kwargs):
+        self.maxHands = detector_kwargs.get("maxHands", 2)
+        self.runningMode = detector_kwargs.get("runningMode", "image")
+        self._initState()
+        self.cap = cap
+        self.pipelined = pipelined
+        self.timeout = timeout
+        self.detector_kwargs = detector_kwargs
+        self.process = None
+        self.inflight = None  # (slot, seq) submitted and not yet answered
+        # CPU time of the worker process since its first answer (excludes loading the model)
+        self.worker_cpu = 0.0
+        self.worker_cpu_start = None
+
+    def start(self, timeout=10.0):
+        """
+        Starts the worker (loads the model) before the first findHands(), so that
+        startup is not counted as a frame. Waits for the first captured frame,
+        which creates the shared block.
+        """
+        if self.process is not None:
+            return self
+        if not self.cap.shared:
+            raise RuntimeError("RemoteHandDetector needs CameraCapture(shared=True)")
+        with self.cap.new_frame:
+            self.cap.new_frame.wait_for(lambda: self.cap.shm is not None or not self.cap.running, timeout)
+        info = self.cap.shared_info()
+        if info is None:
+            raise RuntimeError("CameraCapture has not captured any frame")
+        # spawn: the capture thread is already running, forking a threaded process is unsafe
+        ctx = mp.get_context("spawn")
+        self.requests = ctx.Queue(maxsize=2)
+        self.responses = ctx.Queue()
+        self.process = ctx.Process(target=_inference_worker, name="HandInference", daemon=True,
+                                   args=(info, self.detector_kwargs, self.requests, self.responses))
+        self.process.start()
+        # Loading the model can take a while; stop waiting if the process dies
+        status, error = "error", "the process exited"
+        while self.process.is_alive() or not self.responses.empty():
+            try:
+                status, error = self.responses.get(timeout=0.5)
+                break
+            except queue.Empty:
+                pass
+        if status != "ready":
+            raise RuntimeError(f"Inference process failed to start: {error}")
+        return self
+
+    def _wait_result(self):
+        slot, seq = self.inflight
+        try:
+            response = self.responses.get(timeout=self.timeout)
+        except queue.Empty:
+            raise RuntimeError("The inference process did not answer") from None
+        self.cap.unpin(slot)
+        self.inflight = None
+        if response[0] == "error":
+            raise RuntimeError(f"Inference failed in the worker process: {response[1]}")
+        _, normalized, stage_times, cpu = response
+        if self.worker_cpu_start is None:
+            self.worker_cpu_start = cpu
+        self.worker_cpu = cpu - self.worker_cpu_start
+        return normalized, stage_times
+
+    def findHands(self, img, draw=True, timestamp_ms=None):
+        if self.process is None:
+            self.start()
+        t0 = time.perf_counter()
+        slot, seq = self.cap.leased, self.cap.slot_seq[self.cap.leased]
+        result = None
+        if self.pipelined and self.inflight is not None:
+            # Previous frame's landmarks (the worker has been busy with it while we rendered)
+            result = self._wait_result()
+        self.cap.pin(slot)
+        self.requests.put((slot, seq, timestamp_ms))
+        self.inflight = (slot, seq)
+        if not self.pipelined:
+            result = self._wait_result()
+        t1 = time.perf_counter()
+
+        worker_times = {}
+        if result is not None:
+            normalized, worker_times = result
+            self.setLandmarks(normalized, img.shape)
+        t2 = time.perf_counter()
+        if draw:
+            self.drawHands(img)
+        t3 = time.perf_counter()
+        # "inference" is what the UI waited for; the worker's own stages are reported as worker_*
+        self.stageTimes = {"inference": (t1 - t0) * 1000, "landmarks": (t2 - t1) * 1000, "draw": (t3 - t2) * 1000}
+        for stage in ("convert", "inference"):
+            if stage in worker_times:
+                self.stageTimes[f"worker_{stage}"] = worker_times[stage]
+        return img
+
+    def close(self):
+        if self.process is None:
+            return
+        if self.inflight is not None:
+            try:
+                self._wait_result()
+            except RuntimeError:
+                pass
+        try:
+            self.requests.put(None, timeout=1.0)
+        except queue.Full:
+            pass  # the worker is stuck or gone: terminated below
+        self.process.join(5)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process = None
@@ -1,34 +1,230 @@
+import re
+import shutil
+import subprocess
+import sys
+import threading
+import time
 import numpy as np
-from ctypes import cast, POINTER
-from comtypes import CLSCTX_ALL
-from pycaw.pycaw import AudioUtilities, IAudioEndpointVolume
 
-class VolumeController:
+
+def map_length(length, min_length=50, max_length=250):
+    """
+    Maps the finger distance to (volScalar, volBar, volPer), clamped like np.interp.
+    One scalar computation instead of three np.interp calls per frame.
+    """
+    frac = (length - min_length) / (max_length - min_length)
+    frac = min(max(frac, 0.0), 1.0)
+    return frac, 400 - 250 * frac, 100 * frac
+
+
+class PycawBackend:
+    """Windows master volume through pycaw (Core Audio)."""
+
     def __init__(self):
+        # Imported here so the rest of the app also runs where pycaw is not available
+        from pycaw.pycaw import AudioUtilities
         self.devices = AudioUtilities.GetSpeakers()
         self.volume = self.devices.EndpointVolume
-        
         self.volRange = self.volume.GetVolumeRange()
         self.minVol = self.volRange[0]
         self.maxVol = self.volRange[1]
-        
+
+    def get(self):
+        return self.volume.GetMasterVolumeLevelScalar()
+
+    def set(self, scalar):
+        try:
+            self.volume.SetMasterVolumeLevelScalar(scalar, None)
+        except Exception:
+            vol = np.interp(scalar, [0.0, 1.0], [self.minVol, self.maxVol])
+            self.volume.SetMasterVolumeLevel(vol, None)
+
+
+class AmixerBackend:
+    """Linux (ALSA/PulseAudio/PipeWire) mixer control through the amixer command."""
+
+    def __init__(self, control="Master", card=None):
+        if shutil.which("amixer") is None:
+            raise RuntimeError("amixer not found (install alsa-utils)")
+        self.command = ["amixer"] + (["-c", str(card)] if card is not None else [])
+        self.control = control
+
+    def get(self):
+        out = subprocess.run(self.command + ["sget", self.control], capture_output=True, text=True, timeout=2).stdout
+        match = re.search(r"\[(\d+)%\]", out)
+        return int(match.group(1)) / 100 if match else None
+
+    def set(self, scalar):
+        subprocess.run(self.command + ["-q", "sset", self.control, f"{round(scalar * 100)}%"], timeout=2, check=True)
+
+
+class NullBackend:
+    """Accepts every change and does nothing (no audio device, CI, benchmarks)."""
+
+    def __init__(self):
+        self.value = None
+
+    def get(self):
+        return self.value
+
+    def set(self, scalar):
+        self.value = scalar
+
+
+class RecordingBackend(NullBackend):
+    """
+    Records every change as (monotonic time, scalar). latency simulates the
+    cost of a real audio API call (e.g. ~ms for a COM round trip).
+    """
+
+    def __init__(self, latency=0.0):
+        super().__init__()
+        self.latency = latency
+        self.calls = []
+
+    def set(self, scalar):
+        if self.latency:
+            time.sleep(self.latency)
+        super().set(scalar)
+        self.calls.append((time.monotonic(), scalar))
+
+
+BACKENDS = {
+    "pycaw": PycawBackend,
+    "amixer": AmixerBackend,
+    "null": NullBackend,
+    "recording": RecordingBackend,
+}
+
+
+def create_backend(name="auto"):
+    """"auto": pycaw on Windows, amixer on Linux if present, otherwise null."""
+    if name != "auto":
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown volume backend: {name} (options: auto, {', '.join(BACKENDS)})")
+        return BACKENDS[name]()
+    candidates = ["pycaw"] if sys.platform == "win32" else ["amixer"]
+    for candidate in candidates:
+        try:
+            return BACKENDS[candidate]()
+        except Exception as e:
+            print(f"Volume backend {candidate} not available: {e}")
+    print("Using the null volume backend (the system volume will not change)")
+    return NullBackend()
+
+
+class VolumeActuator:
+    """
+    Applies the volume on its own thread so the render loop never waits for the audio API.
+
+    set_volume() only stores the target and returns immediately. The thread
+    smooths the target (exponential, factor smoothing), ignores changes
+    smaller than threshold (hysteresis, so hand jitter does not reach the
+    mixer) and pushes at most max_rate_hz changes per second to the backend.
+    """
+
+    def __init__(self, backend=None, smoothing=0.5, threshold=0.01, max_rate_hz=20.0):
+        self.backend = backend if backend is not None else create_backend()
+        self.smoothing = smoothing
+        self.threshold = threshold
+        self.min_interval = 1.0 / max_rate_hz
+        self.target = None
+        self.smoothed = None
+        self.applied = None
+        self.pushes = 0
+        self.errors = 0
+        self.lock = threading.Lock()
+        self.changed = threading.Event()
+        self.running = False
+        self.thread = None
+        try:
+            self.applied = self.backend.get()
+        except Exception:
+            pass
+        self.smoothed = self.applied
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="VolumeActuator", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        self.changed.set()
+        if self.thread is not None:
+            self.thread.join()
+
+    def set_volume(self, length, min_length=50, max_length=250):
+        """Same contract as VolumeController.set_volume, but never blocks."""
+        volScalar, volBar, volPer = map_length(length, min_length, max_length)
+        with self.lock:
+            self.target = volScalar
+        self.changed.set()
+        return volScalar, volBar, volPer
+
     def get_current_volume(self):
-        return self.volume.GetMasterVolumeLevel()
+        return self.applied
+
+    def _run(self):
+        last_step = 0.0
+        settled = True
+        while True:
+            # Idle until a new target arrives; while converging, step once per tick
+            self.changed.wait(None if settled else self.min_interval)
+            self.changed.clear()
+            if not self.running:
+                return
+            # Rate cap: at most one smoothing step (and push) per min_interval
+            wait = last_step + self.min_interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            last_step = time.monotonic()
+            with self.lock:
+                target = self.target
+            if target is None:
+                continue
+
+            if self.smoothed is None:
+                self.smoothed = target
+            else:
+                self.smoothed += self.smoothing * (target - self.smoothed)
+            settled = abs(target - self.smoothed) < self.threshold / 2
+            if target in (0.0, 1.0) and abs(target - self.smoothed) < self.threshold:
+                # Land exactly on mute or full: the smoothing alone never reaches them
+                self.smoothed = target
+                settled = True
+            # Hysteresis: only changes of at least threshold reach the backend (a still,
+            # jittery hand stays within it), except the final step onto mute or full
+            if (self.applied is None or abs(self.smoothed - self.applied) >= self.threshold
+                    or (self.smoothed in (0.0, 1.0) and self.smoothed != self.applied)):
+                self._push(self.smoothed)
+
+    def _push(self, scalar):
+        try:
+            self.backend.set(scalar)
+            self.applied = scalar
+            self.pushes += 1
+        except Exception as e:
+            self.errors += 1
+            if self.errors == 1:
+                print(f"Error setting the volume: {e}")
+
+
+class VolumeController:
+    """Synchronous controller (every call goes straight to the backend). Kept for compatibility."""
+
+    def __init__(self, backend=None):
+        self.backend = backend if backend is not None else PycawBackend()
+
+    def get_current_volume(self):
+        return self.backend.get()
 
     def set_volume(self, length, min_length=50, max_length=250):
         """
         Maps the distance (length) to the system volume range and sets it.
         Returns the new volume and the mapped percentage.
         """
-        volBar = np.interp(length, [min_length, max_length], [400, 150])
-        volPer = np.interp(length, [min_length, max_length], [0, 100])
-        volScalar = np.interp(length, [min_length, max_length], [0.0, 1.0])
-        
-        # Set the system volume
-        try:
-            self.volume.SetMasterVolumeLevelScalar(volScalar, None)
-        except Exception:
-            vol = np.interp(length, [min_length, max_length], [self.minVol, self.maxVol])
-            self.volume.SetMasterVolumeLevel(vol, None)
-        
+        volScalar, volBar, volPer = map_length(length, min_length, max_length)
+        self.backend.set(volScalar)
         return volScalar, volBar, volPer
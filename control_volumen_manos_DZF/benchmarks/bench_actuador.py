@@ -0,0 +1,108 @@
+"""
+Coste para el bucle de render de aplicar el volumen: VolumeController
+(síncrono, una llamada al backend por frame) frente a VolumeActuator (hilo
+propio con suavizado, histéresis y límite de frecuencia).
+
+Se reproduce una señal sintética de distancia entre dedos (gestos lentos,
+movimientos rápidos y mano quieta con temblor) al ritmo de la cámara. El
+backend "recording" simula la latencia de la API de audio; con --backend
+amixer/pycaw se mide contra el mezclador real. No necesita cámara ni ventana.
+
+    python benchmarks/bench_actuador.py
+    python benchmarks/bench_actuador.py --latencia-ms 8 --fps 60 --json actuador.json
+"""
+import os
+import sys
+import time
+import json
+import argparse
+
+# Imports planos como en main.py (se ejecuta desde la carpeta del proyecto)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from VolumeHandControl import VolumeActuator, VolumeController, RecordingBackend, create_backend, map_length
+
+
+def senal(fps, segundos, semilla=0):
+    """Distancias (px) por frame: barridos, saltos y tramos quietos con temblor de la mano."""
+    rng = np.random.default_rng(semilla)
+    t = np.arange(int(fps * segundos)) / fps
+    base = 150 + 90 * np.sin(2 * np.pi * t / 4)
+    quieto = (t % 6) > 4                       # 2 s de cada 6 con la mano quieta
+    base[quieto] = 150
+    base[(t % 10) > 9.5] = 240                 # saltos bruscos
+    return base + rng.normal(0, 1.5, len(t))    # temblor de los landmarks
+
+
+def ejecutar(nombre, controlador, distancias, fps, backend):
+    periodo = 1.0 / fps
+    llamadas, errores = [], []
+    retrasados = 0
+    inicio = time.perf_counter()
+    for i, distancia in enumerate(distancias):
+        t0 = time.perf_counter()
+        controlador.set_volume(distancia)
+        llamadas.append((time.perf_counter() - t0) * 1e6)
+        aplicado = backend.get()
+        if aplicado is not None:
+            errores.append(abs(aplicado - map_length(distancia)[0]))
+        espera = inicio + (i + 1) * periodo - time.perf_counter()
+        if espera > 0:
+            time.sleep(espera)
+        else:
+            retrasados += 1
+    if isinstance(controlador, VolumeActuator):
+        controlador.stop()
+    llamadas = np.array(llamadas)
+    empujes = len(backend.calls) if hasattr(backend, "calls") else getattr(controlador, "pushes", len(distancias))
+    return {
+        "modo": nombre,
+        "frames": len(distancias),
+        "llamada_p50_us": float(np.percentile(llamadas, 50)),
+        "llamada_p99_us": float(np.percentile(llamadas, 99)),
+        "cambios_backend": empujes,
+        "error_medio_pct": float(np.mean(errores) * 100) if errores else None,
+        "frames_retrasados": retrasados,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Volumen síncrono vs hilo actuador (headless)")
+    parser.add_argument("--backend", default="recording", help="recording (simulado), null, amixer o pycaw")
+    parser.add_argument("--latencia-ms", type=float, default=5.0, help="Latencia simulada del backend recording")
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--segundos", type=float, default=20.0)
+    parser.add_argument("--suavizado", type=float, default=0.5)
+    parser.add_argument("--umbral", type=float, default=0.01)
+    parser.add_argument("--max-hz", type=float, default=20.0)
+    parser.add_argument("--json", help="Guardar los resultados en este fichero")
+    args = parser.parse_args()
+
+    def nuevo_backend():
+        if args.backend == "recording":
+            return RecordingBackend(latency=args.latencia_ms / 1000)
+        return create_backend(args.backend)
+
+    distancias = senal(args.fps, args.segundos)
+    resultados = []
+    backend = nuevo_backend()
+    resultados.append(ejecutar("síncrono", VolumeController(backend), distancias, args.fps, backend))
+    backend = nuevo_backend()
+    actuador = VolumeActuator(backend, smoothing=args.suavizado, threshold=args.umbral, max_rate_hz=args.max_hz).start()
+    resultados.append(ejecutar("actuador", actuador, distancias, args.fps, backend))
+
+    print(f"{'modo':<10}{'p50 µs':>9}{'p99 µs':>9}{'cambios':>9}{'error %':>9}{'retrasados':>12}")
+    for r in resultados:
+        error = f"{r['error_medio_pct']:.2f}" if r["error_medio_pct"] is not None else "-"
+        print(f"{r['modo']:<10}{r['llamada_p50_us']:>9.1f}{r['llamada_p99_us']:>9.1f}{r['cambios_backend']:>9}"
+              f"{error:>9}{r['frames_retrasados']:>12}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2)
+        print(f"Resultados guardados en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
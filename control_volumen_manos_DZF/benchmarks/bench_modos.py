@@ -0,0 +1,117 @@
+"""
+Compara el tiempo de inferencia por frame de HandDetector en los modos
+IMAGE, VIDEO y LIVE_STREAM de MediaPipe sobre el mismo vídeo.
+
+En IMAGE la detección de la palma se ejecuta en cada frame; en VIDEO y
+LIVE_STREAM los landmarks se siguen entre frames y solo se vuelve a
+detectar cuando se pierde la mano. En LIVE_STREAM findHands() solo envía
+el frame (el resultado llega por callback), así que además se mide el
+retraso del resultado usado respecto al frame enviado.
+
+    python benchmarks/bench_modos.py --video mano.mp4
+    python benchmarks/bench_modos.py --video mano.mp4 --modos image video --sin-pausa
+"""
+import os
+import sys
+import time
+import json
+import argparse
+
+# Imports planos como en main.py (se ejecuta desde la carpeta del proyecto)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import cv2
+import numpy as np
+from HandTrackingModule import HandDetector, RUNNING_MODES
+
+
+def cargar_frames(ruta, max_frames):
+    cap = cv2.VideoCapture(ruta)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    frames = []
+    while len(frames) < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames, fps
+
+
+def ejecutar(modo, frames, fps, max_hands, pausar):
+    detector = HandDetector(detectionCon=0.7, maxHands=max_hands, runningMode=modo)
+    periodo = 1.0 / fps
+    tiempos, retrasos = [], []
+    con_mano = 0
+    resultados = 0
+    ultimo_resultado = -1
+    inicio = time.perf_counter()
+
+    for i, frame in enumerate(frames):
+        timestamp_ms = int(i * 1000 / fps)
+        t0 = time.perf_counter()
+        detector.findHands(frame, draw=False, timestamp_ms=timestamp_ms)
+        tiempos.append((time.perf_counter() - t0) * 1000)
+
+        if detector.results and detector.results.hand_landmarks:
+            con_mano += 1
+        if modo == "live_stream" and detector.resultTimestamp >= 0:
+            retrasos.append(timestamp_ms - detector.resultTimestamp)
+            if detector.resultTimestamp != ultimo_resultado:
+                resultados += 1
+                ultimo_resultado = detector.resultTimestamp
+
+        if pausar:
+            # Ritmo de una cámara real: no enviar el siguiente frame antes de tiempo
+            espera = inicio + (i + 1) * periodo - time.perf_counter()
+            if espera > 0:
+                time.sleep(espera)
+
+    detector.close()
+    tiempos = np.array(tiempos)
+    resultado = {
+        "modo": modo,
+        "frames": len(frames),
+        "p50_ms": float(np.percentile(tiempos, 50)),
+        "p95_ms": float(np.percentile(tiempos, 95)),
+        "media_ms": float(tiempos.mean()),
+        "con_mano": con_mano / len(frames),
+    }
+    if modo == "live_stream":
+        resultado["retraso_p50_ms"] = float(np.percentile(retrasos, 50)) if retrasos else None
+        resultado["frames_con_resultado"] = resultados / len(frames)
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo por frame de HandDetector en IMAGE / VIDEO / LIVE_STREAM")
+    parser.add_argument("--video", required=True, help="Vídeo con una mano moviéndose")
+    parser.add_argument("--modos", nargs="+", default=list(RUNNING_MODES), choices=list(RUNNING_MODES))
+    parser.add_argument("--max-frames", type=int, default=600)
+    parser.add_argument("--max-hands", type=int, default=1)
+    parser.add_argument("--sin-pausa", action="store_true", help="No respetar el FPS del vídeo")
+    parser.add_argument("--json", help="Guardar los resultados en este fichero")
+    args = parser.parse_args()
+
+    frames, fps = cargar_frames(args.video, args.max_frames)
+    if not frames:
+        print("No se pudo leer el vídeo.")
+        return
+    print(f"Frames: {len(frames)} ({frames[0].shape[1]}x{frames[0].shape[0]} @ {fps:.0f} fps)")
+
+    resultados = []
+    print(f"{'modo':<13}{'p50 ms':>9}{'p95 ms':>9}{'media ms':>10}{'con mano':>10}{'retraso ms':>12}")
+    for modo in args.modos:
+        r = ejecutar(modo, frames, fps, args.max_hands, not args.sin_pausa)
+        resultados.append(r)
+        retraso = f"{r['retraso_p50_ms']:.0f}" if r.get("retraso_p50_ms") is not None else "-"
+        print(f"{modo:<13}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}{r['media_ms']:>10.2f}{r['con_mano']:>10.0%}{retraso:>12}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2)
+        print(f"Resultados guardados en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
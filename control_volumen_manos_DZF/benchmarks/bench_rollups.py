@@ -0,0 +1,187 @@
+"""
+Compara el almacenamiento de los cambios de volumen como eventos sueltos
+(un documento por cada 1 %) frente a rollups por segundo y por gesto.
+
+Genera sesiones sintéticas de gestos de pinza (a ~30 fps, un evento por
+cada punto de volumen que cambia), las pasa por RollupBuilder igual que
+main.py y escribe cada representación en su colección. Mide documentos,
+tamaño de datos/índices (collStats) y el tiempo de consultas típicas de
+análisis, y comprueba que todas dan el mismo resultado.
+
+    python benchmarks/bench_rollups.py --uri mongodb://localhost:27017 --sesiones 50
+    python benchmarks/bench_rollups.py --uri mongodb://localhost:27017 --timeseries
+    python benchmarks/bench_rollups.py --mock        # mongomock, tamaño estimado con BSON
+"""
+import os
+import sys
+import time
+import json
+import random
+import argparse
+from datetime import datetime, timedelta
+
+# Imports planos como en main.py (se ejecuta desde la carpeta del proyecto)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import bson
+import numpy as np
+from models.session import Session
+from models.volume_event import VolumeEvent
+from models.volume_rollup import RollupBuilder
+
+FPS = 30
+
+
+def generar_sesion(rng, inicio, gestos):
+    """Eventos de una sesión: gestos que barren el volumen a ritmo de frame con pausas entre ellos."""
+    session = Session(start_time=inicio)
+    eventos = []
+    t = inicio
+    volumen = rng.randint(0, 100)
+    for _ in range(gestos):
+        objetivo = rng.randint(0, 100)
+        paso = 1 if objetivo > volumen else -1
+        while volumen != objetivo:
+            # 1-3 puntos de volumen por frame, como al mover los dedos
+            nuevo = volumen + paso * min(rng.randint(1, 3), abs(objetivo - volumen))
+            t += timedelta(seconds=1 / FPS)
+            event = VolumeEvent(volumen, nuevo, 50 + nuevo * 2 + rng.random() * 5, session.session_id)
+            event.timestamp = t
+            eventos.append(event)
+            volumen = nuevo
+        t += timedelta(seconds=rng.uniform(1.0, 5.0))
+    session.end_time = t
+    return session, eventos
+
+
+def rollups(eventos, kind, session_id, gesture_gap):
+    builder = RollupBuilder(kind, session_id, gesture_gap)
+    buckets = []
+    for event in eventos:
+        buckets.extend(builder.add(event))
+    buckets.extend(builder.flush())
+    return buckets
+
+
+def tamano(db, nombre, documentos):
+    """(datos, almacenamiento, índices) en bytes: collStats, o tamaño BSON si no existe (mongomock)."""
+    try:
+        stats = db.command("collStats", nombre)
+        return stats["size"], stats.get("storageSize", stats["size"]), stats.get("totalIndexSize", 0)
+    except Exception:
+        datos = sum(len(bson.encode(doc)) for doc in documentos)
+        return datos, datos, 0
+
+
+def consultas(es_rollup, desde, hasta):
+    """Consultas de análisis típicas; en rollups se reagregan count y finger_distance_sum."""
+    if es_rollup:
+        por_sesion = [{"$group": {"_id": "$session_id", "cambios": {"$sum": "$count"},
+                                  "distancia": {"$sum": "$finger_distance_sum"}}}]
+        rango = [{"$match": {"timestamp": {"$gte": desde, "$lt": hasta}}},
+                 {"$group": {"_id": None, "min": {"$min": "$min_volume"}, "max": {"$max": "$max_volume"},
+                             "cambios": {"$sum": "$count"}}}]
+    else:
+        por_sesion = [{"$group": {"_id": "$session_id", "cambios": {"$sum": 1},
+                                  "distancia": {"$sum": "$finger_distance"}}}]
+        # min/max incluyen el volumen previo, como first_volume en los rollups
+        rango = [{"$match": {"timestamp": {"$gte": desde, "$lt": hasta}}},
+                 {"$group": {"_id": None, "min": {"$min": {"$min": ["$new_volume", "$previous_volume"]}},
+                             "max": {"$max": {"$max": ["$new_volume", "$previous_volume"]}},
+                             "cambios": {"$sum": 1}}}]
+    return {"por_sesion": por_sesion, "rango_horas": rango}
+
+
+def medir(coleccion, pipeline, repeticiones):
+    tiempos = []
+    resultado = None
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        resultado = list(coleccion.aggregate(pipeline))
+        tiempos.append((time.perf_counter() - t0) * 1000)
+    return float(np.median(tiempos)), resultado
+
+
+def resumen(nombre, resultado):
+    """Resultado comparable entre representaciones (para la comprobación de equivalencia)."""
+    if nombre == "por_sesion":
+        return sorted((str(r["_id"]), r["cambios"], round(r["distancia"], 3)) for r in resultado)
+    return [(r["min"], r["max"], r["cambios"]) for r in resultado]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Eventos sueltos vs rollups por segundo / por gesto")
+    destino = parser.add_mutually_exclusive_group(required=True)
+    destino.add_argument("--uri", help="MongoDB donde crear la base de datos de prueba")
+    destino.add_argument("--mock", action="store_true", help="Usar mongomock (sin servidor)")
+    parser.add_argument("--db", default="hand_tracking_bench", help="Base de datos de prueba (se borra)")
+    parser.add_argument("--sesiones", type=int, default=20)
+    parser.add_argument("--gestos", type=int, default=40, help="Gestos por sesión")
+    parser.add_argument("--gesture-gap", type=float, default=0.5)
+    parser.add_argument("--timeseries", action="store_true", help="Rollups también en colecciones time-series")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--json", help="Guardar los resultados en este fichero")
+    args = parser.parse_args()
+
+    if args.mock:
+        import mongomock
+        client = mongomock.MongoClient()
+    else:
+        from pymongo import MongoClient
+        client = MongoClient(args.uri)
+    client.drop_database(args.db)
+    db = client[args.db]
+
+    rng = random.Random(0)
+    inicio = datetime(2024, 1, 1)
+    representaciones = {"events": [], "second": [], "gesture": []}
+    for i in range(args.sesiones):
+        session, eventos = generar_sesion(rng, inicio + timedelta(hours=i), args.gestos)
+        representaciones["events"].extend(event.to_dict() for event in eventos)
+        for kind in RollupBuilder.KINDS:
+            representaciones[kind].extend(rollups(eventos, kind, session.session_id, args.gesture_gap))
+    if args.timeseries:
+        for kind in RollupBuilder.KINDS:
+            representaciones[f"{kind}_ts"] = representaciones[kind]
+
+    desde = inicio + timedelta(hours=args.sesiones // 4)
+    hasta = desde + timedelta(hours=max(1, args.sesiones // 2))
+    resultados = []
+    referencia = {}
+    print(f"{'modo':<12}{'docs':>9}{'datos KB':>11}{'disco KB':>11}{'índices KB':>12}"
+          f"{'por sesión ms':>15}{'rango ms':>10}  iguales")
+    for modo, documentos in representaciones.items():
+        nombre = f"volume_{modo}"
+        if modo.endswith("_ts"):
+            db.create_collection(nombre, timeseries={
+                "timeField": "timestamp", "metaField": "session_id", "granularity": "seconds"})
+        coleccion = db[nombre]
+        # insert_many añade _id a los dicts: copias para no compartirlos entre colecciones
+        coleccion.insert_many([dict(doc) for doc in documentos])
+        coleccion.create_index("timestamp")
+
+        datos, disco, indices = tamano(db, nombre, documentos)
+        tiempos = {}
+        iguales = True
+        for consulta, pipeline in consultas(modo != "events", desde, hasta).items():
+            tiempos[consulta], resultado = medir(coleccion, pipeline, args.repeticiones)
+            valor = resumen(consulta, resultado)
+            referencia.setdefault(consulta, valor)
+            iguales &= valor == referencia[consulta]
+
+        r = {"modo": modo, "documentos": len(documentos), "datos_bytes": datos, "disco_bytes": disco,
+             "indices_bytes": indices, "por_sesion_ms": tiempos["por_sesion"],
+             "rango_ms": tiempos["rango_horas"], "mismo_resultado": iguales}
+        resultados.append(r)
+        print(f"{modo:<12}{len(documentos):>9}{datos / 1024:>11.1f}{disco / 1024:>11.1f}{indices / 1024:>12.1f}"
+              f"{r['por_sesion_ms']:>15.2f}{r['rango_ms']:>10.2f}  {'sí' if iguales else 'NO'}")
+
+    client.drop_database(args.db)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2)
+        print(f"Resultados guardados en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
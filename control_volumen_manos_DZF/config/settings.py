@@ -7,3 +7,42 @@ load_dotenv()
 class Settings:
     MONGODB_URI = os.getenv("MONGODB_URI")
     DATABASE_NAME = os.getenv("DATABASE_NAME", "hand_tracking_db")
+    # MediaPipe running mode: "image" (detect every frame), "video" or "live_stream" (track between frames)
+    HAND_RUNNING_MODE = os.getenv("HAND_RUNNING_MODE", "video")
+    # Background writer for volume events: batch size, max seconds between writes,
+    # queue bound and what to do when it is full ("drop" or "spill" to the local journal)
+    EVENT_BATCH_SIZE = int(os.getenv("EVENT_BATCH_SIZE", "100"))
+    EVENT_FLUSH_SECONDS = float(os.getenv("EVENT_FLUSH_SECONDS", "1.0"))
+    EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "10000"))
+    EVENT_OVERFLOW = os.getenv("EVENT_OVERFLOW", "spill")
+    # How long to wait for MongoDB at startup before recording to the local journal
+    MONGODB_TIMEOUT_MS = int(os.getenv("MONGODB_TIMEOUT_MS", "2000"))
+    # Offline journal (length-prefixed BSON, rotated at JOURNAL_MAX_BYTES); load it with replay_journal.py
+    JOURNAL_DIR = os.getenv("JOURNAL_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "journal"))
+    JOURNAL_MAX_BYTES = int(os.getenv("JOURNAL_MAX_BYTES", str(8 * 1024 * 1024)))
+    # How volume changes are stored: "events" (one document per change, for debugging),
+    # "second" or "gesture" (VolumeRollup buckets in volume_rollups)
+    VOLUME_EVENT_MODE = os.getenv("VOLUME_EVENT_MODE", "events")
+    # A gesture bucket closes after this many seconds without volume changes
+    GESTURE_GAP_SECONDS = float(os.getenv("GESTURE_GAP_SECONDS", "0.5"))
+    # Create volume_rollups as a MongoDB time-series collection (MongoDB 5.0+)
+    ROLLUP_TIMESERIES = os.getenv("ROLLUP_TIMESERIES", "false").lower() in ("1", "true", "yes")
+    # Volume backend: "auto" (pycaw on Windows, amixer on Linux), "pycaw", "amixer", "null" or "recording"
+    VOLUME_BACKEND = os.getenv("VOLUME_BACKEND", "auto")
+    # Actuator thread: smoothing factor per step, minimum change pushed (0-1) and max pushes per second
+    VOLUME_SMOOTHING = float(os.getenv("VOLUME_SMOOTHING", "0.5"))
+    VOLUME_THRESHOLD = float(os.getenv("VOLUME_THRESHOLD", "0.01"))
+    VOLUME_MAX_RATE_HZ = float(os.getenv("VOLUME_MAX_RATE_HZ", "20"))
+    # Run the landmarker in a separate process fed through shared memory (frees the UI's GIL);
+    # pipelined: the UI draws the previous frame's landmarks while the next one is inferred
+    INFERENCE_PROCESS = os.getenv("INFERENCE_PROCESS", "false").lower() in ("1", "true", "yes")
+    INFERENCE_PIPELINED = os.getenv("INFERENCE_PIPELINED", "true").lower() in ("1", "true", "yes")
+    # Region of interest: infer on a crop HAND_ROI_SCALE times the last hand's box, with a full-frame
+    # search every HAND_FULL_SEARCH_EVERY frames or when the crop loses the hand. Only works with
+    # HAND_RUNNING_MODE=image (the default "video" mode already tracks on a crop inside MediaPipe)
+    HAND_ROI = os.getenv("HAND_ROI", "false").lower() in ("1", "true", "yes")
+    HAND_ROI_SCALE = float(os.getenv("HAND_ROI_SCALE", "2.0"))
+    HAND_FULL_SEARCH_EVERY = int(os.getenv("HAND_FULL_SEARCH_EVERY", "30"))
+    # Idle rate: with no hand for HAND_IDLE_AFTER_SECONDS, infer only HAND_IDLE_HZ times per second (0 = off)
+    HAND_IDLE_AFTER_SECONDS = float(os.getenv("HAND_IDLE_AFTER_SECONDS", "2.0"))
+    HAND_IDLE_HZ = float(os.getenv("HAND_IDLE_HZ", "2.0"))
@@ -0,0 +1,195 @@
+from pymongo import ASCENDING, DESCENDING
+
+# Created at startup (create_index is a no-op if the index already exists).
+# (session_id, timestamp) serves every per-session query and its prefix the
+# grouping by session; timestamp alone serves date-range filters.
+INDEXES = {
+    "volume_events": [
+        [("session_id", ASCENDING), ("timestamp", ASCENDING)],
+        [("timestamp", ASCENDING)],
+    ],
+    "volume_rollups": [
+        [("session_id", ASCENDING), ("timestamp", ASCENDING)],
+        [("timestamp", ASCENDING)],
+    ],
+    "sessions": [
+        [("start_time", DESCENDING)],
+    ],
+}
+
+
+def ensure_indexes(db, collections=None):
+    """
+    Creates INDEXES on the given collections (all by default). Returns the names
+    of the indexes. By default volume_rollups is skipped until it exists, so
+    that indexing it never creates it as a regular collection before
+    ensure_rollup_collection can make it a time-series one; MongoDAO indexes
+    it from its writer thread, before the first write.
+    """
+    existing = set(db.list_collection_names())
+    names = []
+    for collection in collections or INDEXES:
+        if collections is None and collection == "volume_rollups" and collection not in existing:
+            continue
+        for keys in INDEXES[collection]:
+            names.append(db[collection].create_index(keys))
+    return names
+
+
+class VolumeAnalytics:
+    """
+    Aggregation queries over the stored volume changes.
+
+    source="events" reads volume_events (one document per change);
+    source="rollups" reads volume_rollups and re-aggregates the buckets
+    weighted by count, so both give the same counts and averages (the
+    histogram is the exception, see volume_change_histogram). Every query
+    takes since/until (timestamp range) and session_id filters; they go in
+    the first $match so MongoDB selects the documents through the indexes
+    above. Without filters the collection-wide queries (average, histogram,
+    hourly usage) read every document: on tens of millions of events, filter
+    by date or read the rollups (~30x fewer documents). session_summary pages
+    the sessions first, so it only reads the events of the listed sessions.
+    """
+
+    SOURCES = {"events": "volume_events", "rollups": "volume_rollups"}
+
+    def __init__(self, db, source="events", kind=None):
+        if source not in self.SOURCES:
+            raise ValueError(f"Unknown analytics source: {source} (options: {', '.join(self.SOURCES)})")
+        self.db = db
+        self.source = source
+        self.collection = db[self.SOURCES[source]]
+        # Rollups only: "second" or "gesture", so buckets of both kinds are not added together
+        self.kind = kind if source == "rollups" else None
+
+    @property
+    def _rollups(self):
+        return self.source == "rollups"
+
+    def _count(self):
+        """Number of changes a document stands for."""
+        return "$count" if self._rollups else 1
+
+    def _pipeline(self, stages, since=None, until=None, session_id=None):
+        match = {}
+        if self.kind is not None:
+            match["kind"] = self.kind
+        if session_id is not None:
+            match["session_id"] = session_id
+        if since is not None or until is not None:
+            match["timestamp"] = {}
+            if since is not None:
+                match["timestamp"]["$gte"] = since
+            if until is not None:
+                match["timestamp"]["$lt"] = until
+        return ([{"$match": match}] if match else []) + stages
+
+    def _aggregate(self, pipeline):
+        # allowDiskUse: $group over millions of documents may exceed the 100 MB stage limit
+        return list(self.collection.aggregate(pipeline, allowDiskUse=True))
+
+    def session_summary(self, since=None, until=None, session_id=None, limit=None):
+        """
+        Per session, most recent first: start_time, duration_seconds, number of
+        volume changes, first/last change and average finger distance.
+
+        The page of sessions (started in [since, until), at most limit) comes
+        from the sessions collection through its start_time index; only the
+        changes of those sessions are then aggregated, through the
+        (session_id, timestamp) index. Sessions without changes are listed
+        with 0 changes.
+        """
+        query = {}
+        if session_id is not None:
+            query["_id"] = session_id
+        if since is not None or until is not None:
+            query["start_time"] = {}
+            if since is not None:
+                query["start_time"]["$gte"] = since
+            if until is not None:
+                query["start_time"]["$lt"] = until
+        cursor = self.db.sessions.find(query, {"start_time": 1, "duration_seconds": 1}).sort("start_time", DESCENDING)
+        if limit:
+            cursor = cursor.limit(limit)
+        sessions = list(cursor)
+        if not sessions:
+            return []
+
+        match = {"session_id": {"$in": [session["_id"] for session in sessions]}}
+        if self.kind is not None:
+            match["kind"] = self.kind
+        rows = self._aggregate([
+            {"$match": match},
+            {"$group": {
+                "_id": "$session_id",
+                "changes": {"$sum": self._count()},
+                "distance_sum": {"$sum": "$finger_distance_sum" if self._rollups else "$finger_distance"},
+                "first_change": {"$min": "$timestamp"},
+                "last_change": {"$max": "$end_time" if self._rollups else "$timestamp"},
+            }},
+        ])
+        rows = {row["_id"]: row for row in rows}
+
+        summary = []
+        for session in sessions:
+            row = rows.get(session["_id"], {})
+            changes = row.get("changes", 0)
+            summary.append({
+                "session_id": session["_id"],
+                "start_time": session.get("start_time"),
+                "duration_seconds": session.get("duration_seconds"),
+                "changes": changes,
+                "avg_finger_distance": row["distance_sum"] / changes if changes else None,
+                "first_change": row.get("first_change"),
+                "last_change": row.get("last_change"),
+            })
+        return summary
+
+    def average_finger_distance(self, since=None, until=None, session_id=None):
+        """Average thumb-index distance (px) over every change in the range, or None."""
+        stages = [{"$group": {
+            "_id": None,
+            "changes": {"$sum": self._count()},
+            "distance_sum": {"$sum": "$finger_distance_sum" if self._rollups else "$finger_distance"},
+        }}]
+        rows = self._aggregate(self._pipeline(stages, since, until, session_id))
+        if not rows or not rows[0]["changes"]:
+            return None
+        return rows[0]["distance_sum"] / rows[0]["changes"]
+
+    def volume_change_histogram(self, bucket_size=5, since=None, until=None, session_id=None):
+        """
+        [(lower edge, count)] of volume changes in bucket_size-point buckets
+        (negative = volume down), sorted by edge. With events each bucket counts
+        single changes (new - previous volume); with rollups it counts buckets
+        by their net change (last - first volume), i.e. whole seconds or gestures.
+        """
+        delta = ({"$subtract": ["$last_volume", "$first_volume"]} if self._rollups
+                 else {"$subtract": ["$new_volume", "$previous_volume"]})
+        stages = [
+            {"$group": {
+                "_id": {"$multiply": [{"$floor": {"$divide": [delta, bucket_size]}}, bucket_size]},
+                "count": {"$sum": 1},
+            }},
+            {"$sort": {"_id": 1}},
+        ]
+        return [(row["_id"], row["count"]) for row in self._aggregate(self._pipeline(stages, since, until, session_id))]
+
+    def hourly_usage(self, since=None, until=None, session_id=None, timezone=None):
+        """
+        [(hour 0-23, changes, sessions)] by time of day. Timestamps are stored
+        in UTC; timezone (e.g. "Europe/Madrid") shifts the hours to local time.
+        """
+        date = {"date": "$timestamp", "timezone": timezone} if timezone else "$timestamp"
+        stages = [
+            {"$group": {
+                "_id": {"$hour": date},
+                "changes": {"$sum": self._count()},
+                "sessions": {"$addToSet": "$session_id"},
+            }},
+            {"$project": {"changes": 1, "sessions": {"$size": "$sessions"}}},
+            {"$sort": {"_id": 1}},
+        ]
+        return [(row["_id"], row["changes"], row["sessions"])
+                for row in self._aggregate(self._pipeline(stages, since, until, session_id))]
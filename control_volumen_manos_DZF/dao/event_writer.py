@@ -0,0 +1,161 @@
+import queue
+import threading
+import time
+
+
+class _FlushRequest:
+    """Marker put in the queue: the writer flushes everything before it and sets done."""
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class BatchEventWriter:
+    """
+    Background writer for high-rate documents (volume events).
+
+    The render loop only does a non-blocking put() into a bounded queue; a
+    daemon thread groups the documents and writes them with insert_many()
+    when batch_size are pending or flush_seconds have passed since the first
+    one. A slow or unreachable MongoDB therefore never stalls the video.
+
+    When the queue is full (or a batch cannot be written) documents are
+    dropped, or appended to the local EventJournal if overflow="spill"
+    (replay_journal.py loads them later).
+
+    prepare, if given, is called once on the writer thread before the first
+    write (e.g. to create the collection's indexes), so the caller of put()
+    never waits for it. If it fails the error is printed and writing goes on.
+    """
+
+    def __init__(self, collection, batch_size=100, flush_seconds=1.0, max_queue=10000,
+                 overflow="drop", journal=None, prepare=None):
+        if overflow not in ("drop", "spill"):
+            raise ValueError(f"Unknown overflow policy: {overflow} (options: drop, spill)")
+        if overflow == "spill" and journal is None:
+            raise ValueError("overflow='spill' needs a journal")
+        self.collection = collection
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.overflow = overflow
+        self.journal = journal
+        self.prepare = prepare
+        self.queue = queue.Queue(maxsize=max_queue)
+        # Counters (read them with stats())
+        self.queued = 0
+        self.written = 0
+        self.dropped = 0
+        self.spilled = 0
+        self.failed_batches = 0
+        self.countLock = threading.Lock()
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="BatchEventWriter", daemon=True)
+        self.thread.start()
+
+    def put(self, document):
+        """Queues a document without blocking. Returns False if it was dropped or spilled."""
+        try:
+            self.queue.put_nowait(document)
+        except queue.Full:
+            self._overflow([document])
+            return False
+        with self.countLock:
+            self.queued += 1
+        return True
+
+    def flush(self, timeout=None):
+        """Waits until everything queued so far has been written (or dropped/spilled)."""
+        if not self.thread.is_alive():
+            return False
+        request = _FlushRequest()
+        try:
+            # The marker may wait for room in the queue, but never longer than timeout
+            self.queue.put(request, timeout=timeout)
+        except queue.Full:
+            return False
+        return request.done.wait(timeout)
+
+    def close(self, timeout=5.0):
+        """Flushes and stops the thread. Whatever is still queued after timeout is dropped/spilled."""
+        self.flush(timeout)
+        self.running = False
+        self.thread.join(timeout)
+        leftover = []
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, _FlushRequest):
+                item.done.set()
+            else:
+                leftover.append(item)
+        if leftover:
+            self._overflow(leftover)
+
+    def stats(self):
+        with self.countLock:
+            return {
+                "queued": self.queued,
+                "written": self.written,
+                "dropped": self.dropped,
+                "spilled": self.spilled,
+                "pending": self.queue.qsize(),
+                "failed_batches": self.failed_batches,
+            }
+
+    def _run(self):
+        if self.prepare is not None:
+            try:
+                self.prepare()
+            except Exception as e:
+                print(f"Error preparing {self.collection.name}: {e}")
+        batch = []
+        deadline = None
+        while self.running or batch:
+            timeout = 0.1 if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if isinstance(item, _FlushRequest):
+                self._write(batch)
+                batch, deadline = [], None
+                item.done.set()
+                continue
+            if item is not None:
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_seconds
+
+            if batch and (len(batch) >= self.batch_size or time.monotonic() >= deadline or not self.running):
+                self._write(batch)
+                batch, deadline = [], None
+
+    def _write(self, batch):
+        if not batch:
+            return
+        try:
+            # ordered=False: one bad document does not stop the rest of the batch
+            self.collection.insert_many(batch, ordered=False)
+        except Exception as e:
+            print(f"Error writing {len(batch)} events to MongoDB: {e}")
+            with self.countLock:
+                self.failed_batches += 1
+            self._overflow(batch)
+            return
+        with self.countLock:
+            self.written += len(batch)
+
+    def _overflow(self, documents):
+        if self.overflow == "spill":
+            try:
+                for document in documents:
+                    self.journal.append(self.collection.name, document)
+                with self.countLock:
+                    self.spilled += len(documents)
+                return
+            except OSError as e:
+                print(f"Error spilling events to the journal: {e}")
+        with self.countLock:
+            self.dropped += len(documents)
@@ -0,0 +1,120 @@
+import os
+import glob
+import struct
+import threading
+from datetime import datetime
+import bson
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: a file open in another process cannot be renamed, os.replace fails instead
+    fcntl = None
+
+ACTIVE_SUFFIX = ".bson.part"
+SEALED_SUFFIX = ".bson"
+
+
+class EventJournal:
+    """
+    Local append-only journal for documents that could not reach MongoDB.
+
+    Each record is one BSON document {"collection", "op", "doc"}; BSON starts
+    with its own int32 length, so the file is a plain sequence of
+    length-prefixed records. Appends go to a ".bson.part" file that is
+    renamed to ".bson" (sealed) when it reaches max_bytes or the journal is
+    closed. replay_journal.py loads sealed files into MongoDB.
+    """
+
+    def __init__(self, directory, max_bytes=8 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.file = None
+        self.path = None
+        self.records = 0
+        os.makedirs(directory, exist_ok=True)
+        self._seal_orphans()
+
+    def _seal_orphans(self):
+        """
+        A run that crashed leaves its active file behind: seal it so it can be
+        replayed. Files still locked by a running instance are left alone.
+        """
+        for path in glob.glob(os.path.join(self.directory, "*" + ACTIVE_SUFFIX)):
+            try:
+                with open(path, "rb") as f:
+                    if not _try_lock(f):
+                        continue
+                    os.replace(path, path[:-len(ACTIVE_SUFFIX)] + SEALED_SUFFIX)
+            except OSError:
+                # Removed meanwhile, or (Windows) still open in the instance writing it
+                continue
+
+    def append(self, collection, doc, op="insert"):
+        """op: "insert" (dedupe by _id) or "upsert" ($set by _id, last one wins)."""
+        record = bson.encode({"collection": collection, "op": op, "doc": doc})
+        with self.lock:
+            if self.file is None:
+                self._open()
+            self.file.write(record)
+            # Hand the record to the OS right away: a crash of the app loses nothing
+            self.file.flush()
+            self.records += 1
+            if self.file.tell() >= self.max_bytes:
+                self._seal()
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self._seal()
+
+    def _open(self):
+        name = f"journal-{datetime.utcnow():%Y%m%d-%H%M%S-%f}-{os.getpid()}"
+        self.path = os.path.join(self.directory, name + ACTIVE_SUFFIX)
+        self.file = open(self.path, "ab")
+        # Held until the file is sealed: other instances must not seal it while we write
+        _try_lock(self.file)
+
+    def _seal(self):
+        os.fsync(self.file.fileno())
+        self.file.close()
+        os.replace(self.path, self.path[:-len(ACTIVE_SUFFIX)] + SEALED_SUFFIX)
+        self.file = None
+        self.path = None
+
+
+def _try_lock(f):
+    """Exclusive non-blocking lock on an open file; False if another writer holds it."""
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def sealed_journals(directory):
+    """Sealed journal files, oldest first (the names sort by creation time)."""
+    return sorted(glob.glob(os.path.join(directory, "*" + SEALED_SUFFIX)))
+
+
+def read_journal(path):
+    """
+    Yields the records of a journal file. A truncated last record (power
+    loss while writing) is skipped with a warning instead of failing.
+    """
+    with open(path, "rb") as f:
+        while True:
+            header = f.read(4)
+            if not header:
+                return
+            if len(header) < 4:
+                break
+            length = struct.unpack("<i", header)[0]
+            body = f.read(length - 4)
+            if length < 5 or len(body) < length - 4:
+                break
+            yield bson.decode(header + body)
+    print(f"Warning: truncated record at the end of {path} ignored")
@@ -1,5 +1,8 @@
 from pymongo import MongoClient
 from config.settings import Settings
+from dao.event_writer import BatchEventWriter
+from dao.journal import EventJournal
+from dao.analytics import VolumeAnalytics, ensure_indexes
 
 class MongoDAO:
     _instance = None
@@ -9,12 +12,18 @@ class MongoDAO:
             cls._instance = super(MongoDAO, cls).__new__(cls)
             try:
                 # Conexión usando las variables de entorno
-                cls._instance.client = MongoClient(Settings.MONGODB_URI)
+                cls._instance.client = MongoClient(Settings.MONGODB_URI, serverSelectionTimeoutMS=Settings.MONGODB_TIMEOUT_MS)
+                # MongoClient connects lazily: ping now so an unreachable server is detected here
+                # instead of blocking (up to 30 s) on the first write
+                cls._instance.client.admin.command("ping")
                 cls._instance.db = cls._instance.client[Settings.DATABASE_NAME]
             except Exception as e:
                 print(f"Error connecting to MongoDB: {e}")
                 cls._instance.client = None
                 cls._instance.db = None
+            # One background writer per collection (volume_events, volume_rollups)
+            cls._instance.writers = {}
+            cls._instance.journal = None
         return cls._instance
 
     def insert_session(self, session_data):
@@ -27,7 +36,107 @@ class MongoDAO:
              return self.db.sessions.update_one({'_id': session_id}, {'$set': session_data})
         return None
 
+    def save_session(self, session_data):
+        """
+        Upserts the session by its _id (the model generates it, so it works offline).
+        Without MongoDB, or if the write fails, it goes to the local journal.
+        """
+        if self.db is not None:
+            try:
+                return self.db.sessions.update_one({'_id': session_data['_id']}, {'$set': session_data}, upsert=True)
+            except Exception as e:
+                print(f"Error saving session to MongoDB, journaling it: {e}")
+        self._get_journal().append("sessions", session_data, op="upsert")
+        return None
+
     def insert_volume_event(self, event_data):
         if self.db is not None:
             return self.db.volume_events.insert_one(event_data)
         return None
+
+    def queue_volume_event(self, event_data):
+        """
+        Non-blocking version of insert_volume_event for the render loop (batched in
+        the background). Without MongoDB the event goes straight to the local journal.
+        """
+        return self._queue("volume_events", event_data)
+
+    def queue_volume_rollup(self, rollup_data):
+        """Like queue_volume_event, for VolumeRollup buckets (collection volume_rollups)."""
+        return self._queue("volume_rollups", rollup_data)
+
+    def ensure_rollup_collection(self, timeseries=False):
+        """
+        Creates volume_rollups as a time-series collection (MongoDB 5.0+) if asked to.
+        Time-series collections do not enforce a unique _id; replay_journal.py
+        checks the existing ids before inserting instead.
+        """
+        if self.db is None or not timeseries or "volume_rollups" in self.db.list_collection_names():
+            return
+        try:
+            self.db.create_collection("volume_rollups", timeseries={
+                "timeField": "timestamp", "metaField": "session_id", "granularity": "seconds"})
+        except Exception as e:
+            print(f"Could not create volume_rollups as a time-series collection: {e}")
+
+    def ensure_indexes(self):
+        """
+        Creates the analytics indexes (session_id + timestamp, timestamp, start_time).
+        Call it after ensure_rollup_collection so volume_rollups keeps its type.
+        """
+        if self.db is None:
+            return []
+        try:
+            return ensure_indexes(self.db)
+        except Exception as e:
+            print(f"Error creating MongoDB indexes: {e}")
+            return []
+
+    def analytics(self, source="events", kind=None):
+        """VolumeAnalytics over volume_events ("events") or volume_rollups ("rollups"), or None offline."""
+        if self.db is None:
+            return None
+        return VolumeAnalytics(self.db, source, kind)
+
+    def _queue(self, collection, document):
+        if self.db is None:
+            self._get_journal().append(collection, document)
+            return True
+        writer = self.writers.get(collection)
+        if writer is None:
+            writer = self.writers[collection] = BatchEventWriter(
+                self.db[collection],
+                batch_size=Settings.EVENT_BATCH_SIZE,
+                flush_seconds=Settings.EVENT_FLUSH_SECONDS,
+                max_queue=Settings.EVENT_QUEUE_SIZE,
+                overflow=Settings.EVENT_OVERFLOW,
+                journal=self._get_journal() if Settings.EVENT_OVERFLOW == "spill" else None,
+                # volume_rollups may not exist at startup (created by the first insert): the
+                # writer thread indexes it before its first insert_many, off the render loop
+                prepare=lambda: ensure_indexes(self.db, [collection]))
+        return writer.put(document)
+
+    def flush_events(self, timeout=5.0):
+        """Writes every queued event (e.g. when the session ends)."""
+        return all([writer.flush(timeout) for writer in self.writers.values()])
+
+    def close_events(self, timeout=5.0):
+        for writer in self.writers.values():
+            writer.close(timeout)
+        if self.journal is not None:
+            # Seal the active journal file so replay_journal.py picks it up
+            self.journal.close()
+
+    def event_stats(self):
+        """Counters of the background writers (queued, written, dropped, spilled, pending) and the journal."""
+        stats = {"queued": 0, "written": 0, "dropped": 0, "spilled": 0, "pending": 0, "failed_batches": 0}
+        for writer in self.writers.values():
+            for key, value in writer.stats().items():
+                stats[key] += value
+        stats["journaled"] = self.journal.records if self.journal is not None else 0
+        return stats
+
+    def _get_journal(self):
+        if self.journal is None:
+            self.journal = EventJournal(Settings.JOURNAL_DIR, Settings.JOURNAL_MAX_BYTES)
+        return self.journal
@@ -0,0 +1,134 @@
+"""
+Informe de uso a partir de lo guardado en MongoDB: cambios de volumen y
+distancia media por sesión, histograma de cambios de volumen y uso por
+hora del día. Las consultas son pipelines de agregación (dao/analytics.py)
+que usan los índices que crea MongoDAO al arrancar.
+
+Con --mock se ejecuta contra mongomock con sesiones sintéticas, sin
+servidor; sirve para probar las consultas en local.
+
+    python informe_sesiones.py
+    python informe_sesiones.py --fuente rollups --desde 2024-01-01 --hasta 2024-02-01
+    python informe_sesiones.py --mock --zona-horaria Europe/Madrid
+"""
+import json
+import random
+import argparse
+from datetime import datetime, timedelta
+from bson import ObjectId
+from config.settings import Settings
+from dao.analytics import VolumeAnalytics, ensure_indexes
+from models.session import Session
+from models.volume_event import VolumeEvent
+from models.volume_rollup import RollupBuilder
+
+ANCHO_BARRA = 40
+
+
+def datos_de_prueba(db, sesiones, kind, semilla=0):
+    """Sesiones sintéticas de gestos de pinza (~30 fps), guardadas como eventos y como rollups."""
+    rng = random.Random(semilla)
+    inicio = datetime(2024, 1, 1, 8)
+    for i in range(sesiones):
+        session = Session(start_time=inicio + timedelta(hours=i * 5 + rng.randint(0, 3)))
+        builder = RollupBuilder(kind, session.session_id, Settings.GESTURE_GAP_SECONDS)
+        eventos, buckets = [], []
+        t = session.start_time
+        volumen = rng.randint(0, 100)
+        for _ in range(rng.randint(5, 30)):
+            objetivo = rng.randint(0, 100)
+            paso = 1 if objetivo > volumen else -1
+            while volumen != objetivo:
+                nuevo = volumen + paso * min(rng.randint(1, 3), abs(objetivo - volumen))
+                t += timedelta(seconds=1 / 30)
+                event = VolumeEvent(volumen, nuevo, 50 + nuevo * 2 + rng.random() * 5, session.session_id)
+                event.timestamp = t
+                eventos.append(event.to_dict())
+                buckets.extend(builder.add(event))
+                volumen = nuevo
+            t += timedelta(seconds=rng.uniform(1.0, 5.0))
+        buckets.extend(builder.flush())
+        session.end_time = t
+        db.sessions.insert_one(session.to_dict())
+        db.volume_events.insert_many(eventos)
+        db.volume_rollups.insert_many(buckets)
+    ensure_indexes(db)
+
+
+def barra(valor, maximo):
+    return "#" * round(ANCHO_BARRA * valor / maximo) if maximo else ""
+
+
+def imprimir(informe, cubeta):
+    print(f"\n{'sesión':<26}{'inicio':<21}{'duración s':>11}{'cambios':>9}{'distancia px':>14}")
+    for s in informe["sesiones"]:
+        inicio = s["start_time"].strftime("%Y-%m-%d %H:%M:%S") if s["start_time"] else "-"
+        duracion = f"{s['duration_seconds']:.0f}" if s["duration_seconds"] is not None else "-"
+        distancia = f"{s['avg_finger_distance']:.1f}" if s["avg_finger_distance"] is not None else "-"
+        print(f"{str(s['session_id']):<26}{inicio:<21}{duracion:>11}{s['changes']:>9}{distancia:>14}")
+    if informe["distancia_media"] is not None:
+        print(f"Distancia media entre pulgar e índice: {informe['distancia_media']:.1f} px")
+
+    print(f"\n{'cambio de volumen':<19}{'n':>9}")
+    maximo = max((n for _, n in informe["histograma"]), default=0)
+    for borde, n in informe["histograma"]:
+        rango = f"[{borde:+.0f}, {borde + cubeta:+.0f})"
+        print(f"{rango:<19}{n:>9}  {barra(n, maximo)}")
+
+    print(f"\n{'hora':<6}{'cambios':>9}{'sesiones':>10}")
+    maximo = max((cambios for _, cambios, _ in informe["por_hora"]), default=0)
+    for hora, cambios, sesiones in informe["por_hora"]:
+        print(f"{hora:02d}:00{cambios:>10}{sesiones:>10}  {barra(cambios, maximo)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Informe de sesiones y cambios de volumen")
+    parser.add_argument("--mock", action="store_true", help="Usar mongomock con sesiones sintéticas (sin servidor)")
+    parser.add_argument("--sesiones-prueba", type=int, default=20, help="Sesiones sintéticas con --mock")
+    parser.add_argument("--fuente", choices=VolumeAnalytics.SOURCES,
+                        default="events" if Settings.VOLUME_EVENT_MODE == "events" else "rollups",
+                        help="volume_events o volume_rollups (por defecto según VOLUME_EVENT_MODE)")
+    parser.add_argument("--desde", type=datetime.fromisoformat, help="Fecha inicial (UTC, ISO 8601)")
+    parser.add_argument("--hasta", type=datetime.fromisoformat, help="Fecha final, excluida (UTC, ISO 8601)")
+    parser.add_argument("--sesion", type=ObjectId, help="Solo esta sesión (_id)")
+    parser.add_argument("--limite", type=int, default=20, help="Sesiones a listar (las más recientes)")
+    parser.add_argument("--cubeta", type=int, default=5, help="Ancho del histograma en puntos de volumen")
+    parser.add_argument("--zona-horaria", help="Zona para el uso por hora, p. ej. Europe/Madrid (por defecto UTC)")
+    parser.add_argument("--json", help="Guardar el informe en este fichero")
+    args = parser.parse_args()
+
+    # Los rollups de un solo tipo: second o gesture, el que use la aplicación
+    kind = Settings.VOLUME_EVENT_MODE if Settings.VOLUME_EVENT_MODE in RollupBuilder.KINDS else "second"
+    if args.mock:
+        import mongomock
+        db = mongomock.MongoClient()[Settings.DATABASE_NAME]
+        datos_de_prueba(db, args.sesiones_prueba, kind)
+    else:
+        from pymongo import MongoClient
+        client = MongoClient(Settings.MONGODB_URI, serverSelectionTimeoutMS=Settings.MONGODB_TIMEOUT_MS)
+        try:
+            client.admin.command("ping")
+        except Exception as e:
+            print(f"MongoDB no está disponible: {e}")
+            return
+        db = client[Settings.DATABASE_NAME]
+
+    analytics = VolumeAnalytics(db, args.fuente, kind)
+    filtros = {"since": args.desde, "until": args.hasta, "session_id": args.sesion}
+    informe = {
+        "sesiones": analytics.session_summary(limit=args.limite, **filtros),
+        "distancia_media": analytics.average_finger_distance(**filtros),
+        "histograma": analytics.volume_change_histogram(args.cubeta, **filtros),
+        "por_hora": analytics.hourly_usage(timezone=args.zona_horaria, **filtros),
+    }
+    print(f"Fuente: {analytics.collection.name}" + (f" ({kind})" if args.fuente == "rollups" else ""))
+    imprimir(informe, args.cubeta)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(informe, f, indent=2, default=str)
+        print(f"Informe guardado en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,33 @@
 import cv2
 import time
+import argparse
+import platform
+import numpy as np
 from dao.mongodb_dao import MongoDAO
 from models.session import Session
 from models.volume_event import VolumeEvent
-from HandTrackingModule import HandDetector
-from VolumeHandControl import VolumeController
+from models.volume_rollup import RollupBuilder
+from HandTrackingModule import HandDetector, IdleRate
+from VolumeHandControl import VolumeActuator, create_backend
 from CameraCapture import CameraCapture
+from InferenceProcess import RemoteHandDetector
+from config.settings import Settings
+from profiling import StageProfiler
 
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Control de volumen con la mano")
+    parser.add_argument("--video", help="Reproducir este vídeo en vez de abrir la cámara")
+    parser.add_argument("--headless", action="store_true", help="Sin ventana (benchmarks, servidores)")
+    parser.add_argument("--sin-pausa", action="store_true", help="Con --video: procesar todos los frames lo más rápido posible")
+    parser.add_argument("--max-frames", type=int, help="Terminar tras este número de frames")
+    parser.add_argument("--volume-backend", help="Backend de volumen (por defecto Settings.VOLUME_BACKEND; null si --headless)")
+    parser.add_argument("--report", help="Guardar los tiempos por etapa (JSON) en este fichero")
+    parser.add_argument("--proceso-inferencia", action="store_true", default=Settings.INFERENCE_PROCESS,
+                        help="Inferencia en un proceso aparte, con los frames en memoria compartida")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
     print("Iniciando aplicación...")
     
     # 1. Initialize DB Connection
@@ -16,112 +36,210 @@ def main():
     if db_ok:
         print("DB: OK")
     else:
-        print("Error al conectar con la base de datos.")
+        print("Error al conectar con la base de datos. Los eventos se guardarán en el journal local.")
 
     # 2. Start Session
+    # Sin MongoDB la sesión y sus eventos van al journal (replay_journal.py los carga después)
     session = Session()
-    session_dict = session.to_dict()
-    session_id = None
-    if db_ok:
-        result = dao.insert_session(session_dict)
-        if result:
-            session_id = result.inserted_id
+    session_id = session.session_id
+    dao.save_session(session.to_dict())
+
+    # Modo rollup: un documento por segundo o por gesto en vez de uno por cada 1 %
+    rollups = None
+    if Settings.VOLUME_EVENT_MODE != "events":
+        rollups = RollupBuilder(Settings.VOLUME_EVENT_MODE, session_id, Settings.GESTURE_GAP_SECONDS)
+        dao.ensure_rollup_collection(Settings.ROLLUP_TIMESERIES)
+    # Índices para los informes (informe_sesiones.py); después de crear volume_rollups
+    dao.ensure_indexes()
 
     # 3. Setup Camera and Modules
     # Utilizando la nueva arquitectura robusta con hilos, fallbacks y locks
-    cap = CameraCapture()
+    cap = CameraCapture(source=args.video, realtime=not args.sin_pausa, shared=args.proceso_inferencia)
     if not cap.start():
         print("No se pudo iniciar la cámara. Saliendo...")
         return
     
-    detector = HandDetector(detectionCon=0.7, maxHands=1)
-    
+    canvas = None  # buffer de dibujo reutilizado (el frame del buffer circular es de solo lectura)
+    # Tiempos por etapa de cada frame (histogramas p50/p95/p99, --report para guardarlos)
+    prof = StageProfiler()
+    detector = None
+    volume_ctrl = None
     try:
-        volume_ctrl = VolumeController()
-    except Exception as e:
-        print(f"Error initializing VolumeController: {e}")
-        return
+        # Recorte alrededor de la última mano (solo modo "image") con búsqueda completa periódica
+        detector_kwargs = dict(detectionCon=0.7, maxHands=1, runningMode=Settings.HAND_RUNNING_MODE,
+                               roi=Settings.HAND_ROI, roiScale=Settings.HAND_ROI_SCALE,
+                               fullSearchEvery=Settings.HAND_FULL_SEARCH_EVERY)
+        if args.proceso_inferencia:
+            # Captura e interfaz en este proceso; MediaPipe en otro (sin competir por el GIL)
+            detector = RemoteHandDetector(cap, pipelined=Settings.INFERENCE_PIPELINED, **detector_kwargs).start()
+        else:
+            detector = HandDetector(**detector_kwargs)
+        # Sin mano a la vista se infiere a HAND_IDLE_HZ; en cuanto aparece, vuelve a cada frame
+        idle_rate = IdleRate(Settings.HAND_IDLE_HZ, Settings.HAND_IDLE_AFTER_SECONDS)
+    
+        try:
+            # El volumen se aplica en su propio hilo (suavizado y limitado): el bucle no espera al audio
+            volume_backend = args.volume_backend or ("null" if args.headless else Settings.VOLUME_BACKEND)
+            volume_ctrl = VolumeActuator(create_backend(volume_backend),
+                                         smoothing=Settings.VOLUME_SMOOTHING,
+                                         threshold=Settings.VOLUME_THRESHOLD,
+                                         max_rate_hz=Settings.VOLUME_MAX_RATE_HZ).start()
+        except Exception as e:
+            print(f"Error initializing VolumeActuator: {e}")
+            return
+
+        vol = 0
+        volBar = 400
+        volPer = 0
+        last_vol_per = -1
+
+        # 4. Main Loop
+        frame_count = 0
+        seq = 0
+        while args.max_frames is None or frame_count < args.max_frames:
+            prof.begin_frame()
+            # Bloquea hasta que haya un frame nuevo: nunca se procesa dos veces el mismo
+            t0 = time.perf_counter()
+            seq, frame, timestamp_ms = cap.read_latest(seq, timeout=3.0)
+            if frame is None and cap.finished:
+                print("Fin del vídeo.")
+                break
+            if frame is None:
+                print("Error: No se pudo capturar el frame de la cámara. Verifica lo siguiente:")
+                print("1. Tu cámara está bien conectada y no está ocupada por otra app (Zoom, OBS, etc.).")
+                print("2. Permisos de Privacidad de Windows: Configuración > Privacidad > Cámara > 'Permitir que las aplicaciones de escritorio accedan a la cámara'.")
+                cv2.waitKey(3000)
+                break
 
-    vol = 0
-    volBar = 400
-    volPer = 0
-    last_vol_per = -1
-
-    # 4. Main Loop
-    frame_count = 0
-    while True:
-        success, img = cap.read()
-        if not success:
-            print("Error: No se pudo capturar el frame de la cámara. Verifica lo siguiente:")
-            print("1. Tu cámara está bien conectada y no está ocupada por otra app (Zoom, OBS, etc.).")
-            print("2. Permisos de Privacidad de Windows: Configuración > Privacidad > Cámara > 'Permitir que las aplicaciones de escritorio accedan a la cámara'.")
-            cv2.waitKey(3000)
-            break
+            if canvas is None or canvas.shape != frame.shape:
+                canvas = np.empty_like(frame)
+            np.copyto(canvas, frame)
+            img = canvas
+            prof.add("capture", (time.perf_counter() - t0) * 1000)
             
-        frame_count += 1
-        if frame_count % 30 == 0:
-            print(f"Captured frame {frame_count}")
+            frame_count += 1
+            if frame_count % 30 == 0:
+                print(f"Captured frame {frame_count}")
         
-        img = detector.findHands(img)
-        lmList, bbox = detector.findPosition(img, draw=False)
+            if idle_rate.due():
+                img = detector.findHands(img, timestamp_ms=timestamp_ms)
+                prof.add_many(detector.stageTimes)
+                idle_rate.update(len(detector.landmarks) > 0)
+            # Frame sin inferencia (reposo): no hay mano, los landmarks siguen vacíos
+            with prof.stage("landmarks"):
+                lmList, bbox = detector.findPosition(img, draw=False)
         
-        # Check if frame is too dark (average pixel value < 10)
-        mean_brightness = img.mean()
-        if mean_brightness < 10:
-            cv2.putText(img, "Camara oscura. Comprueba tu privacidad/tapa.", (10, 80), 
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
-            cv2.putText(img, "Permisos Windows OK? App de terceros usando cam?", (10, 110), 
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 1)
+            # Check if frame is too dark (average pixel value < 10)
+            t0 = time.perf_counter()
+            mean_brightness = img.mean()
+            if mean_brightness < 10:
+                cv2.putText(img, "Camara oscura. Comprueba tu privacidad/tapa.", (10, 80), 
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
+                cv2.putText(img, "Permisos Windows OK? App de terceros usando cam?", (10, 110), 
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 1)
+            prof.add("draw", (time.perf_counter() - t0) * 1000)
                         
-        if len(lmList) != 0:
-            fingers = detector.fingersUp()
+            if len(lmList) != 0:
+                with prof.stage("landmarks"):
+                    fingers = detector.fingersUp()
             
-            # El volumen cambiará usando la distancia entre el pulgar y el índice en todo momento
-            if len(fingers) >= 2:
-                # Calculate distance between thumb (4) and index (8)
-                length, img, lineInfo = detector.findDistance(4, 8, img)
+                # El volumen cambiará usando la distancia entre el pulgar y el índice en todo momento
+                if len(fingers) >= 2:
+                    # Calculate distance between thumb (4) and index (8)
+                    with prof.stage("draw"):
+                        length, img, lineInfo = detector.findDistance(4, 8, img)
                 
-                # Set volume based on distance
-                vol, volBar, volPer = volume_ctrl.set_volume(length, min_length=50, max_length=250)
+                    # Set volume based on distance
+                    with prof.stage("volume"):
+                        vol, volBar, volPer = volume_ctrl.set_volume(length, min_length=50, max_length=250)
                 
-                # Check for volume change to record it
-                current_vol_per = int(volPer)
-                if current_vol_per != last_vol_per:
-                    if db_ok and last_vol_per != -1:
-                        # Register volume event if it changed
-                        event = VolumeEvent(previous_volume=last_vol_per, new_volume=current_vol_per, finger_distance=length, session_id=session_id)
-                        dao.insert_volume_event(event.to_dict())
-                    last_vol_per = current_vol_per
-
-        # 5. UI Elements
-        # Draw DB Status
-        cv2.putText(img, f'DB: {"OK" if db_ok else "ERR"}', (10, 30), cv2.FONT_HERSHEY_COMPLEX, 1, 
-                    (0, 255, 0) if db_ok else (0, 0, 255), 3)
-
-        # Draw Volume Bar
-        cv2.rectangle(img, (50, 150), (85, 400), (255, 0, 0), 3)
-        cv2.rectangle(img, (50, int(volBar)), (85, 400), (255, 0, 0), cv2.FILLED)
-        cv2.putText(img, f'{int(volPer)} %', (40, 450), cv2.FONT_HERSHEY_COMPLEX,
-                    1, (255, 0, 0), 3)
-
-        cv2.imshow("Hand Volume Control", img)
+                    # Check for volume change to record it
+                    current_vol_per = int(volPer)
+                    t0 = time.perf_counter()
+                    if current_vol_per != last_vol_per:
+                        if last_vol_per != -1:
+                            # Register volume event if it changed
+                            event = VolumeEvent(previous_volume=last_vol_per, new_volume=current_vol_per, finger_distance=length, session_id=session_id)
+                            # Encolado sin bloquear: un MongoDB lento no congela el vídeo
+                            if rollups is None:
+                                dao.queue_volume_event(event.to_dict())
+                            else:
+                                for bucket in rollups.add(event):
+                                    dao.queue_volume_rollup(bucket)
+                        last_vol_per = current_vol_per
+                    prof.add("db", (time.perf_counter() - t0) * 1000)
+
+            # Cierra el bucket abierto cuando termina su segundo / gesto aunque no haya más cambios
+            if rollups is not None:
+                with prof.stage("db"):
+                    for bucket in rollups.poll():
+                        dao.queue_volume_rollup(bucket)
+
+            # 5. UI Elements
+            # Draw DB Status
+            t0 = time.perf_counter()
+            cv2.putText(img, f'DB: {"OK" if db_ok else "ERR"}', (10, 30), cv2.FONT_HERSHEY_COMPLEX, 1, 
+                        (0, 255, 0) if db_ok else (0, 0, 255), 3)
+
+            # Draw Volume Bar
+            cv2.rectangle(img, (50, 150), (85, 400), (255, 0, 0), 3)
+            cv2.rectangle(img, (50, int(volBar)), (85, 400), (255, 0, 0), cv2.FILLED)
+            cv2.putText(img, f'{int(volPer)} %', (40, 450), cv2.FONT_HERSHEY_COMPLEX,
+                        1, (255, 0, 0), 3)
+            prof.add("draw", (time.perf_counter() - t0) * 1000)
+
+            if args.headless:
+                prof.end_frame()
+                continue
+
+            t0 = time.perf_counter()
+            cv2.imshow("Hand Volume Control", img)
         
-        # Check if window was closed by the user (clicking the X)
-        if cv2.getWindowProperty("Hand Volume Control", cv2.WND_PROP_VISIBLE) < 1:
-            break
+            # Check if window was closed by the user (clicking the X)
+            if cv2.getWindowProperty("Hand Volume Control", cv2.WND_PROP_VISIBLE) < 1:
+                break
         
-        # Press 'q' to exit
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            break
+            # Press 'q' to exit
+            key = cv2.waitKey(1) & 0xFF
+            prof.add("display", (time.perf_counter() - t0) * 1000)
+            prof.end_frame()
+            if key == ord('q'):
+                break
+    finally:
+        # 6. Cleanup: también si el bucle falla (p. ej. un error del proceso de inferencia),
+        # para liberar la memoria compartida, guardar la sesión y sellar el journal
+        worker_cpu = getattr(detector, "worker_cpu", None)
+        if detector is not None:
+            detector.close()
+        cap.release()
+        if volume_ctrl is not None:
+            volume_ctrl.stop()
+        if not args.headless:
+            cv2.destroyAllWindows()
 
-    # 6. Cleanup
-    cap.release()
-    cv2.destroyAllWindows()
-    
-    # End Session
-    if session_id and db_ok:
+        # End Session
         session.end_session()
-        dao.update_session(session_id, session.to_dict())
+        dao.save_session(session.to_dict())
+        if rollups is not None:
+            for bucket in rollups.flush():
+                dao.queue_volume_rollup(bucket)
+        # Los eventos pendientes se escriben (o van al journal) antes de salir
+        dao.close_events()
+    stats = dao.event_stats()
+    print(f"Eventos de volumen: {stats['written']} escritos, {stats['dropped']} descartados, "
+          f"{stats['journaled']} en el journal local")
+
+    if args.headless or args.report:
+        prof.print_report()
+        if worker_cpu is not None and prof.run_end is not None and prof.run_end > prof.run_start:
+            print(f"CPU del proceso de inferencia: {100 * worker_cpu / (prof.run_end - prof.run_start):.0f} %")
+    if args.report:
+        prof.save(args.report, source=args.video or "camera", headless=args.headless,
+                  realtime=not args.sin_pausa, running_mode=Settings.HAND_RUNNING_MODE,
+                  inference_process=args.proceso_inferencia, worker_cpu_seconds=worker_cpu,
+                  resolution=list(canvas.shape[1::-1]) if canvas is not None else None,
+                  opencv=cv2.__version__, python=platform.python_version(), machine=platform.machine())
+        print(f"Informe guardado en {args.report}")
         
     print("Aplicación terminada.")
 
@@ -1,9 +1,12 @@
 from datetime import datetime
+from bson import ObjectId
 
 class Session:
     """Represents an application usage session."""
     
     def __init__(self, start_time: datetime = None, end_time: datetime = None):
+        # Generated client-side so events can reference the session even without MongoDB
+        self.session_id = ObjectId()
         self.start_time = start_time or datetime.utcnow()
         self.end_time = end_time
     
@@ -12,6 +15,7 @@ class Session:
 
     def to_dict(self):
         data = {
+            "_id": self.session_id,
             "start_time": self.start_time,
             "end_time": self.end_time
         }
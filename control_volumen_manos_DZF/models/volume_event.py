@@ -1,9 +1,12 @@
 from datetime import datetime
+from bson import ObjectId
 
 class VolumeEvent:
     """Represents a volume change event."""
     
     def __init__(self, previous_volume: float, new_volume: float, finger_distance: float, session_id=None):
+        # Generated here (not by MongoDB) so a journaled event keeps its id and replays only once
+        self.event_id = ObjectId()
         self.timestamp = datetime.utcnow()
         self.previous_volume = previous_volume
         self.new_volume = new_volume
@@ -12,6 +15,7 @@ class VolumeEvent:
         
     def to_dict(self):
         return {
+            "_id": self.event_id,
             "timestamp": self.timestamp,
             "previous_volume": self.previous_volume,
             "new_volume": self.new_volume,
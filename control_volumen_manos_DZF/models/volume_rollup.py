@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta
+from bson import ObjectId
+
+class VolumeRollup:
+    """Aggregate of consecutive volume events (one second or one pinch gesture)."""
+
+    def __init__(self, kind: str, start_time: datetime, session_id=None):
+        self.rollup_id = ObjectId()
+        self.kind = kind
+        self.session_id = session_id
+        self.start_time = start_time
+        self.end_time = start_time
+        self.count = 0
+        self.first_volume = None
+        self.last_volume = None
+        self.min_volume = None
+        self.max_volume = None
+        self.distance_sum = 0.0
+
+    def add(self, event):
+        if self.count == 0:
+            # Volume before the first change of the bucket
+            self.first_volume = self.min_volume = self.max_volume = event.previous_volume
+        self.last_volume = event.new_volume
+        self.min_volume = min(self.min_volume, event.new_volume)
+        self.max_volume = max(self.max_volume, event.new_volume)
+        self.distance_sum += event.finger_distance
+        self.count += 1
+        self.end_time = event.timestamp
+
+    def to_dict(self):
+        return {
+            "_id": self.rollup_id,
+            # "timestamp" is the timeField if volume_rollups is a time-series collection
+            "timestamp": self.start_time,
+            "end_time": self.end_time,
+            "session_id": self.session_id,
+            "kind": self.kind,
+            "count": self.count,
+            "first_volume": self.first_volume,
+            "last_volume": self.last_volume,
+            "min_volume": self.min_volume,
+            "max_volume": self.max_volume,
+            "mean_finger_distance": self.distance_sum / self.count if self.count else None,
+            # Kept so buckets can be re-aggregated exactly (weighted by count)
+            "finger_distance_sum": self.distance_sum,
+        }
+
+
+class RollupBuilder:
+    """
+    Groups VolumeEvents into VolumeRollups.
+    kind="second": one bucket per wall-clock second.
+    kind="gesture": a bucket closes after gesture_gap seconds without changes.
+    add() and poll() return the buckets that were closed (as dicts).
+    """
+
+    KINDS = ("second", "gesture")
+
+    def __init__(self, kind="second", session_id=None, gesture_gap=0.5):
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown rollup kind: {kind} (options: {', '.join(self.KINDS)})")
+        self.kind = kind
+        self.session_id = session_id
+        self.gesture_gap = timedelta(seconds=gesture_gap)
+        self.current = None
+
+    def _bucket_start(self, timestamp):
+        return timestamp.replace(microsecond=0) if self.kind == "second" else timestamp
+
+    def _expired(self, now):
+        if self.current is None:
+            return False
+        if self.kind == "second":
+            return now >= self.current.start_time + timedelta(seconds=1)
+        return now - self.current.end_time > self.gesture_gap
+
+    def add(self, event):
+        closed = self.poll(event.timestamp)
+        if self.current is None:
+            self.current = VolumeRollup(self.kind, self._bucket_start(event.timestamp), self.session_id)
+        self.current.add(event)
+        return closed
+
+    def poll(self, now=None):
+        """Closes the open bucket if its second/gesture is over (call it once per frame)."""
+        if self._expired(now or datetime.utcnow()):
+            return self.flush()
+        return []
+
+    def flush(self):
+        """Closes the open bucket unconditionally (end of session)."""
+        if self.current is None:
+            return []
+        closed, self.current = self.current, None
+        return [closed.to_dict()]
@@ -0,0 +1,139 @@
+import json
+import math
+import time
+from contextlib import contextmanager
+
+
+class LatencyHistogram:
+    """
+    Log-bucketed latency histogram (ms), constant memory however long the run.
+    With 50 buckets per decade percentiles are accurate to ~5%; min, max
+    and mean are exact.
+    """
+
+    BUCKETS_PER_DECADE = 50
+    MIN_MS = 0.001
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def add(self, ms):
+        bucket = max(0, math.ceil(math.log10(max(ms, self.MIN_MS) / self.MIN_MS) * self.BUCKETS_PER_DECADE))
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.count += 1
+        self.total += ms
+        self.min = min(self.min, ms)
+        self.max = max(self.max, ms)
+
+    def _upper_edge(self, bucket):
+        return self.MIN_MS * 10 ** (bucket / self.BUCKETS_PER_DECADE)
+
+    def percentile(self, p):
+        if not self.count:
+            return None
+        rank = p / 100 * self.count
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                # Clamp to the exact extremes so p0/p100 are not bucket edges
+                return min(max(self._upper_edge(bucket), self.min), self.max)
+        return self.max
+
+    def summary(self):
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count,
+            "min_ms": self.min,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "max_ms": self.max,
+        }
+
+
+class StageProfiler:
+    """
+    Per-frame stage timings. Between begin_frame() and end_frame() the
+    time of each stage is accumulated (a stage can run several times per
+    frame, e.g. drawing), then added once to that stage's histogram.
+    """
+
+    def __init__(self):
+        self.histograms = {}
+        self.current = {}
+        self.frames = 0
+        self.frame_start = None
+        self.run_start = None
+        self.run_end = None
+        # CPU time of this process (all threads) over the run, to compare pipeline layouts
+        self.cpu_start = None
+        self.cpu_end = None
+
+    def begin_frame(self):
+        self.frame_start = time.perf_counter()
+        if self.run_start is None:
+            self.run_start = self.frame_start
+            self.cpu_start = time.process_time()
+        self.current = {}
+
+    def add(self, stage, ms):
+        self.current[stage] = self.current.get(stage, 0.0) + ms
+
+    def add_many(self, timings):
+        for stage, ms in timings.items():
+            self.add(stage, ms)
+
+    @contextmanager
+    def stage(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, (time.perf_counter() - t0) * 1000)
+
+    def end_frame(self):
+        self.run_end = time.perf_counter()
+        self.cpu_end = time.process_time()
+        self.current["frame"] = (self.run_end - self.frame_start) * 1000
+        for stage, ms in self.current.items():
+            self.histograms.setdefault(stage, LatencyHistogram()).add(ms)
+        self.frames += 1
+
+    def fps(self):
+        if not self.frames or self.run_end is None or self.run_end <= self.run_start:
+            return 0.0
+        return self.frames / (self.run_end - self.run_start)
+
+    def cpu_percent(self):
+        """CPU used by this process during the run, in % of one core."""
+        if not self.frames or self.run_end <= self.run_start:
+            return 0.0
+        return 100 * (self.cpu_end - self.cpu_start) / (self.run_end - self.run_start)
+
+    def report(self, **info):
+        return {
+            "info": info,
+            "frames": self.frames,
+            "fps": self.fps(),
+            "cpu_percent": self.cpu_percent(),
+            "stages": {stage: h.summary() for stage, h in self.histograms.items()},
+        }
+
+    def print_report(self):
+        print(f"\n{'etapa':<18}{'n':>7}{'media ms':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'máx ms':>9}")
+        for stage, h in self.histograms.items():
+            s = h.summary()
+            print(f"{stage:<18}{s['count']:>7}{s['mean_ms']:>10.2f}{s['p50_ms']:>9.2f}{s['p95_ms']:>9.2f}"
+                  f"{s['p99_ms']:>9.2f}{s['max_ms']:>9.2f}")
+        print(f"FPS de extremo a extremo: {self.fps():.1f} ({self.frames} frames), CPU de este proceso: {self.cpu_percent():.0f} %")
+
+    def save(self, path, **info):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(**info), f, indent=2)
@@ -0,0 +1,109 @@
+"""
+Carga en MongoDB los journals locales que se grabaron sin conexión.
+
+Los eventos se insertan con insert_many(ordered=False) usando el _id que
+generó la aplicación, así que los que ya estaban en MongoDB (un replay
+repetido o un lote que sí llegó a escribirse) se descartan como duplicados.
+Las sesiones se aplican como upsert por _id en el orden del journal. Cada
+fichero se borra (o se mueve a --archivo) solo cuando se cargó entero.
+
+    python replay_journal.py
+    python replay_journal.py --dir journal --archivo journal/cargados
+"""
+import os
+import argparse
+from pymongo import MongoClient
+from pymongo.errors import BulkWriteError
+from config.settings import Settings
+from dao.journal import sealed_journals, read_journal
+
+LOTE = 1000
+DUPLICATE_KEY = 11000
+
+
+def insertar_sin_duplicados(coleccion, documentos):
+    """Inserta documentos ignorando los _id ya existentes. Retorna (insertados, duplicados)."""
+    insertados = duplicados = 0
+    for inicio in range(0, len(documentos), LOTE):
+        lote = documentos[inicio:inicio + LOTE]
+        # Las colecciones time-series no tienen índice único en _id: se filtran los ya cargados
+        existentes = {doc["_id"] for doc in coleccion.find({"_id": {"$in": [d["_id"] for d in lote]}}, {"_id": 1})}
+        if existentes:
+            duplicados += sum(doc["_id"] in existentes for doc in lote)
+            lote = [doc for doc in lote if doc["_id"] not in existentes]
+        if not lote:
+            continue
+        try:
+            insertados += len(coleccion.insert_many(lote, ordered=False).inserted_ids)
+        except BulkWriteError as e:
+            errores = e.details.get("writeErrors", [])
+            if any(error["code"] != DUPLICATE_KEY for error in errores):
+                raise
+            insertados += e.details.get("nInserted", 0)
+            duplicados += len(errores)
+    return insertados, duplicados
+
+
+def cargar_fichero(db, ruta):
+    inserciones = {}
+    upserts = {}
+    for registro in read_journal(ruta):
+        destino = upserts if registro["op"] == "upsert" else inserciones
+        destino.setdefault(registro["collection"], []).append(registro["doc"])
+
+    insertados = duplicados = sesiones = 0
+    for coleccion, documentos in inserciones.items():
+        i, d = insertar_sin_duplicados(db[coleccion], documentos)
+        insertados += i
+        duplicados += d
+    for coleccion, documentos in upserts.items():
+        # Pocas por fichero (inicio y fin de cada sesión): en orden, el último estado es el que queda
+        for doc in documentos:
+            db[coleccion].update_one({"_id": doc["_id"]}, {"$set": doc}, upsert=True)
+        sesiones += len({doc["_id"] for doc in documentos})
+    return insertados, duplicados, sesiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga en MongoDB los journals grabados sin conexión")
+    parser.add_argument("--dir", default=Settings.JOURNAL_DIR, help="Carpeta de los journals")
+    parser.add_argument("--archivo", help="Mover aquí los ficheros cargados en vez de borrarlos")
+    args = parser.parse_args()
+
+    ficheros = sealed_journals(args.dir)
+    if not ficheros:
+        print("No hay journals pendientes.")
+        return
+
+    client = MongoClient(Settings.MONGODB_URI, serverSelectionTimeoutMS=Settings.MONGODB_TIMEOUT_MS)
+    try:
+        client.admin.command("ping")
+    except Exception as e:
+        print(f"MongoDB sigue sin estar disponible: {e}")
+        return
+    db = client[Settings.DATABASE_NAME]
+
+    total_insertados = total_duplicados = total_sesiones = 0
+    for ruta in ficheros:
+        try:
+            insertados, duplicados, sesiones = cargar_fichero(db, ruta)
+        except Exception as e:
+            # El fichero se conserva: se puede volver a lanzar sin duplicar nada
+            print(f"Error cargando {os.path.basename(ruta)}: {e}")
+            break
+        total_insertados += insertados
+        total_duplicados += duplicados
+        total_sesiones += sesiones
+        print(f"{os.path.basename(ruta)}: {insertados} insertados, {duplicados} duplicados, {sesiones} sesiones")
+        if args.archivo:
+            os.makedirs(args.archivo, exist_ok=True)
+            os.replace(ruta, os.path.join(args.archivo, os.path.basename(ruta)))
+        else:
+            os.remove(ruta)
+
+    print(f"Total: {total_insertados} documentos insertados, {total_duplicados} duplicados descartados, "
+          f"{total_sesiones} sesiones actualizadas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Imports planos como en main.py (los módulos están en la carpeta del proyecto)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -0,0 +1,125 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+from dao.analytics import VolumeAnalytics, ensure_indexes
+from informe_sesiones import datos_de_prueba
+from models.session import Session
+from models.volume_event import VolumeEvent
+from models.volume_rollup import RollupBuilder
+
+# (segundos desde el inicio, volumen previo, volumen nuevo, distancia entre dedos)
+SESION_A = (datetime(2024, 1, 1, 10, 0), [(0.0, 10, 12, 100.0), (0.5, 12, 15, 110.0), (3.0, 15, 13, 90.0)])
+SESION_B = (datetime(2024, 1, 1, 22, 30), [(0.0, 50, 40, 200.0), (0.2, 40, 38, 180.0)])
+SESION_C = (datetime(2024, 1, 2, 8, 0), [])  # sin cambios de volumen
+
+
+def _guardar_sesion(db, inicio, cambios):
+    session = Session(start_time=inicio, end_time=inicio + timedelta(minutes=1))
+    db.sessions.insert_one(session.to_dict())
+    eventos = []
+    for segundos, previo, nuevo, distancia in cambios:
+        event = VolumeEvent(previo, nuevo, distancia, session.session_id)
+        event.timestamp = inicio + timedelta(seconds=segundos)
+        eventos.append(event)
+    if eventos:
+        db.volume_events.insert_many([event.to_dict() for event in eventos])
+    for kind in RollupBuilder.KINDS:
+        builder = RollupBuilder(kind, session.session_id, gesture_gap=0.5)
+        buckets = [bucket for event in eventos for bucket in builder.add(event)] + builder.flush()
+        if buckets:
+            db.volume_rollups.insert_many(buckets)
+    return session.session_id
+
+
+@pytest.fixture
+def datos():
+    """(db, [id de A, id de B, id de C])"""
+    db = mongomock.MongoClient().db
+    ids = [_guardar_sesion(db, inicio, cambios) for inicio, cambios in (SESION_A, SESION_B, SESION_C)]
+    ensure_indexes(db)
+    return db, ids
+
+
+def _fuentes(db):
+    return [VolumeAnalytics(db, "events")] + [VolumeAnalytics(db, "rollups", kind) for kind in RollupBuilder.KINDS]
+
+
+def test_ensure_indexes():
+    db = mongomock.MongoClient().db
+    ensure_indexes(db)
+    assert "session_id_1_timestamp_1" in db.volume_events.index_information()
+    assert "start_time_-1" in db.sessions.index_information()
+    # Sin nombrarla, volume_rollups no se crea (podría tener que ser time-series)
+    assert "volume_rollups" not in db.list_collection_names()
+    ensure_indexes(db, ["volume_rollups"])
+    assert "session_id_1_timestamp_1" in db.volume_rollups.index_information()
+
+
+def test_fuente_desconocida(datos):
+    db, _ = datos
+    with pytest.raises(ValueError):
+        VolumeAnalytics(db, "logs")
+
+
+@pytest.mark.parametrize("indice", range(3))
+def test_session_summary(datos, indice):
+    db, (a, b, c) = datos
+    resumen = _fuentes(db)[indice].session_summary()
+    # Las más recientes primero, incluida la sesión sin cambios
+    assert [s["session_id"] for s in resumen] == [c, b, a]
+    assert [s["changes"] for s in resumen] == [0, 2, 3]
+    assert resumen[0]["avg_finger_distance"] is None
+    assert resumen[1]["avg_finger_distance"] == pytest.approx(190.0)
+    assert resumen[2]["avg_finger_distance"] == pytest.approx(100.0)
+    assert resumen[2]["first_change"] == datetime(2024, 1, 1, 10, 0)
+    assert resumen[2]["last_change"] == datetime(2024, 1, 1, 10, 0, 3)
+    assert resumen[2]["duration_seconds"] == 60
+
+
+def test_session_summary_filtros(datos):
+    db, (a, b, c) = datos
+    analytics = VolumeAnalytics(db, "events")
+    assert [s["session_id"] for s in analytics.session_summary(limit=2)] == [c, b]
+    assert [s["session_id"] for s in analytics.session_summary(until=datetime(2024, 1, 1, 12))] == [a]
+    assert [s["session_id"] for s in analytics.session_summary(session_id=b)] == [b]
+
+
+@pytest.mark.parametrize("indice", range(3))
+def test_average_finger_distance(datos, indice):
+    db, _ = datos
+    analytics = _fuentes(db)[indice]
+    assert analytics.average_finger_distance() == pytest.approx(136.0)
+    assert analytics.average_finger_distance(since=datetime(2024, 1, 1, 12)) == pytest.approx(190.0)
+    assert analytics.average_finger_distance(since=datetime(2025, 1, 1)) is None
+
+
+def test_volume_change_histogram(datos):
+    db, _ = datos
+    # Eventos: +2, +3, -2, -10, -2
+    assert VolumeAnalytics(db, "events").volume_change_histogram(5) == [(-10, 1), (-5, 2), (0, 2)]
+    # Rollups por segundo: cambio neto de cada bucket (+5, -2, -12)
+    assert VolumeAnalytics(db, "rollups", "second").volume_change_histogram(5) == [(-15, 1), (-5, 1), (5, 1)]
+
+
+@pytest.mark.parametrize("indice", range(3))
+def test_hourly_usage(datos, indice):
+    db, _ = datos
+    analytics = _fuentes(db)[indice]
+    assert analytics.hourly_usage() == [(10, 3, 1), (22, 2, 1)]
+    # Enero en Madrid: UTC+1
+    assert analytics.hourly_usage(timezone="Europe/Madrid") == [(11, 3, 1), (23, 2, 1)]
+
+
+def test_eventos_y_rollups_coinciden():
+    db = mongomock.MongoClient().db
+    datos_de_prueba(db, sesiones=5, kind="gesture")
+    eventos = VolumeAnalytics(db, "events").session_summary()
+    rollups = VolumeAnalytics(db, "rollups", "gesture").session_summary()
+    assert len(eventos) == 5
+    for e, r in zip(eventos, rollups):
+        assert (e["session_id"], e["changes"], e["first_change"]) == (r["session_id"], r["changes"], r["first_change"])
+        assert e["last_change"] == r["last_change"]
+        assert e["avg_finger_distance"] == pytest.approx(r["avg_finger_distance"])
@@ -0,0 +1,157 @@
+import threading
+import time
+
+import pytest
+
+from dao.analytics import ensure_indexes
+from dao.event_writer import BatchEventWriter
+from dao.journal import EventJournal, read_journal, sealed_journals
+
+
+def test_prepare_runs_on_the_writer_thread():
+    mongomock = pytest.importorskip("mongomock")
+    collection = mongomock.MongoClient().db.volume_rollups
+    threads = []
+
+    def prepare():
+        # A slow create_index (e.g. a remote server) must not reach put()
+        time.sleep(0.3)
+        threads.append(threading.current_thread().name)
+        ensure_indexes(collection.database, [collection.name])
+
+    writer = BatchEventWriter(collection, batch_size=10, flush_seconds=0.05, prepare=prepare)
+    start = time.monotonic()
+    assert writer.put({"n": 1})
+    assert time.monotonic() - start < 0.1
+    assert writer.flush(timeout=2.0)
+    writer.close()
+    assert threads == ["BatchEventWriter"]
+    assert "session_id_1_timestamp_1" in collection.index_information()
+    assert collection.count_documents({}) == 1
+
+
+def test_prepare_failure_does_not_stop_writing():
+    collection = _Collection()
+
+    def prepare():
+        raise RuntimeError("no index for you")
+
+    writer = BatchEventWriter(collection, batch_size=1, prepare=prepare)
+    writer.put({"n": 1})
+    assert writer.flush(timeout=2.0)
+    writer.close()
+    assert writer.stats()["written"] == 1 and collection.batches == [[{"n": 1}]]
+
+
+class _Collection:
+    """Collection double: records each insert_many batch; it can block (slow server) or fail."""
+
+    def __init__(self, name="volume_events", fail=False):
+        self.name = name
+        self.fail = fail
+        self.batches = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def insert_many(self, documents, ordered=True):
+        self.release.wait()
+        if self.fail:
+            raise ConnectionError("server down")
+        self.batches.append(list(documents))
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+def test_flush_on_batch_size():
+    collection = _Collection()
+    writer = BatchEventWriter(collection, batch_size=5, flush_seconds=60)
+    for n in range(12):
+        writer.put({"n": n})
+    # Two full batches go out at once; the last 2 documents wait for the timer
+    assert _wait_for(lambda: len(collection.batches) == 2)
+    assert [len(batch) for batch in collection.batches] == [5, 5]
+    time.sleep(0.1)
+    assert len(collection.batches) == 2
+    writer.close()
+    assert [len(batch) for batch in collection.batches] == [5, 5, 2]
+    assert writer.stats()["written"] == 12
+
+
+def test_flush_on_time():
+    collection = _Collection()
+    writer = BatchEventWriter(collection, batch_size=100, flush_seconds=0.2)
+    start = time.monotonic()
+    for n in range(3):
+        writer.put({"n": n})
+    assert _wait_for(lambda: collection.batches)
+    assert time.monotonic() - start >= 0.15
+    assert collection.batches == [[{"n": 0}, {"n": 1}, {"n": 2}]]
+    writer.close()
+
+
+def test_explicit_flush():
+    collection = _Collection()
+    writer = BatchEventWriter(collection, batch_size=100, flush_seconds=60)
+    writer.put({"n": 1})
+    assert writer.flush(timeout=2.0)
+    assert collection.batches == [[{"n": 1}]]
+    writer.close()
+
+
+def test_full_queue_drops():
+    collection = _Collection()
+    collection.release.clear()  # MongoDB stalled
+    writer = BatchEventWriter(collection, batch_size=1, max_queue=3)
+    results = [writer.put({"n": n}) for n in range(10)]
+    # put() never blocks: what does not fit is dropped and reported
+    assert results.count(False) >= 6
+    assert writer.stats()["dropped"] == results.count(False)
+    collection.release.set()
+    writer.close()
+    stats = writer.stats()
+    assert stats["written"] + stats["dropped"] == 10
+
+
+def test_full_queue_spills_to_journal(tmp_path):
+    journal = EventJournal(str(tmp_path))
+    collection = _Collection()
+    collection.release.clear()
+    writer = BatchEventWriter(collection, batch_size=1, max_queue=3, overflow="spill", journal=journal)
+    results = [writer.put({"_id": n}) for n in range(10)]
+    collection.release.set()
+    writer.close()
+    journal.close()
+
+    spilled = [record for path in sealed_journals(str(tmp_path)) for record in read_journal(path)]
+    assert len(spilled) == results.count(False) == writer.stats()["spilled"]
+    assert {record["collection"] for record in spilled} == {"volume_events"}
+    written = [doc["_id"] for batch in collection.batches for doc in batch]
+    # Nothing lost and nothing written twice
+    assert sorted(written + [record["doc"]["_id"] for record in spilled]) == list(range(10))
+
+
+def test_failed_batch_spills(tmp_path):
+    journal = EventJournal(str(tmp_path))
+    writer = BatchEventWriter(_Collection(fail=True), batch_size=2, overflow="spill", journal=journal)
+    for n in range(4):
+        writer.put({"_id": n})
+    writer.close()
+    journal.close()
+    stats = writer.stats()
+    assert (stats["failed_batches"], stats["spilled"], stats["written"]) == (2, 4, 0)
+    records = [record for path in sealed_journals(str(tmp_path)) for record in read_journal(path)]
+    assert [record["doc"]["_id"] for record in records] == [0, 1, 2, 3]
+
+
+def test_spill_needs_a_journal():
+    with pytest.raises(ValueError):
+        BatchEventWriter(_Collection(), overflow="spill")
+    with pytest.raises(ValueError):
+        BatchEventWriter(_Collection(), overflow="block")
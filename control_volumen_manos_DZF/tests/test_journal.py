@@ -0,0 +1,98 @@
+import os
+
+import pytest
+
+from dao.journal import ACTIVE_SUFFIX, EventJournal, read_journal, sealed_journals
+
+
+def _records(directory):
+    return [record for path in sealed_journals(directory) for record in read_journal(path)]
+
+
+def _active(directory):
+    return [name for name in os.listdir(directory) if name.endswith(ACTIVE_SUFFIX)]
+
+
+def test_rotation_and_sealing(tmp_path):
+    directory = str(tmp_path)
+    journal = EventJournal(directory, max_bytes=300)
+    for n in range(20):
+        journal.append("volume_events", {"_id": n, "new_volume": n})
+    # Each file is sealed as soon as it reaches max_bytes; the rest stays in the active one
+    sealed = sealed_journals(directory)
+    assert len(sealed) >= 2
+    assert all(os.path.getsize(path) < 300 + 100 for path in sealed)
+    journal.close()
+    assert _active(directory) == []
+    records = _records(directory)
+    assert [record["doc"]["_id"] for record in records] == list(range(20))
+    assert {(record["collection"], record["op"]) for record in records} == {("volume_events", "insert")}
+    assert journal.records == 20
+
+
+def test_close_without_records_creates_nothing(tmp_path):
+    journal = EventJournal(str(tmp_path))
+    journal.close()
+    assert os.listdir(tmp_path) == []
+
+
+def test_orphan_sealed_only_when_unlocked(tmp_path):
+    directory = str(tmp_path)
+    running = EventJournal(directory)
+    running.append("sessions", {"_id": 1}, op="upsert")
+    # Another instance starting meanwhile leaves the locked active file alone
+    EventJournal(directory)
+    assert len(_active(directory)) == 1 and sealed_journals(directory) == []
+
+    # Crash: the process dies without sealing (the lock goes with it)
+    running.file.close()
+    EventJournal(directory)
+    assert _active(directory) == []
+    assert [record["op"] for record in _records(directory)] == ["upsert"]
+
+
+def test_truncated_tail_is_skipped(tmp_path, capsys):
+    journal = EventJournal(str(tmp_path))
+    for n in range(3):
+        journal.append("volume_events", {"_id": n})
+    journal.close()
+    path = sealed_journals(str(tmp_path))[0]
+    # Power loss in the middle of the last record
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - 5)
+    assert [record["doc"]["_id"] for record in read_journal(path)] == [0, 1]
+    assert "truncated" in capsys.readouterr().out
+
+
+def test_replay_dedupes_by_id(tmp_path):
+    mongomock = pytest.importorskip("mongomock")
+    from replay_journal import cargar_fichero
+
+    db = mongomock.MongoClient().db
+    # One batch did reach MongoDB before the connection dropped
+    db.volume_events.insert_many([{"_id": 0, "v": "server"}, {"_id": 1, "v": "server"}])
+    journal = EventJournal(str(tmp_path))
+    for n in range(5):
+        journal.append("volume_events", {"_id": n, "v": "journal"})
+    journal.append("sessions", {"_id": "s", "end_time": None}, op="upsert")
+    journal.append("sessions", {"_id": "s", "end_time": 10}, op="upsert")
+    journal.close()
+    path = sealed_journals(str(tmp_path))[0]
+
+    assert cargar_fichero(db, path) == (3, 2, 1)
+    assert db.volume_events.count_documents({}) == 5
+    assert db.volume_events.find_one({"_id": 0})["v"] == "server"
+    assert db.sessions.find_one({"_id": "s"})["end_time"] == 10
+    # Replaying the same file again inserts nothing
+    assert cargar_fichero(db, path) == (0, 5, 1)
+    assert db.volume_events.count_documents({}) == 5
+
+
+def test_replay_dedupes_within_a_file(tmp_path):
+    mongomock = pytest.importorskip("mongomock")
+    from replay_journal import insertar_sin_duplicados
+
+    # A document spilled twice (e.g. retried batch) is inserted once
+    coleccion = mongomock.MongoClient().db.volume_events
+    assert insertar_sin_duplicados(coleccion, [{"_id": 1}, {"_id": 2}, {"_id": 1}]) == (2, 1)
+    assert coleccion.count_documents({}) == 2
@@ -0,0 +1,55 @@
+import random
+import time
+
+import pytest
+
+from VolumeHandControl import RecordingBackend, VolumeActuator
+
+
+@pytest.fixture
+def actuator():
+    """Actuator on a RecordingBackend at 50 %; fast rate so the tests do not wait long."""
+    backend = RecordingBackend()
+    backend.value = 0.5
+    actuator = VolumeActuator(backend, smoothing=0.5, threshold=0.01, max_rate_hz=500).start()
+    yield actuator
+    actuator.stop()
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+def test_still_jittery_hand_does_not_push(actuator):
+    # Hand held at 150 px (50 %) with +-0.5 px of landmark jitter (+-0.25 %), ~1000 frames
+    rng = random.Random(0)
+    for _ in range(1000):
+        actuator.set_volume(150 + rng.uniform(-0.5, 0.5))
+        time.sleep(0.0005)
+    time.sleep(0.05)
+    assert actuator.backend.calls == []
+    assert actuator.applied == 0.5
+
+
+def test_reaches_mute_and_full_exactly(actuator):
+    actuator.set_volume(0)
+    assert _wait_for(lambda: actuator.applied == 0.0)
+    actuator.set_volume(400)
+    assert _wait_for(lambda: actuator.applied == 1.0)
+    # Converges in a few steps, each one at least threshold apart except the last
+    scalars = [scalar for _, scalar in actuator.backend.calls]
+    assert scalars[-1] == 1.0 and 0.0 in scalars
+    assert len(scalars) < 30
+
+
+def test_moves_within_threshold_of_target(actuator):
+    actuator.set_volume(200)  # 75 %
+    assert _wait_for(lambda: actuator.applied is not None and abs(actuator.applied - 0.75) < actuator.threshold)
+    pushes = actuator.pushes
+    time.sleep(0.05)
+    assert actuator.pushes == pushes